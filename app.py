@@ -20,10 +20,11 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import threading
 import time
-import requests
-import pandas as pd
 import io
+import re
+import csv
 from werkzeug.utils import secure_filename
+from spec_ingest import SpecIngestJob
 
 # Try to import cloud database
 try:
@@ -33,13 +34,9 @@ try:
     from cloud_database import load_projects as db_load_projects, save_project_data as db_save_project_data
     from cloud_database import reinitialize_db, cloud_db, get_mongodb_uri
 
-    # Check if MongoDB is actually connected
-    CLOUD_DB_AVAILABLE = cloud_db and cloud_db.connected
-
-    if CLOUD_DB_AVAILABLE:
-        print("[DATABASE] Cloud database connected successfully!")
-    else:
-        print("[DATABASE] Cloud database module loaded - will attempt connection")
+    # Connection is made on the first request (ensure_db_connection), not at import
+    CLOUD_DB_AVAILABLE = False
+    print("[DATABASE] Cloud database module loaded - will connect on first request")
 except ImportError:
     CLOUD_DB_AVAILABLE = False
     db_load_projects = None
@@ -741,6 +738,11 @@ LOGIN_ATTEMPTS_FILE = DATA_DIR / 'login_attempts.json'
 # Project specifications and drafts files (temporary until MongoDB migration)
 PROJECT_SPECS_FILE = DATA_DIR / 'project_specs.json'
 PROJECT_DRAFTS_FILE = DATA_DIR / 'project_drafts.json'
+# Held around every load-modify-save of PROJECT_SPECS_FILE, spec import flushes included
+PROJECT_SPECS_LOCK = threading.Lock()
+
+# Uploaded spec workbooks, import job status and per-row issue reports
+SPEC_INGEST_DIR = DATA_DIR / 'spec_ingest'
 
 # Email configuration - Try to import from email_config.py first
 try:
@@ -2855,6 +2857,8 @@ def favicon_hexagon_ico():
 @app.route('/api/market-data/fred/<series_id>')
 def proxy_fred_api(series_id):
     """Proxy FRED API requests to avoid CORS issues"""
+    import requests
+
     # Whitelist of allowed series to prevent abuse
     allowed_series = [
         'SOFR', 'DGS10', 'DGS2', 'DGS5', 'DGS30', 'DFEDTARU', 'DEXUSEU',
@@ -7163,6 +7167,8 @@ def version_info():
 @app.route('/api/projects/<project_id>/upload', methods=['POST'])
 def upload_project_file(project_id):
     """Upload and parse Excel sponsor input template"""
+    import pandas as pd
+
     ip_address = get_real_ip()
     
     if not session.get(f'user_authenticated_{ip_address}'):
@@ -7565,6 +7571,8 @@ def download_project_template(template_type):
 
 def create_template_files():
     """Create template files if they don't exist"""
+    import pandas as pd
+
     templates_dir = os.path.join('static', 'templates')
     os.makedirs(templates_dir, exist_ok=True)
     
@@ -7804,9 +7812,10 @@ def submit_project_specification():
     }
     
     # Load and save specifications
-    project_specs = load_json_db(PROJECT_SPECS_FILE)
-    project_specs[spec_id] = specification
-    save_json_db(PROJECT_SPECS_FILE, project_specs)
+    with PROJECT_SPECS_LOCK:
+        project_specs = load_json_db(PROJECT_SPECS_FILE)
+        project_specs[spec_id] = specification
+        save_json_db(PROJECT_SPECS_FILE, project_specs)
     
     # Action logged - submission complete
     
@@ -7860,139 +7869,131 @@ def upload_excel_specifications():
     if file_ext not in allowed_extensions:
         return jsonify({'status': 'error', 'message': 'Invalid file type. Please upload Excel or CSV file'}), 400
     
-    try:
-        # Read the file based on extension
-        if file_ext == '.csv':
-            df = pd.read_csv(io.BytesIO(file.read()))
-        else:
-            # Read Excel file - try to find the right sheet
-            excel_file = pd.ExcelFile(io.BytesIO(file.read()))
-            
-            # Look for pipeline or project sheet
-            sheet_name = None
-            for sheet in excel_file.sheet_names:
-                if any(keyword in sheet.lower() for keyword in ['pipeline', 'project', 'data', 'capex']):
-                    sheet_name = sheet
-                    break
-            
-            if not sheet_name:
-                sheet_name = excel_file.sheet_names[0]  # Use first sheet as fallback
-            
-            df = pd.read_excel(excel_file, sheet_name=sheet_name)
-        
-        # Process the dataframe and extract project information
-        projects_imported = []
-        project_specs = load_json_db(PROJECT_SPECS_FILE)
-        
-        # Try to map columns to our fields
-        column_mapping = {
-            'project_name': ['project name', 'project', 'name', 'deal name'],
-            'deal_type': ['deal type', 'type', 'asset type', 'asset class'],
-            'project_location': ['location', 'site', 'region', 'country'],
-            'capex_total': ['total capex', 'capex', 'total cost', 'investment'],
-            'capex_land_purchase': ['land', 'land purchase', 'land cost'],
-            'capex_building': ['building', 'construction', 'building cost'],
-            'capex_infrastructure': ['infrastructure', 'infra'],
-            'capex_it_equipment': ['it equipment', 'it', 'equipment'],
-            'offtaker_name': ['offtaker', 'tenant', 'customer'],
-            'offtaker_rent_per_kwh': ['rent', 'rent per kwh', 'rental'],
-            'power_cost_per_kwh': ['power cost', 'electricity', 'power'],
-            'lease_term_years': ['lease term', 'term', 'years'],
-            'construction_start_date': ['start date', 'construction start', 'start'],
-            'construction_end_date': ['end date', 'construction end', 'completion'],
-            'data_centre_capacity_mw': ['capacity', 'mw', 'it load', 'power capacity']
-        }
-        
-        # Normalize column names
-        df.columns = [col.lower().strip() for col in df.columns]
-        
-        for index, row in df.iterrows():
-            # Skip empty rows
-            if pd.isna(row.get('project name', row.get('project', ''))):
-                continue
-            
-            # Generate unique ID
-            spec_id = f"PROJ_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{secrets.token_hex(4)}_{index}"
-            
-            # Extract data with mapping
-            specification = {
-                'id': spec_id,
-                'submitted_by': user_email,
-                'submitted_by_name': username,
-                'submission_date': datetime.now().isoformat(),
-                'status': 'pending_review',
-                'source': 'excel_upload',
-                'original_filename': secure_filename(file.filename)
-            }
-            
-            # Map fields from Excel to our structure
-            for our_field, possible_columns in column_mapping.items():
-                value = None
-                for col in possible_columns:
-                    if col in df.columns and not pd.isna(row.get(col)):
-                        value = row[col]
-                        break
-                
-                # Convert dates if needed
-                if 'date' in our_field and value:
-                    try:
-                        if isinstance(value, str):
-                            value = pd.to_datetime(value).strftime('%Y-%m-%d')
-                        elif hasattr(value, 'strftime'):
-                            value = value.strftime('%Y-%m-%d')
-                    except Exception:
-                        pass  # Keep original value if date conversion fails
-                
-                # Convert numbers if needed
-                if any(keyword in our_field for keyword in ['capex', 'cost', 'rent', 'capacity', 'term', 'size']):
-                    try:
-                        value = float(str(value).replace(',', '').replace('£', '').replace('$', '')) if value else 0
-                    except (ValueError, TypeError):
-                        value = 0  # Default to 0 if conversion fails
-                
-                specification[our_field] = value if value is not None else ''
-            
-            # Fill in missing fields with defaults
-            for field in ['deal_type', 'project_name', 'project_location', 'site_address', 
-                         'site_size_sqm', 'data_centre_capacity_mw', 'construction_cost',
-                         'development_cost', 'capex_professional_fees', 'capex_contingency',
-                         'market_capex_estimate', 'offtaker_credit_rating', 
-                         'offtaker_annual_escalation', 'expected_pue', 'notes']:
-                if field not in specification:
-                    specification[field] = 'Data Centre' if field == 'deal_type' else (1.5 if field == 'expected_pue' else '')
-            
-            # Add engine integration fields
-            specification['engine_populated'] = False
-            specification['engine_populated_date'] = None
-            
-            # Save specification
-            project_specs[spec_id] = specification
-            projects_imported.append({
-                'id': spec_id,
-                'name': specification.get('project_name', 'Unnamed Project')
-            })
-        
-        # Save all specifications
-        save_json_db(PROJECT_SPECS_FILE, project_specs)
-        
-        # Log the action
+    # Spool the upload to disk and stream it row by row; large sponsor
+    # pipelines would otherwise be held in memory (twice) inside the request
+    SPEC_INGEST_DIR.mkdir(parents=True, exist_ok=True)
+    source_path = str(SPEC_INGEST_DIR / f"upload_{secrets.token_hex(8)}{file_ext}")
+    file.save(source_path)
+
+    filename = file.filename
+
+    def on_complete(status):
         log_admin_action(ip_address, 'excel_upload', {
-            'filename': file.filename,
-            'projects_imported': len(projects_imported)
-        })
-        
-        return jsonify({
-            'status': 'success',
-            'message': f'Successfully imported {len(projects_imported)} projects',
-            'projects': projects_imported
+            'filename': filename,
+            'job_id': status['job_id'],
+            'status': status['status'],
+            'projects_imported': status['projects_imported'],
+            'issues': status['issues']
         })
-        
+
+    try:
+        job = SpecIngestJob(
+            SPEC_INGEST_DIR, source_path, file_ext, filename, user_email, username,
+            load_specs=lambda: load_json_db(PROJECT_SPECS_FILE),
+            save_specs=lambda specs: save_json_db(PROJECT_SPECS_FILE, specs),
+            specs_lock=PROJECT_SPECS_LOCK,
+            on_complete=on_complete
+        )
+        # Serverless instances are frozen once the response is sent and polls can
+        # land on another instance's /tmp, so on Vercel the import finishes inside
+        # the request; long-running servers import in a background thread
+        if IS_VERCEL:
+            job.run()
+        else:
+            job.start()
     except Exception as e:
         return jsonify({
             'status': 'error',
             'message': f'Error processing file: {str(e)}'
         }), 500
 
+    if IS_VERCEL:
+        status = job.status
+        if status['status'] == 'failed':
+            return jsonify({'status': 'error', 'message': status.get('error'), 'job_id': job.job_id}), 500
+        return jsonify({
+            'status': 'success',
+            'message': status['message'],
+            'job_id': job.job_id,
+            'projects': status['projects'],
+            'projects_imported': status['projects_imported'],
+            # Capped like the status preview; the full report is served from errors_url
+            'issues': status['issues_preview'],
+            'issues_total': status['issues'],
+            'errors_url': url_for('get_upload_job_errors', job_id=job.job_id)
+        })
+
+    return jsonify({
+        'status': 'accepted',
+        'message': 'File received, import running in the background',
+        'job_id': job.job_id,
+        'status_url': url_for('get_upload_job_status', job_id=job.job_id),
+        'errors_url': url_for('get_upload_job_errors', job_id=job.job_id)
+    }), 202
+
+def _load_upload_job(job_id):
+    """Upload job status for the current user, or an error response tuple"""
+    ip_address = get_real_ip()
+
+    if not session.get(f'user_authenticated_{ip_address}'):
+        return None, (jsonify({'status': 'error', 'message': 'Authentication required'}), 401)
+
+    if not re.fullmatch(r'[0-9a-f]{16}', job_id):
+        return None, (jsonify({'status': 'error', 'message': 'Job not found'}), 404)
+
+    job = SpecIngestJob.read_status(SPEC_INGEST_DIR, job_id)
+    if job is None:
+        return None, (jsonify({'status': 'error', 'message': 'Job not found'}), 404)
+
+    is_admin = session.get(f'is_admin_{ip_address}', False)
+    if not is_admin and job.get('submitted_by') != session.get(f'user_email_{ip_address}'):
+        return None, (jsonify({'status': 'error', 'message': 'Access denied'}), 403)
+
+    return job, None
+
+@app.route('/api/project-specifications/upload-jobs/<job_id>', methods=['GET'])
+def get_upload_job_status(job_id):
+    """Progress of a background Excel/CSV import"""
+    job, error = _load_upload_job(job_id)
+    if error:
+        return error
+
+    return jsonify({'status': 'success', 'job': job})
+
+@app.route('/api/project-specifications/upload-jobs/<job_id>/errors', methods=['GET'])
+def get_upload_job_errors(job_id):
+    """Per-row issue report of an import (CSV by default, ?format=json for JSON)"""
+    job, error = _load_upload_job(job_id)
+    if error:
+        return error
+
+    issues_path = SpecIngestJob.issues_path(SPEC_INGEST_DIR, job_id)
+    if not issues_path.exists():
+        return jsonify({'status': 'success', 'job_status': job['status'], 'issues': []})
+
+    if request.args.get('format') == 'json':
+        issues = SpecIngestJob.read_issues(SPEC_INGEST_DIR, job_id)
+        return jsonify({'status': 'success', 'job_status': job['status'], 'issues': issues})
+
+    def generate():
+        fields = ['row', 'field', 'value', 'severity', 'message']
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        with open(issues_path) as f:
+            for line in f:
+                if line.strip():
+                    writer.writerow(json.loads(line))
+                if buffer.tell() > 65536:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+        yield buffer.getvalue()
+
+    response = app.response_class(generate(), mimetype='text/csv')
+    response.headers['Content-Disposition'] = f'attachment; filename=import_{job_id}_issues.csv'
+    return response
+
 @app.route('/api/project-specifications/upload-pipeline', methods=['POST'])
 def upload_pipeline():
     """Upload entire project pipeline from Excel"""
@@ -8289,8 +8290,11 @@ def get_or_update_project_specification(spec_id):
             drafts[spec_id] = spec
             save_json_db(PROJECT_DRAFTS_FILE, drafts)
         else:
-            specs[spec_id] = spec
-            save_json_db(PROJECT_SPECS_FILE, specs)
+            # Reloaded under the lock so specs saved since the read above are kept
+            with PROJECT_SPECS_LOCK:
+                specs = load_json_db(PROJECT_SPECS_FILE)
+                specs[spec_id] = spec
+                save_json_db(PROJECT_SPECS_FILE, specs)
         
         # Log admin action if admin is editing another user's data
         if is_admin and spec_owner != user_email:
@@ -8372,22 +8376,23 @@ def populate_engine_from_spec():
     if not spec_id:
         return jsonify({'status': 'error', 'message': 'Specification ID required'}), 400
     
-    # Load specifications
-    project_specs = load_json_db(PROJECT_SPECS_FILE)
-    
-    if spec_id not in project_specs:
-        return jsonify({'status': 'error', 'message': 'Specification not found'}), 404
-    
-    spec = project_specs[spec_id]
-    
-    # Mark as populated
-    spec['engine_populated'] = True
-    spec['engine_populated_date'] = datetime.now().isoformat()
-    spec['status'] = 'in_engine'
-    
-    # Save updated specification
-    project_specs[spec_id] = spec
-    save_json_db(PROJECT_SPECS_FILE, project_specs)
+    # Load, mark as populated and save specifications in one locked update
+    with PROJECT_SPECS_LOCK:
+        project_specs = load_json_db(PROJECT_SPECS_FILE)
+        
+        if spec_id not in project_specs:
+            return jsonify({'status': 'error', 'message': 'Specification not found'}), 404
+        
+        spec = project_specs[spec_id]
+        
+        # Mark as populated
+        spec['engine_populated'] = True
+        spec['engine_populated_date'] = datetime.now().isoformat()
+        spec['status'] = 'in_engine'
+        
+        # Save updated specification
+        project_specs[spec_id] = spec
+        save_json_db(PROJECT_SPECS_FILE, project_specs)
     
     # Log the action
     log_admin_action(ip_address, 'engine_populated_from_spec', {
@@ -4,7 +4,6 @@ Handles document storage using Vercel's Blob Storage service
 """
 
 import os
-import requests
 import json
 from datetime import datetime
 from typing import Optional, Dict, Any
@@ -39,6 +38,7 @@ class BlobStorage:
         Returns:
             Dict with url and metadata if successful, None if failed
         """
+        import requests
         if not self.connected:
             print("[BLOB] Cannot upload - Blob Storage not configured")
             return None
@@ -89,6 +89,7 @@ class BlobStorage:
         Returns:
             True if successful, False otherwise
         """
+        import requests
         if not self.connected:
             print("[BLOB] Cannot delete - Blob Storage not configured")
             return False
@@ -122,6 +123,7 @@ class BlobStorage:
         Returns:
             List of file metadata
         """
+        import requests
         if not self.connected:
             print("[BLOB] Cannot list files - Blob Storage not configured")
             return []
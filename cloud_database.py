@@ -6,10 +6,8 @@ Free tier: 512MB storage, perfect for this application
 
 import os
 import json
+import threading
 from datetime import datetime
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure
-from pymongo.server_api import ServerApi
 import time
 
 # MongoDB Atlas connection
@@ -36,16 +34,45 @@ def should_use_mongodb():
 class CloudDatabase:
     """Cloud-based persistent database"""
     
-    def __init__(self):
+    def __init__(self, lazy=False):
         self.client = None
         self.db = None
+        self._connected = None  # None until a connection has been attempted
+        self._connect_lock = threading.Lock()
+
+        if not lazy:
+            self.connect()
+
+    @property
+    def connected(self):
+        """Whether MongoDB is reachable; the first access of a lazy instance connects"""
+        if self._connected is None:
+            with self._connect_lock:
+                if self._connected is None:
+                    self._connect()
+        return self._connected
+
+    @connected.setter
+    def connected(self, value):
+        self._connected = value
+
+    def connect(self):
+        """(Re)connect to MongoDB, returns whether it succeeded"""
+        with self._connect_lock:
+            self._connect()
+        return self._connected
+
+    def _connect(self):
         self.connected = False
-        
-        # Check for MongoDB URI at initialization time
+
+        # Check for MongoDB URI at connection time
         MONGODB_URI = get_mongodb_uri()
         
         if MONGODB_URI:
             try:
+                from pymongo import MongoClient
+                from pymongo.server_api import ServerApi
+
                 print(f"[DATABASE] Attempting MongoDB connection...")
                 print(f"[DATABASE] URI configured: {bool(MONGODB_URI)}")
                 # Connect to MongoDB Atlas with ServerApi
@@ -943,11 +970,14 @@ def get_db():
 def reinitialize_db():
     """Reinitialize database connection"""
     global cloud_db
-    cloud_db = CloudDatabase()
-    return cloud_db.connected
+    if cloud_db is None:
+        cloud_db = CloudDatabase(lazy=True)
+    # Reconnect in place so modules holding a reference to cloud_db see the new connection
+    return cloud_db.connect()
 
-# Initialize on first import
-cloud_db = get_db()
+# Created on first import; connects on first use rather than at import so
+# cold starts do not wait on pymongo and a server round trip
+cloud_db = CloudDatabase(lazy=True)
 
 # Helper functions for backward compatibility
 def load_users():
@@ -7,10 +7,34 @@ Centralized feature flag management with canary rollout support
 import os
 import json
 import time
+import copy
+import hashlib
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List
+from types import MappingProxyType
+from typing import Dict, Any, Optional, List, Mapping
 import threading
 
+FLAG_RELOAD_INTERVAL = float(os.environ.get('FEATURE_FLAGS_RELOAD_SECONDS', '2'))  # config file mtime check period
+FLAG_DECISION_CACHE_MAX = 50_000  # cached (flag, user, admin) decisions per snapshot
+
+@dataclass(frozen=True)
+class FlagSnapshot:
+    """
+    Immutable, versioned view of all flags. Readers take the current
+    snapshot without locking; writers publish a new one. Decisions are
+    cached on the snapshot, so a new version starts with an empty cache.
+    """
+    version: int
+    flags: Mapping[str, Mapping[str, Any]]
+    file_stamp: Optional[tuple] = None
+    decisions: Dict[tuple, bool] = field(default_factory=dict, compare=False, repr=False)
+
+    @classmethod
+    def build(cls, flags: Dict[str, Any], version: int, file_stamp: Optional[tuple] = None) -> 'FlagSnapshot':
+        frozen = {name: MappingProxyType(copy.deepcopy(flag)) for name, flag in flags.items()}
+        return cls(version=version, flags=MappingProxyType(frozen), file_stamp=file_stamp)
+
 class FeatureFlagManager:
     """
     Production-ready feature flag system with:
@@ -21,31 +45,74 @@ class FeatureFlagManager:
     """
 
     def __init__(self, config_file: Optional[str] = None):
-        self.config_file = config_file or '/tmp/feature_flags.json' if os.environ.get('VERCEL') else 'feature_flags.json'
+        self.config_file = config_file or ('/tmp/feature_flags.json' if os.environ.get('VERCEL') else 'feature_flags.json')
         self.flags = {}
         self.lock = threading.RLock()
+        self._snapshot = FlagSnapshot.build({}, version=0)
+        self._next_mtime_check = 0.0
         self.load_flags()
 
+    def _file_stamp(self) -> Optional[tuple]:
+        """Config file (mtime, inode, size): save_flags' rename always changes the inode"""
+        try:
+            st = os.stat(self.config_file)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_ino, st.st_size)
+
+    def _publish(self):
+        """Swap in a snapshot of self.flags (caller holds self.lock)"""
+        self._snapshot = FlagSnapshot.build(self.flags, self._snapshot.version + 1, self._file_stamp())
+
+    def snapshot(self) -> FlagSnapshot:
+        """
+        Current flag snapshot, lock-free. At most every FLAG_RELOAD_INTERVAL
+        seconds the config file's mtime is checked, and a changed file is
+        reloaded and published.
+        """
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if now >= self._next_mtime_check:
+            self._next_mtime_check = now + FLAG_RELOAD_INTERVAL
+            stamp = self._file_stamp()
+            if stamp is not None and stamp != snapshot.file_stamp:
+                with self.lock:
+                    if self._snapshot is snapshot:
+                        self.load_flags()
+                snapshot = self._snapshot
+        return snapshot
+
     def load_flags(self):
         """Load feature flags from configuration file"""
-        try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r') as f:
-                    self.flags = json.load(f)
-            else:
+        with self.lock:
+            try:
+                if os.path.exists(self.config_file):
+                    with open(self.config_file, 'r') as f:
+                        self.flags = json.load(f)
+                else:
+                    self.flags = self.get_default_flags()
+                    self.save_flags()
+            except Exception as e:
+                print(f"[FEATURE_FLAGS] Error loading flags: {e}")
                 self.flags = self.get_default_flags()
-                self.save_flags()
-        except Exception as e:
-            print(f"[FEATURE_FLAGS] Error loading flags: {e}")
-            self.flags = self.get_default_flags()
+            self._publish()
 
     def save_flags(self):
-        """Save feature flags to configuration file"""
-        try:
-            with open(self.config_file, 'w') as f:
-                json.dump(self.flags, f, indent=2, default=str)
-        except Exception as e:
-            print(f"[FEATURE_FLAGS] Error saving flags: {e}")
+        """Save feature flags to configuration file and publish them"""
+        with self.lock:
+            # Write-then-rename so a concurrent mtime reload never reads a partial file
+            tmp_file = f"{self.config_file}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_file, 'w') as f:
+                    json.dump(self.flags, f, indent=2, default=str)
+                os.replace(tmp_file, self.config_file)
+            except Exception as e:
+                print(f"[FEATURE_FLAGS] Error saving flags: {e}")
+                try:
+                    os.remove(tmp_file)
+                except OSError:
+                    pass
+            self._publish()
 
     def get_default_flags(self) -> Dict[str, Any]:
         """Get default feature flags for Phase-1 deployment"""
@@ -157,33 +224,42 @@ class FeatureFlagManager:
         Returns:
             bool: True if feature is enabled for this user
         """
-        with self.lock:
-            flag = self.flags.get(flag_name, {})
+        snapshot = self.snapshot()
+        key = (flag_name, user_email, bool(is_admin))
+        decision = snapshot.decisions.get(key)
+        if decision is None:
+            decision = self._decide(snapshot.flags.get(flag_name, {}), flag_name, user_email, is_admin)
+            if len(snapshot.decisions) >= FLAG_DECISION_CACHE_MAX:
+                snapshot.decisions.clear()
+            snapshot.decisions[key] = decision
+        return decision
 
-            # Feature doesn't exist or is disabled
-            if not flag.get('enabled', False):
-                return False
+    @staticmethod
+    def _decide(flag: Mapping[str, Any], flag_name: str, user_email: Optional[str], is_admin: bool) -> bool:
+        """Uncached flag evaluation for one user"""
+        # Feature doesn't exist or is disabled
+        if not flag.get('enabled', False):
+            return False
 
-            # Admin-only features
-            if flag.get('admin_only', False) and not is_admin:
-                return False
+        # Admin-only features
+        if flag.get('admin_only', False) and not is_admin:
+            return False
 
-            # Check rollout percentage
-            rollout_percentage = flag.get('rollout_percentage', 0)
-            if rollout_percentage == 0:
-                return False
-            elif rollout_percentage == 100:
-                return True
+        # Check rollout percentage
+        rollout_percentage = flag.get('rollout_percentage', 0)
+        if rollout_percentage == 0:
+            return False
+        elif rollout_percentage == 100:
+            return True
 
-            # Percentage-based rollout using user email hash
-            if user_email:
-                import hashlib
-                hash_value = int(hashlib.md5(f"{flag_name}:{user_email}".encode()).hexdigest()[:8], 16)
-                user_percentage = hash_value % 100
-                return user_percentage < rollout_percentage
+        # Percentage-based rollout using user email hash
+        if user_email:
+            hash_value = int(hashlib.md5(f"{flag_name}:{user_email}".encode()).hexdigest()[:8], 16)
+            user_percentage = hash_value % 100
+            return user_percentage < rollout_percentage
 
-            # No user context, default to disabled for percentage rollouts
-            return False
+        # No user context, default to disabled for percentage rollouts
+        return False
 
     def set_flag(self, flag_name: str, enabled: bool = True, admin_only: bool = None,
                  rollout_percentage: int = None, description: str = None):
@@ -251,4 +327,64 @@ feature_flags = FeatureFlagManager()
 
 def is_feature_enabled(flag_name: str, user_email: Optional[str] = None, is_admin: bool = False) -> bool:
     """Convenience function to check feature flags"""
-    return feature_flags.is_enabled(flag_name, user_email, is_admin)
\ No newline at end of file
+    return feature_flags.is_enabled(flag_name, user_email, is_admin)
+# ==================== TESTS ====================
+# python -m unittest feature_flags
+
+import tempfile
+import unittest
+from unittest import mock
+
+class TestFlagSnapshots(unittest.TestCase):
+    """Snapshots, config file reloads and the decision cache, against a temporary config file"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'flags.json')
+        self.manager = FeatureFlagManager(self.path)
+
+    def test_snapshot_is_read_only(self):
+        snapshot = self.manager.snapshot()
+        with self.assertRaises(TypeError):
+            snapshot.flags['phase1_core'] = {}
+        with self.assertRaises(TypeError):
+            snapshot.flags['phase1_core']['enabled'] = False
+        self.manager.flags['phase1_core']['enabled'] = False
+        self.assertTrue(snapshot.flags['phase1_core']['enabled'])
+
+    def test_set_flag_publishes_a_new_snapshot_with_an_empty_cache(self):
+        self.assertFalse(self.manager.is_enabled('viability_tiering', 'a@b.c', True))
+        before = self.manager.snapshot()
+        self.assertEqual(before.decisions, {('viability_tiering', 'a@b.c', True): False})
+
+        self.manager.set_flag('viability_tiering', True, rollout_percentage=100)
+        after = self.manager.snapshot()
+        self.assertEqual(after.version, before.version + 1)
+        self.assertEqual(after.decisions, {})
+        self.assertTrue(self.manager.is_enabled('viability_tiering', 'a@b.c', True))
+        self.assertFalse(self.manager.is_enabled('viability_tiering', 'a@b.c', False))
+
+    def test_changed_config_file_is_reloaded(self):
+        self.assertTrue(self.manager.is_enabled('market_news'))
+        other = FeatureFlagManager(self.path)
+        other.rollback_feature('market_news')
+
+        with mock.patch(__name__ + '.FLAG_RELOAD_INTERVAL', 0):
+            self.assertTrue(self.manager.is_enabled('market_news'))  # stale until the next check is due
+            self.manager._next_mtime_check = 0.0
+            self.assertFalse(self.manager.is_enabled('market_news'))
+            version = self.manager.snapshot().version
+            self.assertEqual(self.manager.snapshot().version, version)  # unchanged file, no reload
+
+    def test_failed_save_leaves_no_temp_file(self):
+        with open(self.path) as f:
+            saved = f.read()
+        loop = {}
+        loop['self'] = loop
+        self.manager.flags['broken'] = loop
+        self.manager.save_flags()
+
+        self.assertEqual(os.listdir(self.tmp.name), ['flags.json'])
+        with open(self.path) as f:
+            self.assertEqual(f.read(), saved)
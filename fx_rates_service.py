@@ -4,7 +4,6 @@ Supports EUR, USD, GBP with automatic conversion
 """
 
 import json
-import requests
 from datetime import datetime, timedelta
 from typing import Dict, Optional, Tuple
 import os
@@ -34,6 +33,7 @@ class FXRatesService:
         Fetch live FX rates from ECB or backup source
         Returns rates with EUR as base
         """
+        import requests
         try:
             # Try primary source (ECB via Frankfurter API)
             response = requests.get(
@@ -9,6 +9,7 @@ from typing import Dict, List, Any, Tuple, Optional
 from dataclasses import dataclass, field
 from enum import Enum
 from datetime import datetime, timedelta
+import numpy as np
 
 # ==================== Type Definitions ====================
 
@@ -237,45 +238,35 @@ class PermutationEngine:
         else:
             return scenario.SeniorTenorY_39 * 0.6
     
-    def run_waterfall(self, scenario: ScenarioState, mode: str = "Flat") -> WaterfallOutput:
+    def _growth_factors(self, months: int, growth_pct: float, cache: Dict[float, np.ndarray]) -> np.ndarray:
+        """Monthly (1+g)**years factor vector, built once per growth rate"""
+        if growth_pct not in cache:
+            years = np.arange(months) / 12
+            cache[growth_pct] = (1 + growth_pct / 100) ** years
+        return cache[growth_pct]
+
+    def run_waterfall_variants(self, scenario: ScenarioState,
+                               modes: Optional[List[str]] = None) -> Dict[str, WaterfallOutput]:
         """
-        Run waterfall calculations for a given mode
-        Modes: Flat, Indexed, Hybrid
+        Run waterfall calculations for several output variants in one pass.
+        Debt sizing, the base NOI vector and each growth factor vector are
+        built once and shared; each variant is an elementwise product.
+        Modes: Flat, Indexed, Hybrid (defaults to OutputVariants_112)
         """
+        modes = modes or self.config.get('OutputVariants_112', ["Flat", "Indexed", "Hybrid"])
         months = int(scenario.LeaseTermYears_22 * 12)
-        timeline = []
-        
+
         # Get sized senior debt
         senior_notional, dscr_min, dscr_avg = self.size_senior_debt(scenario)
-        
-        # Calculate monthly cashflows
-        for month in range(months):
-            month_data = {
-                "month": month + 1,
-                "gross_income": scenario.GrossMonthlyRent_07,
-                "opex": scenario.GrossMonthlyRent_07 * (scenario.OPEX_08 / 100),
-                "net_income": scenario.GrossMonthlyRent_07 * (1 - scenario.OPEX_08 / 100)
-            }
-            
-            # Apply indexation based on mode
-            if mode == "Indexed":
-                years = month / 12
-                if scenario.IndexationMode_18 == "CPI_Linked":
-                    growth = min(max(scenario.InflationSpot_33, scenario.CPI_FloorPct_63), scenario.CPI_CapPct_64)
-                    factor = (1 + growth/100) ** years
-                else:
-                    factor = (1 + scenario.EscalatorFixedPct_65/100) ** years
-                month_data["net_income"] *= factor
-            elif mode == "Hybrid":
-                # CPI growth for first 10 years, then flat
-                if month < 120:  # First 10 years
-                    years = month / 12
-                    growth = min(max(scenario.InflationSpot_33, scenario.CPI_FloorPct_63), scenario.CPI_CapPct_64)
-                    factor = (1 + growth/100) ** years
-                    month_data["net_income"] *= factor
-            
-            timeline.append(month_data)
-        
+
+        # Base monthly cashflows (shared by every variant)
+        gross_income = scenario.GrossMonthlyRent_07
+        opex = scenario.GrossMonthlyRent_07 * (scenario.OPEX_08 / 100)
+        base_noi = np.full(months, scenario.GrossMonthlyRent_07 * (1 - scenario.OPEX_08 / 100))
+
+        cpi_growth = min(max(scenario.InflationSpot_33, scenario.CPI_FloorPct_63), scenario.CPI_CapPct_64)
+        factor_cache: Dict[float, np.ndarray] = {}
+
         # Calculate equity IRR (simplified)
         equity_investment = scenario.TotalProjectMarketCosts_15 - senior_notional
         if equity_investment > 0:
@@ -283,18 +274,45 @@ class PermutationEngine:
             equity_irr = (annual_equity_cf / equity_investment) * 100
         else:
             equity_irr = 0
-        
+
         # Calculate Senior WAL
         senior_wal = self.calculate_senior_wal(scenario, senior_notional)
-        
-        return WaterfallOutput(
-            timeline=timeline,
-            DSCR_Min=dscr_min,
-            DSCR_Avg=dscr_avg,
-            SeniorWAL=senior_wal,
-            EquityIRR=equity_irr
-        )
-    
+
+        outputs = {}
+        for mode in modes:
+            if mode == "Indexed":
+                growth = cpi_growth if scenario.IndexationMode_18 == "CPI_Linked" else scenario.EscalatorFixedPct_65
+                net_income = base_noi * self._growth_factors(months, growth, factor_cache)
+            elif mode == "Hybrid":
+                # CPI growth for first 10 years, then flat
+                factors = self._growth_factors(months, cpi_growth, factor_cache).copy()
+                factors[120:] = 1.0
+                net_income = base_noi * factors
+            else:
+                net_income = base_noi
+
+            timeline = [
+                {"month": month + 1, "gross_income": gross_income, "opex": opex, "net_income": noi}
+                for month, noi in enumerate(net_income.tolist())
+            ]
+
+            outputs[mode] = WaterfallOutput(
+                timeline=timeline,
+                DSCR_Min=dscr_min,
+                DSCR_Avg=dscr_avg,
+                SeniorWAL=senior_wal,
+                EquityIRR=equity_irr
+            )
+
+        return outputs
+
+    def run_waterfall(self, scenario: ScenarioState, mode: str = "Flat") -> WaterfallOutput:
+        """
+        Run waterfall calculations for a given mode
+        Modes: Flat, Indexed, Hybrid
+        """
+        return self.run_waterfall_variants(scenario, [mode])[mode]
+
     def calculate_kpis(self, scenario: ScenarioState) -> KPI:
         """Calculate all KPIs for a scenario"""
         # Size senior debt
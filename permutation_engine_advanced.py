@@ -5,11 +5,13 @@ Full implementation based on permutation_config.md specifications
 
 import math
 import json
-from typing import Dict, List, Any, Tuple, Optional, Union
+from typing import Dict, List, Any, Tuple, Optional, Union, Iterable, Iterator
 from dataclasses import dataclass, field, asdict
 from enum import Enum
 from datetime import datetime, timedelta
 import itertools
+import heapq
+import numpy as np
 
 # ==================== Configuration Types ====================
 
@@ -142,7 +144,7 @@ class ScenarioState:
     MaintenanceCapexPct_69: float = 2
     PowerPassThroughMode_70: str = "Tenant"
     PPA_TermYears_71: float = 0
-    PPA_Strike_£MWh_72: float = 80
+    PPA_Strike_GBPMWh_72: float = 80  # PPA_Strike_£MWh_72 in permutation_config.md
     PowerSwapTenorY_73: float = 0
     PowerHedgeCoveragePct_74: float = 0
     
@@ -220,6 +222,29 @@ class KPI:
     Day1Cash: float = 0
     CompositeScore: float = 0
 
+# ==================== Sensitivity Configuration ====================
+
+# ScenarioState fields consumed by the batch KPI kernel
+KERNEL_FIELDS = (
+    "GrossITLoad_02", "CapexMarketRate_05", "LandPurchaseFees_06",
+    "GrossMonthlyRent_07", "OPEX_08", "LeaseTermYears_22", "InflationSpot_33",
+    "TargetDSCRSenior_37", "SeniorCoupon_38", "SeniorTenorY_39",
+    "TargetDSCRMezz_45", "MezzCoupon_46", "EquityIRRTarget_55",
+    "CPI_FloorPct_63", "CPI_CapPct_64", "Rate_Shock_bps_83",
+    "OPEX_StressPct_84", "Rent_DownsidePct_85", "COD_DelayMonths_90"
+)
+
+# Shock directions per SensitivityExportSet_115 factor (Delay is one-sided)
+SENSITIVITY_SHOCKS = {
+    "CPI": (("up", 1), ("down", -1)),
+    "Rates": (("up", 1), ("down", -1)),
+    "OPEX": (("up", 1), ("down", -1)),
+    "Rent": (("up", 1), ("down", -1)),
+    "Delay": (("up", 1),)
+}
+SENSITIVITY_CPI_SHOCK_PCT = 1.0  # Inflation bump in percentage points
+SENSITIVITY_KPIS = ("DSCR_Min", "SeniorNotional", "WACC", "EquityIRR")
+
 class AdvancedPermutationEngine:
     """Full implementation of the Atlas Forge Permutation Engine"""
     
@@ -430,6 +455,151 @@ class AdvancedPermutationEngine:
         
         return kpi
     
+    def scenario_columns(self, scenarios: List[ScenarioState]) -> Dict[str, np.ndarray]:
+        """Pack scenarios into the column arrays consumed by kpi_kernel"""
+        cols = {
+            name: np.array([getattr(s, name) for s in scenarios], dtype=float)
+            for name in KERNEL_FIELDS
+        }
+        cols["is_opex_pct"] = np.array([s.OPEXMode_17 == "PercentOfRevenue" for s in scenarios])
+        cols["is_bullet"] = np.array([s.SeniorAmortType_40 == "Bullet" for s in scenarios])
+        cols["is_annuity"] = np.array([s.SeniorAmortType_40 == "Annuity" for s in scenarios])
+        cols["is_cpi_linked"] = np.array([s.IndexationMode_18 == "CPI_Linked" for s in scenarios])
+        cols["income_factor"] = np.ones(len(scenarios))
+        return cols
+
+    def kpi_kernel(self, c: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        Vectorized counterpart of compute_derived_fields + calculate_kpis.
+        Returns SeniorNotional, MezzNotional, DSCR_Min, WACC and EquityIRR
+        arrays matching the scalar path row for row (to float rounding).
+        """
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            # Derived fields
+            gross_income = c["GrossMonthlyRent_07"] * 12
+            net_income = np.where(
+                c["is_opex_pct"],
+                gross_income * (1 - c["OPEX_08"] / 100),
+                gross_income - c["OPEX_08"]
+            ) * c["income_factor"]
+            market_costs = (c["CapexMarketRate_05"] * c["GrossITLoad_02"]) + c["LandPurchaseFees_06"]
+
+            # Senior sizing (size_senior_debt)
+            coupon = c["SeniorCoupon_38"]
+            rate = coupon / 100
+            periods = c["SeniorTenorY_39"]
+            max_debt_service = net_income / c["TargetDSCRSenior_37"]
+            discount = (1 + rate) ** -periods
+            annuity_factor = np.where(rate > 0, (1 - discount) / rate, periods)
+            senior = np.where(
+                c["is_bullet"], max_debt_service / rate,
+                np.where(c["is_annuity"], max_debt_service * annuity_factor, max_debt_service * periods * 0.7)
+            )
+            senior = np.minimum(senior, market_costs * 0.85)
+            senior = np.where(net_income > 0, senior, 0.0)
+
+            debt_service = np.where(
+                c["is_bullet"], senior * rate,
+                np.where((rate > 0) & (periods > 0), senior * rate / (1 - discount),
+                         np.where(periods > 0, senior / periods, 0.0))
+            )
+            dscr = np.where((senior > 0) & (debt_service > 0), net_income / debt_service, 999.0)
+            dscr = np.where(net_income > 0, dscr, 0.0)
+
+            # Mezzanine
+            mezz_coupon = c["MezzCoupon_46"]
+            mezz_dscr = c["TargetDSCRMezz_45"]
+            remaining = net_income - (senior * coupon / 100)
+            mezz = np.minimum(remaining / (mezz_coupon / 100) * mezz_dscr, (market_costs - senior) * 0.15)
+            mezz = np.where((mezz_dscr > 0) & (dscr > mezz_dscr) & (remaining > 0), mezz, 0.0)
+
+            # WACC
+            senior_weight = senior / market_costs
+            mezz_weight = mezz / market_costs
+            wacc = np.where(
+                market_costs == 0, 0.0,
+                senior_weight * coupon + mezz_weight * mezz_coupon +
+                (1 - senior_weight - mezz_weight) * c["EquityIRRTarget_55"]
+            )
+
+            # Equity IRR
+            equity = market_costs - senior - mezz
+            cf_to_equity = net_income - senior * coupon / 100 - mezz * mezz_coupon / 100
+            growth = np.where(
+                c["is_cpi_linked"],
+                np.minimum(np.maximum(c["InflationSpot_33"], c["CPI_FloorPct_63"]), c["CPI_CapPct_64"]),
+                0.0
+            )
+            irr = np.where((equity > 0) & (cf_to_equity > 0), (cf_to_equity / equity) * 100 + growth, 0.0)
+
+        return {
+            "SeniorNotional": senior,
+            "MezzNotional": mezz,
+            "DSCR_Min": dscr,
+            "WACC": wacc,
+            "EquityIRR": irr
+        }
+
+    def _bump_columns(self, base: Dict[str, np.ndarray], factor: str, sign: int) -> Dict[str, np.ndarray]:
+        """Copy base columns with one sensitivity factor shocked"""
+        cols = dict(base)
+        if factor == "CPI":
+            cols["InflationSpot_33"] = base["InflationSpot_33"] + sign * SENSITIVITY_CPI_SHOCK_PCT
+        elif factor == "Rates":
+            shift = sign * base["Rate_Shock_bps_83"] / 100
+            cols["SeniorCoupon_38"] = base["SeniorCoupon_38"] + shift
+            cols["MezzCoupon_46"] = base["MezzCoupon_46"] + shift
+        elif factor == "OPEX":
+            cols["OPEX_08"] = base["OPEX_08"] * (1 + sign * base["OPEX_StressPct_84"] / 100)
+        elif factor == "Rent":
+            cols["GrossMonthlyRent_07"] = base["GrossMonthlyRent_07"] * (1 + sign * base["Rent_DownsidePct_85"] / 100)
+        elif factor == "Delay":
+            # COD delay spreads the lost rent months over the lease term
+            lease_months = np.maximum(base["LeaseTermYears_22"] * 12, 1)
+            cols["income_factor"] = base["income_factor"] * (1 - sign * base["COD_DelayMonths_90"] / lease_months)
+        return cols
+
+    def compute_sensitivities(self, ranked: List[Dict[str, Any]], top_k: int = 20,
+                              factors: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Bump-and-revalue the top-K scenarios for each SensitivityExportSet_115
+        factor. All K x factors x shocks variants go through kpi_kernel as one
+        batch; returns per-factor KPI deltas against the unshocked base.
+        """
+        entries = ranked[:top_k]
+        if not entries:
+            return []
+
+        factors = factors or entries[0]["scenario"].SensitivityExportSet_115
+        base = self.scenario_columns([e["scenario"] for e in entries])
+
+        blocks = [base]
+        labels = []
+        for factor in factors:
+            for label, sign in SENSITIVITY_SHOCKS.get(factor, ()):
+                blocks.append(self._bump_columns(base, factor, sign))
+                labels.append((factor, label))
+
+        batch = {name: np.concatenate([b[name] for b in blocks]) for name in base}
+        kpis = self.kpi_kernel(batch)
+
+        k = len(entries)
+        results = []
+        for i, entry in enumerate(entries):
+            sensitivities = {}
+            for j, (factor, label) in enumerate(labels, 1):
+                row = j * k + i
+                sensitivities.setdefault(factor, {})[label] = {
+                    name: float(kpis[name][row] - kpis[name][i]) for name in SENSITIVITY_KPIS
+                }
+            results.append({
+                "id": entry["id"],
+                "base": {name: float(kpis[name][i]) for name in SENSITIVITY_KPIS},
+                "sensitivities": sensitivities
+            })
+
+        return results
+
     def check_viability(self, scenario: ScenarioState, kpi: KPI) -> bool:
         """Check if scenario meets viability criteria"""
         # Basic viability checks
@@ -489,8 +659,10 @@ class AdvancedPermutationEngine:
     
     def generate_scenarios(self, config: Dict[str, Any], mode: str = "all") -> List[Dict[str, Any]]:
         """Generate permutation scenarios based on configuration"""
-        scenarios = []
-        
+        return list(self.iter_scenarios(config, mode=mode))
+
+    def iter_scenarios(self, config: Dict[str, Any], mode: str = "all") -> Iterator[Dict[str, Any]]:
+        """Lazily generate and evaluate permutation scenarios"""
         # Extract ranges from config
         rent_values = self._get_range_values(config, "GrossMonthlyRent_07", 500000, 5000000, 50000)
         opex_values = self._get_range_values(config, "OPEX_08", 15, 35, 1)
@@ -543,17 +715,15 @@ class AdvancedPermutationEngine:
             # Calculate composite score
             kpi.CompositeScore = self.calculate_composite_score(scenario, kpi)
             
-            scenarios.append({
+            yield {
                 "id": count + 1,
                 "scenario": scenario,
                 "kpis": kpi,
                 "viable": viable,
                 "composite_score": kpi.CompositeScore
-            })
+            }
             
             count += 1
-        
-        return scenarios
     
     def _get_range_values(self, config: Dict[str, Any], field: str, default_min: float, default_max: float, default_step: float) -> List[float]:
         """Get range values for a field from config"""
@@ -587,28 +757,117 @@ class AdvancedPermutationEngine:
         else:  # Composite
             return sorted(scenarios, key=lambda x: x["composite_score"], reverse=True)
 
+    def rank_top_k(self, scenarios: Iterable[Dict[str, Any]], objective: str = "Composite", k: int = 1000,
+                   aggregator: Optional["RunAggregator"] = None) -> List[Dict[str, Any]]:
+        """
+        Stream scenarios into a bounded min-heap and return the best k in the
+        same order rank_scenarios would give them (ties keep generation order).
+        Every scenario is fed to the aggregator before it can be discarded.
+        """
+        if objective == "MaxSeniorRaise":
+            score = lambda x: x["kpis"].SeniorNotional
+        elif objective == "MinWACC":
+            score = lambda x: -x["kpis"].WACC
+        elif objective == "MaxDay1Cash":
+            score = lambda x: x["kpis"].Day1Cash
+        elif objective == "MaxEquityIRR":
+            score = lambda x: x["kpis"].EquityIRR
+        else:  # Composite
+            score = lambda x: x["composite_score"]
+
+        heap = []
+        for order, item in enumerate(scenarios):
+            if aggregator is not None:
+                aggregator.add(item["kpis"], item["viable"])
+            if k <= 0:
+                continue
+            # Earlier scenarios win ties, matching the stable sort
+            entry = (score(item), -order, item)
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            elif entry[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, entry)
+
+        return [item for _, _, item in sorted(heap, key=lambda e: e[:2], reverse=True)]
+
+class RunAggregator:
+    """Exact run-wide KPI statistics (count, sum, min, max) for all and viable scenarios"""
+
+    FIELDS = {
+        "equity_irr": "EquityIRR",
+        "dscr_min": "DSCR_Min",
+        "senior_notional": "SeniorNotional",
+        "wacc": "WACC",
+        "day1_cash": "Day1Cash"
+    }
+
+    def __init__(self):
+        self.groups = {"all": self._empty(), "viable": self._empty()}
+
+    def _empty(self) -> Dict[str, Any]:
+        return {
+            "count": 0,
+            "sum": {name: 0.0 for name in self.FIELDS},
+            "min": {name: math.inf for name in self.FIELDS},
+            "max": {name: -math.inf for name in self.FIELDS}
+        }
+
+    def add(self, kpi: KPI, viable: bool):
+        """Fold one scenario's KPIs into the running statistics"""
+        for group in (("all", "viable") if viable else ("all",)):
+            stats = self.groups[group]
+            stats["count"] += 1
+            for name, attr in self.FIELDS.items():
+                value = getattr(kpi, attr)
+                stats["sum"][name] += value
+                if value < stats["min"][name]:
+                    stats["min"][name] = value
+                if value > stats["max"][name]:
+                    stats["max"][name] = value
+
+    @property
+    def total(self) -> int:
+        return self.groups["all"]["count"]
+
+    @property
+    def viable(self) -> int:
+        return self.groups["viable"]["count"]
+
+    def summary(self) -> Dict[str, float]:
+        """Headline summary over viable scenarios, falling back to all"""
+        stats = self.groups["viable"] if self.viable else self.groups["all"]
+        if not stats["count"]:
+            return {}
+        return {
+            "best_irr": stats["max"]["equity_irr"],
+            "best_dscr": stats["max"]["dscr_min"],
+            "avg_senior": stats["sum"]["senior_notional"] / stats["count"],
+            "best_wacc": stats["min"]["wacc"],
+            "max_senior": stats["max"]["senior_notional"],
+            "max_day1": stats["max"]["day1_cash"]
+        }
+
 def run_advanced_permutation_engine(config: Dict[str, Any]) -> Dict[str, Any]:
     """Main entry point for the advanced permutation engine"""
     engine = AdvancedPermutationEngine(config)
     
-    # Generate scenarios
+    # Stream scenarios through the aggregator, keeping only the top 1000
     mode = config.get("mode", "all")
-    scenarios = engine.generate_scenarios(config, mode=mode)
-    
-    # Rank scenarios
     ranking_objective = config.get("RankingObjective_109", "Composite")
-    ranked = engine.rank_scenarios(scenarios, ranking_objective)
+    aggregator = RunAggregator()
+    ranked = engine.rank_top_k(engine.iter_scenarios(config, mode=mode), ranking_objective,
+                               k=1000, aggregator=aggregator)
     
     # Format output
     output = {
-        "total_scenarios": len(ranked),
-        "viable_count": sum(1 for s in ranked if s["viable"]),
+        "total_scenarios": aggregator.total,
+        "viable_count": aggregator.viable,
         "scenarios": [],
         "summary": {}
     }
     
     # Include top scenarios
-    for scenario in ranked[:1000]:  # Limit output
+    for scenario in ranked:
         output["scenarios"].append({
             "id": scenario["id"],
             "inputs": {
@@ -635,28 +894,10 @@ def run_advanced_permutation_engine(config: Dict[str, Any]) -> Dict[str, Any]:
             "composite_score": scenario["composite_score"]
         })
     
-    # Calculate summary statistics
-    if output["scenarios"]:
-        viable_scenarios = [s for s in output["scenarios"] if s["viable"]]
-        
-        if viable_scenarios:
-            output["summary"] = {
-                "best_irr": max(s["outputs"]["equity_irr"] for s in viable_scenarios),
-                "best_dscr": max(s["outputs"]["dscr_min"] for s in viable_scenarios),
-                "avg_senior": sum(s["outputs"]["senior_notional"] for s in viable_scenarios) / len(viable_scenarios),
-                "best_wacc": min(s["outputs"]["wacc"] for s in viable_scenarios),
-                "max_senior": max(s["outputs"]["senior_notional"] for s in viable_scenarios),
-                "max_day1": max(s["outputs"]["day1_cash"] for s in viable_scenarios)
-            }
-        else:
-            # No viable scenarios, use all
-            output["summary"] = {
-                "best_irr": max(s["outputs"]["equity_irr"] for s in output["scenarios"]) if output["scenarios"] else 0,
-                "best_dscr": max(s["outputs"]["dscr_min"] for s in output["scenarios"]) if output["scenarios"] else 0,
-                "avg_senior": sum(s["outputs"]["senior_notional"] for s in output["scenarios"]) / len(output["scenarios"]) if output["scenarios"] else 0,
-                "best_wacc": min(s["outputs"]["wacc"] for s in output["scenarios"]) if output["scenarios"] else 0,
-                "max_senior": max(s["outputs"]["senior_notional"] for s in output["scenarios"]) if output["scenarios"] else 0,
-                "max_day1": max(s["outputs"]["day1_cash"] for s in output["scenarios"]) if output["scenarios"] else 0
-            }
+    # Bump-and-revalue sensitivities for the leading structures
+    output["sensitivities"] = engine.compute_sensitivities(ranked, top_k=config.get("SensitivityTopK", 20))
+
+    # Summary statistics are exact over every generated scenario
+    output["summary"] = aggregator.summary()
     
-    return output
\ No newline at end of file
+    return output
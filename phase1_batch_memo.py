@@ -0,0 +1,171 @@
+"""
+Phase-1 Batch Memo
+Shared LRU behind DerivedFields.compute_batch in phase1_model_v2 and
+phase1_data_model: input row -> derived row, safe across request threads
+"""
+
+import random
+import threading
+import operator
+import unittest
+from collections import OrderedDict
+from dataclasses import MISSING
+from typing import Dict, List, Any, Union, Callable
+
+import numpy as np
+
+class DerivedBatchMemo:
+    """
+    Memoised batch evaluation of a columnar derivation. Rows are keyed by the
+    tuple of input fields the derivation reads; only misses are passed to
+    compute_columns, hits are gathered from the LRU.
+    """
+
+    def __init__(self, input_cls: type, input_fields: tuple, output_fields: tuple,
+                 enums: Dict[str, type], max_items: int):
+        self.input_cls = input_cls
+        self.input_fields = input_fields
+        self.output_fields = output_fields
+        self.enums = enums
+        self.max_items = max_items
+        self._rows: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def clear(self):
+        with self._lock:
+            self._rows.clear()
+
+    def input_rows(self, projects: Union[List[Any], Dict[str, List[Any]]]) -> List[tuple]:
+        """Per-project tuples of input fields, from input objects or a columnar dict (input_cls defaults filled in)"""
+        if not isinstance(projects, dict):
+            get = operator.attrgetter(*self.input_fields)
+            return [get(p) for p in projects]
+
+        n = len(next(iter(projects.values()))) if projects else 0
+        defaults = {f.name: f.default for f in self.input_cls.__dataclass_fields__.values()}
+        columns = []
+        for name in self.input_fields:
+            if name in projects:
+                column = list(projects[name])
+            elif defaults.get(name, MISSING) is not MISSING:
+                column = [defaults[name]] * n
+            else:
+                raise KeyError(f"Missing required input column: {name}")
+            if name in self.enums:
+                enum = self.enums[name]
+                column = [v if isinstance(v, enum) else enum(v) for v in column]
+            columns.append(column)
+        return list(zip(*columns))
+
+    def compute(self, projects: Union[List[Any], Dict[str, List[Any]]],
+                compute_columns: Callable[[Dict[str, tuple]], Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+        """One array per output field for projects; the lock is not held while computing"""
+        keys = self.input_rows(projects)
+        hits, misses, rows = [], [], []
+        # Hit rows are copied out under the lock so a concurrent eviction cannot lose them
+        with self._lock:
+            for i, key in enumerate(keys):
+                row = self._rows.get(key)
+                if row is None:
+                    misses.append(i)
+                else:
+                    self._rows.move_to_end(key)
+                    hits.append(i)
+                    rows.append(row)
+
+        todo = keys if not hits else [keys[i] for i in misses]
+        computed = compute_columns(dict(zip(self.input_fields, zip(*todo))))
+        with self._lock:
+            self._rows.update(zip(todo, zip(*(computed[name].tolist() for name in self.output_fields))))
+            while len(self._rows) > max(self.max_items, len(keys)):
+                self._rows.popitem(last=False)
+
+        if not hits:
+            return computed
+        out = {}
+        for name, cached in zip(self.output_fields, zip(*rows)):
+            out[name] = np.empty(len(keys), dtype=computed[name].dtype)
+            out[name][hits] = cached
+            out[name][misses] = computed[name]
+        return out
+
+# ==================== TESTS ====================
+# python -m unittest phase1_batch_memo
+
+def _random_projects(model, n: int, seed: int) -> list:
+    """Random ProjectInputs of a model module, covering every rent source, rating and currency"""
+    rng = random.Random(seed)
+    projects = []
+    for _ in range(n):
+        source = rng.randrange(3)
+        projects.append(model.ProjectInputs(
+            title="parity", country=rng.choice(["UK", "US", "EU", "JP"]),
+            currency=rng.choice(list(model.Currency)),
+            gross_it_load_mw=round(rng.uniform(1, 200), rng.randrange(4)),
+            pue=round(rng.uniform(0.95, 1.5), 3),
+            lease_years=rng.randrange(5, 31),
+            tenant_rating=rng.choice(list(model.TenantRating)),
+            opex_pct=round(rng.uniform(0, 0.3), 4),
+            capex_cost_per_mw=rng.uniform(5e6, 12e6),
+            land_fees_total=rng.uniform(0, 5e7),
+            gross_monthly_rent=rng.uniform(1e5, 9e6) if source == 0 else None,
+            rent_per_kwh_month=rng.uniform(0.05, 0.3) if source == 1 else None,
+            arranger_fee_pct=rng.choice([0.0125, 0.01, 0.015]),
+        ))
+    return projects
+
+class TestDerivedBatchParity(unittest.TestCase):
+    """compute_batch equals compute_from_inputs field for field, cold, warm and mixed memo"""
+
+    def _check(self, model):
+        model._derived_memo.clear()
+        projects = _random_projects(model, 2000, seed=41)
+        scalar = [model.DerivedFields.compute_from_inputs(p) for p in projects]
+        columnar = {f: [getattr(p, f) for p in projects] for f in model.DERIVED_INPUT_FIELDS}
+        mixed = projects[::2] + _random_projects(model, 500, seed=42)
+
+        for batch, expected in (
+            (model.DerivedFields.compute_batch(projects), scalar),          # cold
+            (model.DerivedFields.compute_batch(projects), scalar),          # all hits
+            (model.DerivedFields.compute_batch(columnar), scalar),          # columnar input
+            (model.DerivedFields.compute_batch(mixed),
+             [model.DerivedFields.compute_from_inputs(p) for p in mixed]),  # hits and misses
+        ):
+            for name in model.DERIVED_BATCH_FIELDS:
+                self.assertEqual(batch[name].tolist(), [getattr(d, name) for d in expected], name)
+
+    def test_model_v2_parity(self):
+        import phase1_model_v2
+        self._check(phase1_model_v2)
+
+    def test_data_model_parity(self):
+        import phase1_data_model
+        self._check(phase1_data_model)
+
+    def test_concurrent_batches(self):
+        """Threads sharing a small memo never fail and always get their own rows"""
+        import phase1_model_v2 as model
+        memo = DerivedBatchMemo(model.ProjectInputs, model.DERIVED_INPUT_FIELDS, model.DERIVED_BATCH_FIELDS,
+                                {"tenant_rating": model.TenantRating, "currency": model.Currency}, max_items=50)
+        batches = [_random_projects(model, 40, seed=s % 6) for s in range(24)]
+        errors = []
+
+        def worker(projects):
+            try:
+                for _ in range(20):
+                    out = memo.compute(projects, model.DerivedFields._compute_columns)
+                    expected = [model.DerivedFields.compute_from_inputs(p).noi_m for p in projects]
+                    if out["noi_m"].tolist() != expected:
+                        errors.append("mismatch")
+            except Exception as e:
+                errors.append(repr(e))
+
+        threads = [threading.Thread(target=worker, args=(b,)) for b in batches]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
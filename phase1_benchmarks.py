@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+"""
+Phase-1 Benchmarks
+Throughput of batch code paths against their per-call equivalents, and the
+cold-start (import) cost of the web app
+
+    python phase1_benchmarks.py [gates] [results] [--n ROWS] [--json]
+    python phase1_benchmarks.py --cold-start [--json]
+    python -m unittest phase1_benchmarks
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import tempfile
+import unittest
+from typing import Dict, Any, Callable, List
+
+import numpy as np
+
+from phase1_model_v2 import (
+    ProjectInputs, DerivedFields, ValidationGates, Currency, TenantRating,
+    PermutationResult, PermutationResultTable, InputSource, ViabilityTier, export_top_structures
+)
+
+def _timed(fn: Callable[[], Any], repeat: int = 3) -> float:
+    """Best wall time of fn over repeat runs"""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def _sample_project() -> DerivedFields:
+    inputs = ProjectInputs(
+        title="Benchmark DC", country="UK", currency=Currency.GBP,
+        gross_it_load_mw=60.0, pue=1.25, lease_years=25, tenant_rating=TenantRating.A,
+        opex_pct=0.05, capex_cost_per_mw=9_000_000, land_fees_total=20_000_000,
+        gross_monthly_rent=4_500_000
+    )
+    return DerivedFields.compute_from_inputs(inputs)
+
+def _sample_structures(n: int, derived: DerivedFields, seed: int = 7) -> Dict[str, np.ndarray]:
+    """Random candidate structures spread across every gate's pass/fail boundary"""
+    rng = np.random.default_rng(seed)
+    return {
+        "senior_amount": rng.uniform(0.6, 1.2, n) * derived.funding_need,
+        "mezz_amount": rng.choice([0.0, 0.05, 0.10], n) * derived.funding_need,
+        "senior_tenor": rng.integers(10, 31, n),
+        "advance_factor": rng.uniform(0.45, 0.85, n),
+        "min_dscr_senior": rng.uniform(1.0, 1.6, n),
+        "cpi_0_stress_dscr": rng.uniform(0.9, 1.4, n),
+        "wal_years": rng.uniform(5.0, 20.0, n),
+        "dsra_months": rng.choice([0, 3, 6], n),
+    }
+
+def bench_gates(n: int = 100_000, shown: int = 20) -> Dict[str, Any]:
+    """ValidationGates: per-structure dict path vs evaluate_batch plus explaining the shown rows"""
+    derived = _sample_project()
+    cols = _sample_structures(n, derived)
+    rows = [dict(zip(cols, values)) for values in zip(*(c.tolist() for c in cols.values()))]
+
+    def per_call():
+        return [(ValidationGates.gate_a_feasibility(s, derived), ValidationGates.gate_b_credit(s, derived))
+                for s in rows]
+
+    def batch():
+        res = ValidationGates.evaluate_batch(cols, derived)
+        for i in np.flatnonzero(res.passed)[:shown]:
+            res.explain(int(i))
+        return res
+
+    # Parity: batch masks agree with the scalar gates on every row
+    scalar = per_call()
+    res = batch()
+    parity = (
+        [a["pass"] for a, _ in scalar] == res.gate_a.tolist() and
+        [b["pass"] for _, b in scalar] == res.gate_b.tolist() and
+        [a["near_miss"] for a, _ in scalar] == res.near_miss.tolist()
+    )
+
+    t_call, t_batch = _timed(per_call), _timed(batch)
+    return {
+        "benchmark": "gates",
+        "rows": n,
+        "parity": parity,
+        "pass_rate": round(float(res.passed.mean()), 4),
+        "reason_counts": res.reason_counts(),
+        "per_call_rows_per_s": round(n / t_call),
+        "batch_rows_per_s": round(n / t_batch),
+        "speedup": round(t_call / t_batch, 1),
+    }
+
+def _sample_results(n: int, seed: int = 7) -> Dict[str, Any]:
+    """Result columns with heavy value ties so top-K ordering is exercised"""
+    rng = np.random.default_rng(seed)
+    tiers = list(ViabilityTier)
+    return {
+        "permutation_id": [f"perm-{i:08d}" for i in range(n)],
+        "seed": seed, "chunk_id": [f"chunk-{i // 10_000}" for i in range(n)],
+        "ruleset_version": "bench", "range_signature": "bench",
+        "senior_dscr": rng.uniform(1.1, 1.5, n), "senior_coupon": rng.choice([0.04, 0.05, 0.06], n),
+        "senior_tenor": rng.integers(10, 31, n), "senior_amount": rng.uniform(1e7, 6e7, n),
+        "senior_source": InputSource.MIN_MAX,
+        "day_one_value_core": np.round(rng.uniform(0, 5e6, n), -5), "gross_sidecar_value": rng.uniform(0, 2e5, n),
+        "sidecar_haircut_pct": 0.1, "net_sidecar_value": rng.choice([0.0, 9e4], n),
+        "tier": [tiers[t] for t in rng.integers(0, len(tiers), n)],
+        "min_dscr_senior": rng.uniform(1.1, 1.5, n), "wal_years": rng.uniform(5.0, 15.0, n),
+        "advance_factor": rng.uniform(0.5, 0.8, n),
+        "gate_a_pass": True, "gate_a_reason": "ok", "gate_b_pass": True, "gate_b_reason": "ok",
+        "repo_eligible": rng.random(n) < 0.5, "repo_reason": "",
+        "cpi_0_dscr": rng.uniform(1.0, 1.3, n), "cpi_18_dscr": rng.uniform(1.1, 1.4, n),
+        "cpi_25_dscr": rng.uniform(1.1, 1.4, n),
+    }
+
+def bench_results(n: int = 100_000, top_n: int = 20) -> Dict[str, Any]:
+    """Top-N export: sorted list of PermutationResult vs partial selection on PermutationResultTable"""
+    table = PermutationResultTable(capacity=n)
+    table.append_block(_sample_results(n))
+    results = [table.row(i) for i in range(n)]
+
+    parity = export_top_structures(results, top_n) == export_top_structures(table, top_n)
+    t_call = _timed(lambda: export_top_structures(results, top_n))
+    t_batch = _timed(lambda: export_top_structures(table, top_n))
+    return {
+        "benchmark": "results",
+        "rows": n,
+        "parity": parity,
+        "table_bytes_per_row": round(table.nbytes / n, 1),
+        "per_call_rows_per_s": round(n / t_call),
+        "batch_rows_per_s": round(n / t_batch),
+        "speedup": round(t_call / t_batch, 1),
+    }
+
+# Budgets for a fresh `import app`; a worker pays this on every cold start
+COLD_START_BUDGET_S = float(os.environ.get("APP_COLD_START_BUDGET_S", "1.2"))
+COLD_START_RSS_BUDGET_MB = float(os.environ.get("APP_COLD_START_RSS_BUDGET_MB", "85"))
+
+_COLD_START_SCRIPT = """
+import sys, time, json
+sys.path.insert(0, {path!r})
+t0 = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - t0
+try:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+except ImportError:
+    rss = None
+print("COLD_START " + json.dumps([elapsed, rss]))
+"""
+
+def _import_app(module: str, importtime: bool = False) -> subprocess.CompletedProcess:
+    """Import module in a fresh interpreter from an empty cwd, so files the app creates on import land there"""
+    script = _COLD_START_SCRIPT.format(path=os.path.dirname(os.path.abspath(__file__)), module=module)
+    args = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", script]
+    with tempfile.TemporaryDirectory() as cwd:
+        proc = subprocess.run(args, cwd=cwd, capture_output=True, text=True, timeout=120)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    return proc
+
+def _parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """-X importtime lines as {module, depth, self_ms, cumulative_ms}"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_ms": round(int(self_us) / 1000, 1),
+            "cumulative_ms": round(int(cumulative_us) / 1000, 1),
+        })
+    return rows
+
+def profile_cold_start(module: str = "app", repeat: int = 3, top: int = 15) -> Dict[str, Any]:
+    """Wall time and peak RSS of a fresh import (best of repeat) plus the costliest imports it pulls in"""
+    runs = []
+    for _ in range(repeat):
+        out = _import_app(module).stdout
+        runs.append(json.loads(out[out.rindex("COLD_START ") + len("COLD_START "):].splitlines()[0]))
+    elapsed = min(r[0] for r in runs)
+    rss = min(r[1] for r in runs) if runs[0][1] is not None else None
+
+    rows = _parse_importtime(_import_app(module, importtime=True).stderr)
+    # importtime lists children before their parent: the module's direct imports
+    # are the depth-1 rows between it and the preceding top-level import
+    end = next(i for i, r in enumerate(rows) if r["module"] == module and r["depth"] == 0)
+    start = end
+    while start > 0 and rows[start - 1]["depth"] > 0:
+        start -= 1
+    own, tree = rows[end], rows[start:end + 1]
+    direct = [r for r in tree if r["depth"] == 1]
+    return {
+        "benchmark": "cold_start",
+        "module": module,
+        "import_s": round(elapsed, 3),
+        "peak_rss_mb": round(rss, 1) if rss is not None else None,
+        "budget_s": COLD_START_BUDGET_S,
+        "budget_rss_mb": COLD_START_RSS_BUDGET_MB,
+        "module_self_ms": own["self_ms"],
+        "modules_loaded": len(tree),
+        "direct_imports": sorted(direct, key=lambda r: -r["cumulative_ms"])[:top],
+        "slowest_self": sorted(tree, key=lambda r: -r["self_ms"])[:top],
+    }
+
+class TestColdStartBudget(unittest.TestCase):
+    """Guards lazy imports in app.py: heavy dependencies must stay off the import path"""
+
+    def test_app_import_within_budget(self):
+        profile = profile_cold_start(repeat=3, top=5)
+        heaviest = ", ".join(f"{r['module']} {r['cumulative_ms']}ms" for r in profile["direct_imports"])
+        self.assertLess(profile["import_s"], COLD_START_BUDGET_S,
+                        f"import app took {profile['import_s']}s (heaviest: {heaviest})")
+        if profile["peak_rss_mb"] is not None:
+            self.assertLess(profile["peak_rss_mb"], COLD_START_RSS_BUDGET_MB,
+                            f"import app peaked at {profile['peak_rss_mb']}MB (heaviest: {heaviest})")
+
+    def test_heavy_dependencies_not_imported(self):
+        loaded = {r["module"] for r in _parse_importtime(_import_app("app", importtime=True).stderr)}
+        for module in ("pandas", "requests", "pymongo", "openpyxl"):
+            self.assertNotIn(module, loaded, f"{module} is imported when app is imported")
+
+BENCHMARKS = {
+    "gates": bench_gates,
+    "results": bench_results,
+}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Phase-1 batch path benchmarks")
+    parser.add_argument("names", nargs="*", metavar="name", help=f"one of {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--n", type=int, default=100_000, help="rows per benchmark")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--cold-start", action="store_true", help="profile a fresh `import app` instead")
+    args = parser.parse_args(argv)
+    if args.cold_start:
+        profile = profile_cold_start()
+        if args.json:
+            print(json.dumps(profile, indent=2))
+            return
+        rss = f"{profile['peak_rss_mb']}MB" if profile["peak_rss_mb"] is not None else "n/a"
+        print(f"[BENCH] cold start: import {profile['module']} {profile['import_s']}s "
+              f"(budget {profile['budget_s']}s), peak RSS {rss} (budget {profile['budget_rss_mb']}MB), "
+              f"{profile['modules_loaded']} modules")
+        for r in profile["direct_imports"]:
+            print(f"[BENCH]   {r['module']:<32} {r['cumulative_ms']:>8.1f} ms")
+        return
+    unknown = sorted(set(args.names) - set(BENCHMARKS))
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    results = [BENCHMARKS[name](args.n) for name in args.names or BENCHMARKS]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for r in results:
+        print(f"[BENCH] {r['benchmark']}: {r['rows']:,} rows, parity={'OK' if r['parity'] else 'FAIL'}")
+        print(f"[BENCH]   per-call {r['per_call_rows_per_s']:>12,} rows/s")
+        print(f"[BENCH]   batch    {r['batch_rows_per_s']:>12,} rows/s  ({r['speedup']}x)")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,8 +15,11 @@ from datetime import datetime
 from typing import Dict, List, Tuple, Optional, Any
 from enum import Enum
 import unittest
+from unittest import mock
 from dataclasses import dataclass
 
+import numpy as np
+
 from feature_flags import is_feature_enabled
 from observability import metrics_collector, structured_logger, performance_tracker
 
@@ -77,6 +80,147 @@ class ViabilityResult:
     near_miss_tier: Optional[ViabilityTier]
     reasons: List[str]
 
+# Histogram values recorded per batch: MetricsCollector only retains the most recent ones anyway
+BATCH_HISTOGRAM_TAIL = 500
+
+def _batch_columns(records, defaults: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """
+    Float columns from a list of dicts or a dict of equal-length columns,
+    with missing keys taking the same defaults as the per-call dict.get()
+    """
+    if isinstance(records, dict):
+        n = max((len(v) for v in records.values()), default=0)
+        return {k: np.asarray(records[k], dtype=float) if k in records else np.full(n, d, dtype=float)
+                for k, d in defaults.items()}
+    return {k: np.fromiter((r.get(k, d) for r in records), dtype=float, count=len(records))
+            for k, d in defaults.items()}
+
+def _batch_values(records, key: str, default: Any) -> List[Any]:
+    """Raw per-row values of one (non-numeric) field, as _batch_columns"""
+    if isinstance(records, dict):
+        return list(records[key]) if key in records else [default] * len(next(iter(records.values()), ()))
+    return [r.get(key, default) for r in records]
+
+def _record_batch_histogram(metric_name: str, values: np.ndarray):
+    for value in values[-BATCH_HISTOGRAM_TAIL:].tolist():
+        metrics_collector.record_histogram(metric_name, value)
+
+@dataclass
+class DSCRBatchResult:
+    """Reverse DSCR results for a batch, one array entry per deal"""
+    dscr_value: np.ndarray
+    calculated_ltv: np.ndarray
+    max_additional_debt: np.ndarray
+    confidence_score: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.dscr_value)
+
+    def result(self, i: int) -> DSCRResult:
+        """Row i as the DSCRResult calculate_reverse_dscr returns"""
+        ltv = float(self.calculated_ltv[i])
+        return DSCRResult(
+            dscr_value=float(self.dscr_value[i]),
+            input_ltv=ltv,
+            calculated_ltv=ltv,
+            is_reverse_calculated=True,
+            confidence_score=float(self.confidence_score[i])
+        )
+
+    def results(self) -> List[DSCRResult]:
+        return [self.result(i) for i in range(len(self))]
+
+# Repo eligibility rules in check order, with the score each one adds when passed
+REPO_RULES = ('min_property_value', 'max_ltv', 'min_dscr', 'documentation', 'property_type')
+REPO_RULE_POINTS = (20, 25, 25, 20, 10)
+
+@dataclass
+class EligibilityBatchResult:
+    """Repo eligibility results for a batch; passed holds one bit per REPO_RULES entry"""
+    jurisdictions: List[RepoJurisdiction]
+    jurisdiction_codes: np.ndarray
+    passed: np.ndarray
+    score: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.passed)
+
+    @property
+    def is_eligible(self) -> np.ndarray:
+        return self.passed == (1 << len(REPO_RULES)) - 1
+
+    def result(self, i: int) -> EligibilityResult:
+        """Row i as the EligibilityResult check_eligibility returns"""
+        bits = int(self.passed[i])
+        return EligibilityResult(
+            jurisdiction=self.jurisdictions[self.jurisdiction_codes[i]],
+            is_eligible=bool(self.is_eligible[i]),
+            rules_passed=[name for b, name in enumerate(REPO_RULES) if bits >> b & 1],
+            rules_failed=[name for b, name in enumerate(REPO_RULES) if not bits >> b & 1],
+            score=int(self.score[i])
+        )
+
+    def results(self) -> List[EligibilityResult]:
+        return [self.result(i) for i in range(len(self))]
+
+@dataclass
+class ViabilityBatchResult:
+    """Viability tiers for a batch; tier codes index list(ViabilityTier), -1 for no near-miss tier"""
+    tier_codes: np.ndarray
+    score: np.ndarray
+    is_near_miss: np.ndarray
+    near_miss_codes: np.ndarray
+    dscr: np.ndarray
+    ltv: np.ndarray
+    engine: 'ViabilityTieringEngine'
+
+    def __len__(self) -> int:
+        return len(self.score)
+
+    def result(self, i: int) -> ViabilityResult:
+        """Row i as the ViabilityResult calculate_viability_tier returns (reasons built here)"""
+        tiers = list(ViabilityTier)
+        score = float(self.score[i])
+        score = 100 if score >= 100 else score  # min(100, score) keeps the int cap
+        tier = tiers[self.tier_codes[i]]
+        near_miss = int(self.near_miss_codes[i])
+        return ViabilityResult(
+            tier=tier,
+            score=score,
+            is_near_miss=bool(self.is_near_miss[i]),
+            near_miss_tier=tiers[near_miss] if near_miss >= 0 else None,
+            reasons=self.engine._generate_tier_reasons(
+                {'dscr': float(self.dscr[i]), 'ltv': float(self.ltv[i])}, score, tier)
+        )
+
+    def results(self) -> List[ViabilityResult]:
+        return [self.result(i) for i in range(len(self))]
+
+HIERARCHY_PREVIOUS_REF = '$previous'  # diff value standing for the previous step's whole data
+
+def _step_diff(previous: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
+    """Top-level changes turning the previous step's data into this step's"""
+    changed = {}
+    for k, v in data.items():
+        if v is previous or v == previous:
+            changed[k] = HIERARCHY_PREVIOUS_REF
+        elif k not in previous or previous[k] != v:
+            changed[k] = v
+    return {'set': changed, 'unset': [k for k in previous if k not in data]}
+
+def expand_hierarchy_steps(steps: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Full per-step data snapshots rebuilt from process_input's diffed hierarchy_steps"""
+    snapshots, previous = [], None
+    for step in steps:
+        if 'data' in step:
+            data = step['data']
+        else:
+            data = {k: v for k, v in previous.items() if k not in step['diff']['unset']}
+            data.update({k: previous if v == HIERARCHY_PREVIOUS_REF else v for k, v in step['diff']['set'].items()})
+        snapshots.append({**{k: v for k, v in step.items() if k != 'diff'}, 'data': data})
+        previous = data
+    return snapshots
+
 class InputHierarchyProcessor:
     """
     Processes inputs through hierarchy: Manual → Min/Max → Variations
@@ -110,35 +254,33 @@ class InputHierarchyProcessor:
             }
 
             start_time = time.time()
+            timestamp = datetime.utcnow().isoformat()
+
+            def add_step(level: InputLevel, data: Dict[str, Any], previous=None):
+                # First step carries its data; later ones only the diff from the step before
+                step = {'level': level.value, 'timestamp': timestamp}
+                if previous is None:
+                    step['data'] = data
+                else:
+                    step['diff'] = _step_diff(previous, data)
+                result['hierarchy_steps'].append(step)
 
             try:
                 # Step 1: Manual input processing
                 manual_result = self._process_manual_input(input_data)
-                result['hierarchy_steps'].append({
-                    'level': InputLevel.MANUAL.value,
-                    'data': manual_result,
-                    'timestamp': datetime.utcnow().isoformat()
-                })
+                add_step(InputLevel.MANUAL, manual_result)
 
                 # Step 2: Min/Max processing
                 if input_data.input_level in [InputLevel.MIN_MAX, InputLevel.VARIATIONS]:
                     minmax_result = self._process_min_max(manual_result, input_data)
-                    result['hierarchy_steps'].append({
-                        'level': InputLevel.MIN_MAX.value,
-                        'data': minmax_result,
-                        'timestamp': datetime.utcnow().isoformat()
-                    })
+                    add_step(InputLevel.MIN_MAX, minmax_result, manual_result)
                 else:
                     minmax_result = manual_result
 
                 # Step 3: Variations processing
                 if input_data.input_level == InputLevel.VARIATIONS:
                     variations_result = self._process_variations(minmax_result, input_data)
-                    result['hierarchy_steps'].append({
-                        'level': InputLevel.VARIATIONS.value,
-                        'data': variations_result,
-                        'timestamp': datetime.utcnow().isoformat()
-                    })
+                    add_step(InputLevel.VARIATIONS, variations_result, minmax_result)
                     result['final_data'] = variations_result
                 else:
                     result['final_data'] = minmax_result
@@ -271,6 +413,63 @@ class ReverseDSCREngine:
                 )
                 raise
 
+    def calculate_reverse_dscr_batch(self, target_dscr, cashflow, existing_debt,
+                                    user_email: str, is_admin: bool) -> DSCRBatchResult:
+        """
+        calculate_reverse_dscr over arrays of deals (scalars broadcast), with
+        the feature-flag check, tracking and logging done once per batch
+
+        Returns:
+            DSCRBatchResult; .result(i) equals the per-call DSCRResult
+        """
+        if not is_feature_enabled('reverse_dscr_engine', user_email, is_admin):
+            raise ValueError('Reverse DSCR engine not available')
+
+        batch_id = str(uuid.uuid4())[:8]
+
+        with performance_tracker.track_operation('reverse_dscr_calculation_batch', batch_id):
+            try:
+                target_dscr, cashflow, existing_debt = np.broadcast_arrays(
+                    *(np.asarray(v, dtype=float) for v in (target_dscr, cashflow, existing_debt)))
+                target_dscr, cashflow, existing_debt = (np.atleast_1d(v) for v in (target_dscr, cashflow, existing_debt))
+                if (target_dscr == 0).any() or (cashflow == 0).any():
+                    raise ZeroDivisionError('float division by zero')
+
+                max_additional_debt = cashflow / target_dscr - existing_debt
+                ltv = max_additional_debt / (cashflow * 10)
+                calculated_ltv = np.where(ltv < 0.85, ltv, 0.85)
+
+                confidence_score = np.select(
+                    [(target_dscr < 1.0) | (target_dscr > 3.0), (cashflow <= 0) | (existing_debt < 0)],
+                    [0.5, 0.2], default=0.9)
+
+                result = DSCRBatchResult(
+                    dscr_value=target_dscr,
+                    calculated_ltv=calculated_ltv,
+                    max_additional_debt=max_additional_debt,
+                    confidence_score=confidence_score
+                )
+
+                metrics_collector.increment_counter('reverse_dscr_calculations', len(result))
+                _record_batch_histogram('dscr_target_values', target_dscr)
+
+                self.logger.info(
+                    "Reverse DSCR batch calculation completed",
+                    permutation_id=batch_id,
+                    batch_size=len(result),
+                    mean_confidence_score=float(confidence_score.mean()) if len(result) else None
+                )
+
+                return result
+
+            except Exception as e:
+                self.logger.error(
+                    "Reverse DSCR batch calculation failed",
+                    permutation_id=batch_id,
+                    error=str(e)
+                )
+                raise
+
     def _calculate_confidence(self, target_dscr: float, cashflow: float, existing_debt: float) -> float:
         """Calculate confidence score for the calculation"""
         # Simplified confidence calculation
@@ -289,6 +488,17 @@ class RepoEligibilityEngine:
     def __init__(self):
         self.logger = structured_logger
         self.rules = self._initialize_rules()
+        self._compile_rules()
+
+    def _compile_rules(self):
+        """Per-jurisdiction thresholds as arrays indexed by jurisdiction code"""
+        self.jurisdictions = list(self.rules)
+        self._codes = {j: code for code, j in enumerate(self.jurisdictions)}
+        self._min_property_value = np.array([r['min_property_value'] for r in self.rules.values()], dtype=float)
+        self._max_ltv = np.array([r['max_ltv'] for r in self.rules.values()], dtype=float)
+        self._min_dscr = np.array([r['min_dscr'] for r in self.rules.values()], dtype=float)
+        self._required_docs = [frozenset(r['required_documentation']) for r in self.rules.values()]
+        self._restricted_types = [frozenset(r['restricted_property_types']) for r in self.rules.values()]
 
     def _initialize_rules(self) -> Dict[RepoJurisdiction, Dict[str, Any]]:
         """Initialize eligibility rules for each jurisdiction"""
@@ -424,6 +634,86 @@ class RepoEligibilityEngine:
                 )
                 raise
 
+    def check_eligibility_batch(self, jurisdiction, properties,
+                                user_email: str, is_admin: bool) -> EligibilityBatchResult:
+        """
+        check_eligibility over many properties, with the feature-flag check,
+        tracking and logging done once per batch
+
+        Args:
+            jurisdiction: One RepoJurisdiction for all rows, or one per row
+            properties: List of property dicts, or a dict of columns
+            user_email: User email for feature flag check
+            is_admin: Whether user is admin
+
+        Returns:
+            EligibilityBatchResult; .result(i) equals the per-call EligibilityResult
+        """
+        if not is_feature_enabled('repo_eligibility_rules', user_email, is_admin):
+            raise ValueError('Repository eligibility engine not available')
+
+        batch_id = str(uuid.uuid4())[:8]
+
+        with performance_tracker.track_operation('repo_eligibility_check_batch', batch_id):
+            try:
+                cols = _batch_columns(properties, {'property_value': 0, 'ltv': 1.0, 'dscr': 0})
+                n = len(cols['ltv'])
+                if isinstance(jurisdiction, RepoJurisdiction):
+                    codes = np.full(n, self._codes[jurisdiction], dtype=np.int8)
+                else:
+                    codes = np.fromiter((self._codes[j] for j in jurisdiction), dtype=np.int8, count=n)
+
+                docs = _batch_values(properties, 'documentation', [])
+                types = _batch_values(properties, 'property_type', '')
+                checks = (
+                    cols['property_value'] >= self._min_property_value[codes],
+                    cols['ltv'] <= self._max_ltv[codes],
+                    cols['dscr'] >= self._min_dscr[codes],
+                    np.fromiter((self._required_docs[c].issubset(d) for c, d in zip(codes.tolist(), docs)),
+                                dtype=bool, count=n),
+                    np.fromiter((t.lower() not in self._restricted_types[c] for c, t in zip(codes.tolist(), types)),
+                                dtype=bool, count=n),
+                )
+                passed = np.zeros(n, dtype=np.int8)
+                score = np.zeros(n, dtype=np.int64)
+                for bit, (ok, points) in enumerate(zip(checks, REPO_RULE_POINTS)):
+                    passed |= ok.astype(np.int8) << bit
+                    score += ok * points
+
+                result = EligibilityBatchResult(
+                    jurisdictions=self.jurisdictions,
+                    jurisdiction_codes=codes,
+                    passed=passed,
+                    score=score
+                )
+
+                eligible = int(result.is_eligible.sum())
+                metrics_collector.increment_counter('repo_eligibility_checks', n)
+                for code, count in enumerate(np.bincount(codes, minlength=len(self.jurisdictions)).tolist()):
+                    if count:
+                        metrics_collector.increment_counter(f'repo_eligibility_{self.jurisdictions[code].value}', count)
+                if eligible:
+                    metrics_collector.increment_counter('repo_eligibility_passed', eligible)
+                if n - eligible:
+                    metrics_collector.increment_counter('repo_eligibility_failed', n - eligible)
+
+                self.logger.info(
+                    "Repository eligibility batch check completed",
+                    permutation_id=batch_id,
+                    batch_size=n,
+                    eligible=eligible
+                )
+
+                return result
+
+            except Exception as e:
+                self.logger.error(
+                    "Repository eligibility batch check failed",
+                    permutation_id=batch_id,
+                    error=str(e)
+                )
+                raise
+
 class ViabilityTieringEngine:
     """
     Viability tiering from Not Viable → Diamond with near-miss capture
@@ -511,6 +801,88 @@ class ViabilityTieringEngine:
                 )
                 raise
 
+    def calculate_viability_tier_batch(self, deals, user_email: str, is_admin: bool) -> ViabilityBatchResult:
+        """
+        calculate_viability_tier over many deals (list of dicts or dict of
+        columns), with the feature-flag check, tracking and logging done once
+        per batch
+
+        Returns:
+            ViabilityBatchResult; .result(i) equals the per-call ViabilityResult
+        """
+        if not is_feature_enabled('viability_tiering', user_email, is_admin):
+            raise ValueError('Viability tiering engine not available')
+
+        batch_id = str(uuid.uuid4())[:8]
+
+        with performance_tracker.track_operation('viability_tier_calculation_batch', batch_id):
+            try:
+                cols = _batch_columns(deals, {
+                    'dscr': 0, 'ltv': 1.0, 'credit_score': 0,
+                    'property_quality_score': 0, 'market_conditions_score': 0
+                })
+                score = self._calculate_viability_scores(cols)
+
+                # Tier: highest threshold the score reaches (NaN reaches none)
+                tiers = list(ViabilityTier)
+                thresholds = np.array([self.tier_thresholds[t] for t in tiers], dtype=float)
+                tier_codes = np.searchsorted(thresholds, score, side='right') - 1
+                tier_codes = np.where(np.isnan(score) | (tier_codes < 0), 0, tier_codes).astype(np.int8)
+
+                # Near miss: within 5 points of the next tier up
+                next_codes = tier_codes + 1
+                has_next = next_codes < len(tiers)
+                is_near_miss = has_next & (score >= thresholds[np.minimum(next_codes, len(tiers) - 1)] - 5)
+                near_miss_codes = np.where(is_near_miss, next_codes, -1).astype(np.int8)
+
+                result = ViabilityBatchResult(
+                    tier_codes=tier_codes,
+                    score=score,
+                    is_near_miss=is_near_miss,
+                    near_miss_codes=near_miss_codes,
+                    dscr=cols['dscr'],
+                    ltv=cols['ltv'],
+                    engine=self
+                )
+
+                near_misses = int(is_near_miss.sum())
+                if near_misses:
+                    metrics_collector.increment_counter('near_miss_captures', near_misses)
+                metrics_collector.increment_counter('viability_tier_assignments', len(result))
+                for code, count in enumerate(np.bincount(tier_codes, minlength=len(tiers)).tolist()):
+                    if count:
+                        metrics_collector.increment_counter(f'viability_tier_{tiers[code].value}', count)
+                _record_batch_histogram('viability_scores', score)
+
+                self.logger.info(
+                    "Viability tier batch calculation completed",
+                    permutation_id=batch_id,
+                    batch_size=len(result),
+                    near_misses=near_misses
+                )
+
+                return result
+
+            except Exception as e:
+                self.logger.error(
+                    "Viability tier batch calculation failed",
+                    permutation_id=batch_id,
+                    error=str(e)
+                )
+                raise
+
+    def _calculate_viability_scores(self, cols: Dict[str, np.ndarray]) -> np.ndarray:
+        """_calculate_viability_score over columns, summing in the same order"""
+        dscr, ltv, credit = cols['dscr'], cols['ltv'], cols['credit_score']
+        score = np.select([dscr >= 1.5, dscr >= 1.25, dscr >= 1.0], [30, 20, 10], default=0).astype(float)
+        score += np.select([ltv <= 0.65, ltv <= 0.75, ltv <= 0.85], [25, 20, 15], default=0)
+        score += np.select([credit >= 750, credit >= 700, credit >= 650], [20, 15, 10], default=0)
+        property_score = cols['property_quality_score'] / 10
+        score += np.where(property_score < 15, property_score, 15)
+        market = cols['market_conditions_score']
+        score += np.where(market < 10, market, 10)
+        return np.where(score < 100, score, 100)
+
     def _calculate_viability_score(self, deal_data: Dict[str, Any]) -> float:
         """Calculate overall viability score from deal data"""
         score = 0
@@ -646,6 +1018,49 @@ class TestReverseDSCREngine(unittest.TestCase):
         self.assertEqual(result.dscr_value, 0.5)
         self.assertLess(result.confidence_score, 0.8)
 
+    def test_batch_matches_per_call(self):
+        """Test batch results equal the per-call results row by row"""
+        targets, cashflows, debts = [1.25, 1.5, 0.5], [100000, 120000, 100000], [50000, 0, 50000]
+        batch = self.engine.calculate_reverse_dscr_batch(
+            targets, cashflows, debts, user_email=self.test_user, is_admin=self.is_admin
+        )
+        single = [
+            self.engine.calculate_reverse_dscr(t, c, d, user_email=self.test_user, is_admin=self.is_admin)
+            for t, c, d in zip(targets, cashflows, debts)
+        ]
+        self.assertEqual(batch.results(), single)
+
+class TestHierarchyStepDiffs(unittest.TestCase):
+    """Diffed hierarchy steps expand back to each level's full output"""
+
+    def test_step_diff_round_trip(self):
+        previous = {'a': 1, 'b': [1, 2], 'gone': 'x'}
+        data = {'a': 1, 'b': [1, 3], 'new': {'k': 2}, 'base_data': previous}
+        steps = [{'level': 'manual', 'data': previous},
+                 {'level': 'min_max', 'diff': _step_diff(previous, data)}]
+        self.assertEqual(steps[1]['diff']['unset'], ['gone'])
+        self.assertEqual(steps[1]['diff']['set']['base_data'], HIERARCHY_PREVIOUS_REF)
+        self.assertEqual([s['data'] for s in expand_hierarchy_steps(steps)], [previous, data])
+
+    def test_process_input_steps_expand_to_level_outputs(self):
+        processor = InputHierarchyProcessor()
+        input_data = PermutationInput(
+            permutation_id='p1', input_level=InputLevel.VARIATIONS,
+            raw_data={'ltv': 0.7, 'tenor': 20, 'name': 'deal'},
+            user_email='admin@atlasnexus.co.uk', timestamp=datetime.utcnow()
+        )
+        manual = processor._process_manual_input(input_data)
+        minmax = processor._process_min_max(manual, input_data)
+        variations = processor._process_variations(minmax, input_data)
+
+        with mock.patch(__name__ + '.is_feature_enabled', return_value=True):
+            result = processor.process_input(input_data, input_data.user_email, True)
+        expanded = expand_hierarchy_steps(result['hierarchy_steps'])
+
+        self.assertEqual([s['level'] for s in expanded], ['manual', 'min_max', 'variations'])
+        self.assertEqual([s['data'] for s in expanded], [manual, minmax, variations])
+        self.assertEqual(result['final_data'], variations)
+
 # Global instances
 input_hierarchy_processor = InputHierarchyProcessor()
 reverse_dscr_engine = ReverseDSCREngine()
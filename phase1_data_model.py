@@ -8,6 +8,10 @@ from typing import Optional, List, Dict, Any, Literal, Union
 from datetime import datetime
 from enum import Enum
 
+import numpy as np
+
+from phase1_batch_memo import DerivedBatchMemo
+
 # ==================== ENUMS ====================
 
 class Currency(str, Enum):
@@ -114,6 +118,51 @@ class ProjectInputs:
 
 # ==================== DERIVED FIELDS ====================
 
+# DSCR floors by rating
+DSCR_FLOORS = {
+    TenantRating.AAA: 1.45,
+    TenantRating.AA: 1.35,
+    TenantRating.A: 1.25,
+    TenantRating.BBB: 1.15,
+    TenantRating.NR: 1.25
+}
+
+# DSRA months by rating
+DSRA_MONTHS = {
+    TenantRating.AAA: 6,
+    TenantRating.AA: 6,
+    TenantRating.A: 3,
+    TenantRating.BBB: 3,
+    TenantRating.NR: 3
+}
+
+# AF bands by rating
+AF_BANDS = {
+    TenantRating.AAA: (0.65, 0.80),
+    TenantRating.AA: (0.60, 0.75),
+    TenantRating.A: (0.55, 0.70),
+    TenantRating.BBB: (0.50, 0.65),
+    TenantRating.NR: (0.45, 0.60)
+}
+
+REPO_CURRENCIES = [Currency.EUR, Currency.GBP, Currency.USD]
+
+# ProjectInputs fields DerivedFields depends on (the batch memo key)
+DERIVED_INPUT_FIELDS = (
+    "gross_it_load_mw", "pue", "gross_monthly_rent", "rent_per_kwh_month", "opex_pct",
+    "capex_cost_per_mw", "land_fees_total", "arranger_fee_pct", "legal_fee_pct",
+    "rating_fee_pct", "lease_years", "tenant_rating", "currency"
+)
+
+# Batch output columns, in memo row order
+DERIVED_BATCH_FIELDS = (
+    "net_it_load_mw", "gross_income_m", "opex_m", "noi_m", "project_capex", "upfront_fees",
+    "funding_need", "tenor_cap", "dscr_floor_by_rating", "dsra_months", "af_min", "af_max",
+    "repo_eligible_flag", "repo_reason"
+)
+DERIVED_MEMO_MAX = 100_000  # projects kept in the batch memo
+
+
 @dataclass
 class DerivedFields:
     """Auto-computed fields from project inputs"""
@@ -165,38 +214,13 @@ class DerivedFields:
         # Rule-derived bounds
         tenor_cap = inputs.lease_years - 2  # 2-year buffer
 
-        # DSCR floors by rating
-        dscr_floors = {
-            TenantRating.AAA: 1.45,
-            TenantRating.AA: 1.35,
-            TenantRating.A: 1.25,
-            TenantRating.BBB: 1.15,
-            TenantRating.NR: 1.25
-        }
-        dscr_floor = dscr_floors.get(inputs.tenant_rating, 1.25)
-
-        # DSRA months by rating
-        dsra_map = {
-            TenantRating.AAA: 6,
-            TenantRating.AA: 6,
-            TenantRating.A: 3,
-            TenantRating.BBB: 3,
-            TenantRating.NR: 3
-        }
-        dsra_months = dsra_map.get(inputs.tenant_rating, 3)
-
-        # AF bands by rating
-        af_bands = {
-            TenantRating.AAA: (0.65, 0.80),
-            TenantRating.AA: (0.60, 0.75),
-            TenantRating.A: (0.55, 0.70),
-            TenantRating.BBB: (0.50, 0.65),
-            TenantRating.NR: (0.45, 0.60)
-        }
-        af_min, af_max = af_bands.get(inputs.tenant_rating, (0.50, 0.70))
+        # DSCR floors, DSRA months and AF bands by rating
+        dscr_floor = DSCR_FLOORS.get(inputs.tenant_rating, 1.25)
+        dsra_months = DSRA_MONTHS.get(inputs.tenant_rating, 3)
+        af_min, af_max = AF_BANDS.get(inputs.tenant_rating, (0.50, 0.70))
 
         # Repo eligibility check
-        repo_eligible = inputs.currency in [Currency.EUR, Currency.GBP, Currency.USD]
+        repo_eligible = inputs.currency in REPO_CURRENCIES
         repo_reason = "Eligible" if repo_eligible else f"Currency {inputs.currency} not repo-eligible"
 
         return cls(
@@ -216,6 +240,64 @@ class DerivedFields:
             repo_reason=repo_reason
         )
 
+    @classmethod
+    def compute_batch(cls, projects: Union[List[ProjectInputs], Dict[str, List[Any]]]) -> Dict[str, np.ndarray]:
+        """
+        Compute derived fields for many projects at once, as one array per
+        field. projects is a list of ProjectInputs or a columnar dict of
+        ProjectInputs field -> values. Rows already in the memo are not
+        recomputed; values match compute_from_inputs exactly.
+        """
+        return _derived_memo.compute(projects, cls._compute_columns)
+
+    @staticmethod
+    def _compute_columns(cols: Dict[str, tuple]) -> Dict[str, np.ndarray]:
+        """Vectorized compute_from_inputs over input columns"""
+        def floats(name):
+            return np.array([np.nan if v is None else v for v in cols.get(name, ())], dtype=float)
+
+        gross_it_load_mw = floats("gross_it_load_mw")
+        manual = np.array([v is not None for v in cols.get("gross_monthly_rent", ())], dtype=bool)
+        per_kwh = ~manual & np.array([v is not None for v in cols.get("rent_per_kwh_month", ())], dtype=bool)
+
+        net_it_load_mw = gross_it_load_mw / floats("pue")
+        gross_income_m = np.where(manual, floats("gross_monthly_rent"), np.where(
+            per_kwh, net_it_load_mw * 1000 * 730 * floats("rent_per_kwh_month"), 0.0))
+        opex_m = gross_income_m * floats("opex_pct")
+
+        project_capex = floats("capex_cost_per_mw") * gross_it_load_mw + floats("land_fees_total")
+        upfront_fees = (floats("arranger_fee_pct") + floats("legal_fee_pct") + floats("rating_fee_pct")) * project_capex
+
+        ratings = cols.get("tenant_rating", ())
+        repo = [c in REPO_CURRENCIES for c in cols.get("currency", ())]
+        af = [AF_BANDS.get(r, (0.50, 0.70)) for r in ratings]
+        reasons = np.empty(len(repo), dtype=object)
+        reasons[:] = ["Eligible" if ok else f"Currency {c} not repo-eligible"
+                      for ok, c in zip(repo, cols.get("currency", ()))]
+
+        return {
+            "net_it_load_mw": net_it_load_mw,
+            "gross_income_m": gross_income_m,
+            "opex_m": opex_m,
+            "noi_m": gross_income_m - opex_m,
+            "project_capex": project_capex,
+            "upfront_fees": upfront_fees,
+            "funding_need": project_capex + upfront_fees,
+            "tenor_cap": np.array(cols.get("lease_years", ()), dtype=np.int64) - 2,
+            "dscr_floor_by_rating": np.array([DSCR_FLOORS.get(r, 1.25) for r in ratings], dtype=float),
+            "dsra_months": np.array([DSRA_MONTHS.get(r, 3) for r in ratings], dtype=np.int64),
+            "af_min": np.array([a for a, _ in af], dtype=float),
+            "af_max": np.array([b for _, b in af], dtype=float),
+            "repo_eligible_flag": np.array(repo, dtype=bool),
+            "repo_reason": reasons,
+        }
+
+# Input row -> derived row LRU shared by compute_batch callers (thread-safe)
+_derived_memo = DerivedBatchMemo(
+    ProjectInputs, DERIVED_INPUT_FIELDS, DERIVED_BATCH_FIELDS,
+    {"tenant_rating": TenantRating, "currency": Currency}, DERIVED_MEMO_MAX
+)
+
 # ==================== PERMUTATION RANGES ====================
 
 @dataclass
@@ -3,7 +3,7 @@ Phase-1 Flask Integration Endpoints
 Admin-only, feature-flag protected
 """
 
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, session, Response, stream_with_context
 from datetime import datetime
 import json
 from typing import Dict, Any, List
@@ -15,6 +15,9 @@ from phase1_model_v2 import (
     ValidationGates, PermutationResult, ViabilityTier,
     Phase1Integration, export_top_structures, InputSource
 )
+from phase1_grid_engine import (
+    GridEvaluator, AnytimeSearch, TopN, RunStats, evaluate_row, fixed_inputs, DEFAULT_CHUNK
+)
 
 # Create Blueprint
 phase1_bp = Blueprint('phase1', __name__, url_prefix='/api/phase1')
@@ -139,34 +142,37 @@ def get_derived_fields():
 @admin_required
 def get_presets():
     """Get available preset bundles"""
+    presets = {
+        'repo_first_aaa_aa': {
+            'name': 'AAA/AA Repo-First',
+            'description': 'Conservative repo-eligible structures',
+            'senior_dscr': '1.40-1.50',
+            'senior_tenor': '7-15y',
+            'wrap': True,
+            'mezz': False
+        },
+        'balanced_a': {
+            'name': 'A-rated Balanced',
+            'description': 'Balanced risk/return profile',
+            'senior_dscr': '1.25-1.35',
+            'senior_tenor': '10-20y',
+            'wrap': False,
+            'mezz': False
+        },
+        'value_max_bbb': {
+            'name': 'BBB Value-Max',
+            'description': 'Maximum value extraction',
+            'senior_dscr': '1.15-1.25',
+            'senior_tenor': '10-15y',
+            'wrap': False,
+            'mezz': True
+        }
+    }
+    for name, preset in presets.items():
+        preset['expected_permutations'] = PresetBundles.compiled(name).cardinality['total']
     return jsonify({
         'success': True,
-        'presets': {
-            'repo_first_aaa_aa': {
-                'name': 'AAA/AA Repo-First',
-                'description': 'Conservative repo-eligible structures',
-                'senior_dscr': '1.40-1.50',
-                'senior_tenor': '7-15y',
-                'wrap': True,
-                'mezz': False
-            },
-            'balanced_a': {
-                'name': 'A-rated Balanced',
-                'description': 'Balanced risk/return profile',
-                'senior_dscr': '1.25-1.35',
-                'senior_tenor': '10-20y',
-                'wrap': False,
-                'mezz': False
-            },
-            'value_max_bbb': {
-                'name': 'BBB Value-Max',
-                'description': 'Maximum value extraction',
-                'senior_dscr': '1.15-1.25',
-                'senior_tenor': '10-15y',
-                'wrap': False,
-                'mezz': True
-            }
-        }
+        'presets': presets
     })
 
 @phase1_bp.route('/permutations/apply-preset', methods=['POST'])
@@ -176,25 +182,37 @@ def apply_preset():
     try:
         preset_name = request.json.get('preset')
 
-        if preset_name == 'repo_first_aaa_aa':
-            ranges = PresetBundles.repo_first_aaa_aa()
-        elif preset_name == 'balanced_a':
-            ranges = PresetBundles.balanced_a()
-        elif preset_name == 'value_max_bbb':
-            ranges = PresetBundles.value_max_bbb()
-        else:
+        if preset_name not in PresetBundles.NAMES:
             return jsonify({
                 'success': False,
                 'error': 'Invalid preset name'
             }), 400
 
+        # Compiled once per process; overrides only re-expand the fields they touch
+        preset = PresetBundles.compiled(preset_name)
+        overrides = request.json.get('overrides') or {}
+        if overrides:
+            try:
+                preset = preset.with_overrides(**_preset_overrides(overrides))
+            except (KeyError, TypeError, ValueError) as e:
+                return jsonify({
+                    'success': False,
+                    'error': f'Invalid preset overrides: {e}'
+                }), 400
+        ranges = preset.ranges
+
         # Get tenor cap from session
-        project_data = session.get('phase1_project', {})
-        derived = project_data.get('derived', {})
-        tenor_cap = int(derived.get('tenor_cap', '20 years').split()[0])
+        try:
+            tenor_cap = _session_tenor_cap()
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
 
         # Calculate cardinality
-        cardinality = Phase1Integration.get_cardinality_preview(ranges, tenor_cap)
+        cardinality = Phase1Integration.get_cardinality_preview(
+            preset, tenor_cap,
+            noi_monthly=_run_constraints().get('noi_monthly'),
+            max_card=int(os.getenv('PHASE1_MAX_CARD', '250000'))
+        )
 
         # Build the ranges response
         preset_ranges = {
@@ -229,6 +247,41 @@ def apply_preset():
             'error': str(e)
         }), 500
 
+def _session_tenor_cap() -> int:
+    """Tenor cap in years of the validated project in session (ValueError if unreadable)"""
+    derived = (session.get('phase1_project') or {}).get('derived') or {}
+    value = derived.get('tenor_cap', '20 years')
+    try:
+        return int(str(value).split()[0])
+    except (IndexError, ValueError):
+        raise ValueError(f'Invalid project data in session: tenor_cap {value!r}; re-validate the project')
+
+def _preset_overrides(overrides: dict) -> dict:
+    """
+    PermutationRanges field changes from request JSON. {min,max,step} objects
+    become ranges, except on the list-only axes (tenors, amortisation types,
+    IRR bands), which must be given as lists.
+    """
+    from phase1_model_v2 import RangeWithSource, RANGE_AXIS_FIELDS
+
+    allowed = set(RANGE_AXIS_FIELDS) | {"wrap", "mezz_on", "zcis", "rate_floor_sale", "seed"}
+    unknown = sorted(set(overrides) - allowed)
+    if unknown:
+        raise ValueError(f"unsupported field(s) {', '.join(unknown)}")
+    list_only = {"senior_tenor", "mezz_tenor", "senior_amort", "mezz_amort", "equity_irr_band"}
+    changes = {}
+    for name, value in overrides.items():
+        if name in list_only and not isinstance(value, list):
+            raise ValueError(f"{name} must be a list of values")
+        if isinstance(value, dict):
+            value = RangeWithSource(float(value['min']), float(value['max']), float(value['step']), InputSource.MIN_MAX)
+            if value.step <= 0:
+                raise ValueError(f"{name} step must be positive")
+        elif name in ("senior_amort", "mezz_amort"):
+            value = [AmortType(v) for v in value]
+        changes[name] = value
+    return changes
+
 @phase1_bp.route('/permutations/cardinality', methods=['POST'])
 @admin_required
 def calculate_cardinality():
@@ -240,9 +293,10 @@ def calculate_cardinality():
         from phase1_model_v2 import RangeWithSource
 
         # Get tenor cap
-        project_data = session.get('phase1_project', {})
-        derived = project_data.get('derived', {})
-        tenor_cap = int(derived.get('tenor_cap', '20 years').split()[0])
+        try:
+            tenor_cap = _session_tenor_cap()
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
 
         # Create ranges
         ranges = PermutationRanges(
@@ -265,7 +319,11 @@ def calculate_cardinality():
         )
 
         # Calculate cardinality
-        cardinality = Phase1Integration.get_cardinality_preview(ranges, tenor_cap)
+        cardinality = Phase1Integration.get_cardinality_preview(
+            ranges, tenor_cap,
+            noi_monthly=_run_constraints().get('noi_monthly'),
+            max_card=int(os.getenv('PHASE1_MAX_CARD', '250000'))
+        )
 
         return jsonify({
             'success': True,
@@ -285,7 +343,7 @@ def calculate_cardinality():
 def run_permutations():
     """Run permutation engine end-to-end, persist Top-N for downstream endpoints."""
     try:
-        import os, math, functools, operator, itertools, heapq, random, hashlib, traceback
+        import os, random, traceback
 
         payload = request.get_json(silent=True) or {}
         seed = int(payload.get('seed', 424242))
@@ -293,68 +351,17 @@ def run_permutations():
         max_card = int(os.getenv('PHASE1_MAX_CARD', '250000'))  # guardrail
         ranges = payload.get('ranges') or session.get('phase1_ranges') or payload
 
-        # ---- cardinality (use your existing helper if available)
-        def _expand_num(spec):
-            """
-            Accepts:
-              - list/tuple of numbers -> returns list
-              - dict {min,max,step}   -> expands to list (inclusive of max if aligned)
-              - single number         -> [number]
-            """
-            if isinstance(spec, dict) and ('min' in spec and 'max' in spec and 'step' in spec):
-                mn = float(spec['min']); mx = float(spec['max']); st = float(spec['step'])
-                if st <= 0: raise ValueError("step must be > 0")
-                out = []
-                i = 0
-                # protect from FP drift, make max inclusive when exactly on grid
-                while True:
-                    v = mn + i * st
-                    if v > mx + 1e-12:
-                        break
-                    out.append(round(v, 10))
-                    i += 1
-                return out
-            if isinstance(spec, (list, tuple)):
-                return list(spec)
-            # single scalar
-            try:
-                return [float(spec)] if isinstance(spec, (int, float, str)) else [spec]
-            except Exception:
-                return [spec]
-
-        def canon(rngs: dict) -> dict:
-            """Map multiple synonymous keys to a canonical set used by the evaluator."""
-            m = {
-                'senior_tenor': ['senior_tenor', 'senior_tenor_years', 'tenor_years'],
-                'senior_coupon': ['senior_coupon', 'senior_coupon_pct'],
-                'min_dscr_senior': ['min_dscr_senior', 'senior_dscr'],
-                'senior_amount': ['senior_amount'],
-                'sidecar_haircut_pct': ['sidecar_haircut_pct', 'haircut_pct'],
-                'zcis_tenor_years': ['zcis_tenor_years', 'zcis_tenor'],
-            }
-            out = {}
-            for canon_key, aliases in m.items():
-                for a in aliases:
-                    if a in rngs:
-                        out[canon_key] = rngs[a]
-                        break
-            # also pass-through any other keys (indexation mode, floors, etc.)
-            for k, v in rngs.items():
-                if k not in sum(m.values(), []):
-                    out[k] = v
-            return out
-
-        # canonicalize and normalize into a flat dict of lists
-        ranges = canon(ranges)
-        grid = {}
-        for k, v in ranges.items():
-            if k in ('seed','topn'):
-                continue
-            grid[k] = _expand_num(v)
-
-        # crude cardinality
-        card = functools.reduce(operator.mul, (max(1, len(v)) for v in grid.values()), 1)
-        if card > max_card:
+        # canonicalize and normalize into a flat dict of lists, then prune
+        # infeasible values/combinations before enumeration
+        keys, values, raw_card, ranges = _build_grid(ranges)
+        constraints = _run_constraints(payload)
+        evaluator = GridEvaluator(keys, values, seed, **constraints)
+        card = evaluator.size
+        try:
+            mode = _run_mode(payload, card, max_card)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        if mode is None:
             return jsonify({
                 'success': False,
                 'error': f'Cardinality {card:,} exceeds guardrail {max_card:,}. Split your ranges or raise PHASE1_MAX_CARD.'
@@ -362,139 +369,100 @@ def run_permutations():
 
         # deterministic ordering
         random.seed(seed)
-        keys = sorted(grid.keys())
-        values = [grid[k] for k in keys]
-        product_iter = itertools.product(*values)
-
-        # ---- evaluation (replace this with your real evaluator if you have one)
-        # We keep a small Top-N heap, rank by total day-one value.
-        def evaluate_perm(perm_dict) -> dict:
-            # NOTE: You likely already have an evaluator creating a PermutationResult.
-            # Use it here. This simple stub mirrors your mock fields so QA has data.
-            tenor = int(perm_dict.get('senior_tenor', perm_dict.get('senior_tenor_years', 10)))
-            coupon = float(perm_dict.get('senior_coupon', perm_dict.get('senior_coupon_pct', 0.05)))
-            dscr = float(perm_dict.get('senior_dscr', perm_dict.get('min_dscr_senior', 1.25)))
-            amount = float(perm_dict.get('senior_amount', 10000000.0))  # if not provided, fake 10m
-            sidecar_haircut = float(perm_dict.get('sidecar_haircut_pct', 0.10))
-            zcis_tenor = int(perm_dict.get('zcis_tenor_years', 5))
-
-            # toy values – replace with your actual economics:
-            core = amount * 0.9
-            sidecar_gross = amount * 0.2
-            sidecar_net = sidecar_gross * (1 - sidecar_haircut)
-            total = core + sidecar_net
-
-            # simple amort + WAL
-            n = tenor * 12
-            r = coupon / 12.0
-            if r <= 0: r = 1e-9
-            annuity = amount * (r / (1 - (1 + r) ** (-n)))
-            outstanding = amount
-            wal_num = 0.0
-            wal_den = amount
-            for m in range(1, n + 1):
-                interest = outstanding * r
-                principal = max(0.0, annuity - interest)
-                outstanding -= principal
-                wal_num += (m/12.0) * principal
-            wal = wal_num / wal_den if wal_den > 0 else float(tenor)
-
-            tier = 'Diamond' if dscr >= 1.35 else ('Gold' if dscr >= 1.25 else 'Silver')
-            near_miss = 'Y' if (dscr >= 1.23 and dscr < 1.25) or (tenor == 21) else 'N'
-
-            return {
-                'permutation_id': hashlib.sha1(f"{perm_dict}|{seed}".encode()).hexdigest()[:12],
-                'tier': tier,
-                'senior_tenor': tenor,
-                'senior_coupon': coupon,
-                'senior_amount': amount,
-                'min_dscr_senior': dscr,
-                'min_dscr_mezz': None,
-                'wal': round(wal, 2),
-                'day_one_value_core': round(core, 2),
-                'day_one_value_sidecar': round(sidecar_net, 2),
-                'day_one_value_total': round(total, 2),
-                'repo_eligible': 'Y' if tenor <= 20 and dscr >= 1.15 else 'N',
-                'near_miss': near_miss,
-                'zcis_tenor': zcis_tenor,
-                'seed': seed,
-                'ruleset_version': 'v1.0'
-            }
 
-        # Use counter to break ties in heap
-        import itertools as _it
-        counter = _it.count(0)
-
-        heap = []  # min-heap of (score, tie_breaker, row)
-        processed = 0
-        gate_a_pruned = 0
-        gate_b_pruned = 0
-        near_misses = 0
-        tier_counts = {'Diamond': 0, 'Gold': 0, 'Silver': 0}
-
-        for combo in product_iter:
-            perm = dict(zip(keys, combo))
-            res = evaluate_perm(perm)
-            score = res['day_one_value_total']
-
-            # Track stats
-            tier_counts[res['tier']] = tier_counts.get(res['tier'], 0) + 1
-            if res['near_miss'] == 'Y':
-                near_misses += 1
-
-            # Keep top N with tie-breaker
-            entry = (score, next(counter), res)
-            if len(heap) < topn:
-                heapq.heappush(heap, entry)
-            else:
-                heapq.heappushpop(heap, entry)
-            processed += 1
+        anytime = None
+        if mode == 'anytime':
+            # oversized grid: budgeted sampling + refinement, never cached
+            search = AnytimeSearch(evaluator, topn)
+            top, run_stats = search.run(
+                max_evals=int(payload.get('max_evals') or max_card),
+                time_budget=float(payload.get('time_budget_s') or ANYTIME_SECONDS))
+            anytime = search.report()
+            cache_key, cached = None, False
+        else:
+            # vectorized evaluation; result rows are built for Top-N survivors only.
+            # Identical specs are served from the content-addressed run cache.
+            cache_key = _run_cache_key(keys, values, seed, topn, constraints)
+
+            # Runs that outlast the latency budget continue as an async job
+            budget = float(payload.get('budget_s') or SYNC_BUDGET_SECONDS)
+            job_meta = _job_meta(uuid.uuid4().hex[:16], seed, topn, keys, ranges, constraints, cache_key, card)
+
+            try:
+                entry, cached = _cached_run(cache_key, lambda: _run_with_budget(evaluator, topn, budget, job_meta))
+            except _HandedOff as handed:
+                return _handed_off_response(evaluator, card, handed)
+            top, run_stats = TopN.from_dict(entry['top']), RunStats.from_dict(entry['stats'])
+        processed = run_stats.processed
 
         # finalize Top-N descending
-        top_structs = []
-        for rank, (score, _, struct) in enumerate(sorted(heap, key=lambda t: (t[0], t[1]), reverse=True), 1):
-            struct['rank'] = rank
-            top_structs.append(struct)
-
-        # persist for /top20, /export, QA, etc.
-        session['phase1_topn'] = top_structs
-        session['phase1_last_run'] = {
+        top_structs = evaluator.top_structures(top)
+
+        # persist server-side for /top20, /export, QA, etc.; the session keeps only the run id
+        meta = {
             'seed': seed,
             'ranges': ranges,
             'cardinality': card,
+            'raw_cardinality': raw_card,
+            'constraints': constraints,
             'processed': processed,
             'topn': topn,
-            'stats': {
-                'total_permutations': processed,
-                'gate_a_pruned': gate_a_pruned,
-                'gate_b_pruned': gate_b_pruned,
-                'near_misses': near_misses,
-                'diamond_count': tier_counts.get('Diamond', 0),
-                'gold_count': tier_counts.get('Gold', 0),
-                'silver_count': tier_counts.get('Silver', 0)
-            },
+            'mode': mode,
+            'anytime': anytime,
+            'cache_key': cache_key,
+            'stats': _run_stats_payload(evaluator, run_stats),
             'ts': datetime.utcnow().isoformat()
         }
-        session.modified = True
+        run_id = run_store_put({'meta': meta, 'top_structures': top_structs})
+        session['phase1_run_id'] = run_id
+        session.pop('phase1_topn', None)
+        session.pop('phase1_last_run', None)
 
         return jsonify({
             'success': True,
             'message': f'Processed {processed:,} permutations',
-            'stats': session['phase1_last_run']['stats'],
+            'cached': cached,
+            'run_id': run_id,
+            'mode': mode,
+            'anytime': anytime,
+            'stats': meta['stats'],
             'top_structures': top_structs
         })
     except Exception as e:
         traceback.print_exc()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def _handed_off_response(evaluator, card: int, handed):
+    """202 for a sync run now continuing as async job handed.job_id, with its partial Top-N"""
+    out = {
+        'success': True,
+        'handed_off': True,
+        'job_id': handed.job_id,
+        'cardinality': card,
+        'coalesced': handed.coalesced,
+        'progress_url': f'{phase1_bp.url_prefix}/run/progress/{handed.job_id}',
+        'result_url': f'{phase1_bp.url_prefix}/run/result/{handed.job_id}',
+    }
+    if handed.coalesced:
+        out['message'] = f'Attached to running job {handed.job_id}'
+    else:
+        processed = handed.stats.processed
+        out.update({
+            'message': f'Processed {processed:,} of {card:,} permutations in-request; job {handed.job_id} continues',
+            'processed': processed,
+            'partial': True,
+            'stats': _run_stats_payload(evaluator, handed.stats),
+            'top_structures': evaluator.top_structures(handed.top)
+        })
+    return jsonify(out), 202
+
 # ==================== SECURITISATION ENDPOINTS ====================
 
 @phase1_bp.route('/securitisation/top20', methods=['GET'])
 @admin_required
 def get_top20():
     """Get top 20 structures from session"""
-    data = session.get('phase1_topn')
-    meta = session.get('phase1_last_run')
+    data, meta = _session_run()
     if not data:
         return jsonify({'success': False, 'error': 'No results available. Please run permutations first.'}), 400
     return jsonify({
@@ -508,8 +476,8 @@ def get_top20():
 @admin_required
 def export_structure(structure_rank: int):
     """Export specific structure documents"""
-    data = session.get('phase1_topn') or []
-    meta = session.get('phase1_last_run')
+    data, meta = _session_run()
+    data = data or []
     if not data or structure_rank < 1 or structure_rank > len(data):
         return jsonify({'success': False, 'error': 'No results available'}), 400
 
@@ -556,9 +524,9 @@ def export_structure(structure_rank: int):
 def get_dashboard():
     """Get Phase-1 dashboard metrics"""
     try:
-        # Get latest metrics from session
-        results = session.get('phase1_results', {})
-        stats = results.get('stats', {})
+        # Get latest full-grid metrics from the session's stored run
+        _, meta = _session_run()
+        stats = (meta or {}).get('stats', {})
 
         dashboard = {
             'throughput': {
@@ -645,7 +613,10 @@ def route_list():
         {"method": "POST", "path": "/api/phase1/calc", "auth": "admin+mfa", "flags": ["phase1_core"]},
         {"method": "POST", "path": "/api/phase1/run/submit", "auth": "admin+mfa", "flags": ["phase1_core"]},
         {"method": "GET", "path": "/api/phase1/run/progress/<job_id>", "auth": "admin+mfa", "flags": ["phase1_core"]},
-        {"method": "GET", "path": "/api/phase1/run/result/<job_id>", "auth": "admin+mfa", "flags": ["phase1_core"]}
+        {"method": "GET", "path": "/api/phase1/run/events/<job_id>", "auth": "admin+mfa", "flags": ["phase1_core"]},
+        {"method": "GET", "path": "/api/phase1/run/result", "auth": "admin+mfa", "flags": ["phase1_core"]},
+        {"method": "GET", "path": "/api/phase1/run/result/<job_id>", "auth": "admin+mfa", "flags": ["phase1_core"]},
+        {"method": "GET", "path": "/api/phase1/run/permutation/<permutation_id>", "auth": "admin+mfa", "flags": ["phase1_core"]}
     ])
 
 # ==================== SINGLE CALCULATOR ====================
@@ -827,7 +798,8 @@ def calc_capital_stack():
 
 # ==================== ASYNC RUN ENDPOINTS ====================
 
-import os, time, uuid, heapq, itertools as _it, functools, operator, hashlib
+import os, time, uuid, heapq, itertools as _it, functools, operator, hashlib, threading
+from collections import OrderedDict
 try:
     import redis
     rds = redis.from_url(os.environ.get("REDIS_URL", "redis://localhost:6379/2"))
@@ -839,6 +811,30 @@ except ImportError:
 QUEUE_KEY = "phase1:queue"
 JOB_KEY = "phase1:job:{job_id}"
 RES_KEY = "phase1:jobres:{job_id}"
+SHARD_KEY = "phase1:jobshard:{job_id}:{shard}"
+PROCESSING_KEY = "phase1:processing"
+LEASES_KEY = "phase1:leases"
+LEASE_OWNER_KEY = "phase1:leaseowner"
+WORKERS_KEY = "phase1:workers"
+CKPT_KEY = "phase1:jobckpt:{job_id}:{shard}"
+DONE_KEY = "phase1:jobdone:{job_id}"
+EVENTS_CHANNEL = "phase1:jobevents:{job_id}"
+RUN_CACHE_KEY = "phase1:runcache:{key}"
+RUN_CACHE_INDEX = "phase1:runcache:index"
+INFLIGHT_KEY = "phase1:runinflight:{key}"
+RUN_STORE_KEY = "phase1:run:{run_id}"
+SHARD_SIZE = int(os.getenv("PHASE1_SHARD_SIZE", "50000"))
+RUN_CACHE_TTL = int(os.getenv("PHASE1_CACHE_TTL", "3600"))
+RUN_CACHE_MAX = int(os.getenv("PHASE1_CACHE_MAX", "256"))
+INFLIGHT_TTL = int(os.getenv("PHASE1_INFLIGHT_TTL", "21600"))
+SSE_KEEPALIVE = int(os.getenv("PHASE1_SSE_KEEPALIVE", "15"))
+RUN_STORE_TTL = int(os.getenv("PHASE1_RUN_STORE_TTL", "86400"))
+RUN_STORE_MAX = int(os.getenv("PHASE1_RUN_STORE_MAX", "512"))
+ANYTIME_SECONDS = float(os.getenv("PHASE1_ANYTIME_SECONDS", "10"))
+ANYTIME_ASYNC_SECONDS = float(os.getenv("PHASE1_ANYTIME_ASYNC_SECONDS", "300"))
+SYNC_BUDGET_SECONDS = float(os.getenv("PHASE1_SYNC_BUDGET_SECONDS", "20"))
+PAGE_SIZE_MAX = int(os.getenv("PHASE1_PAGE_SIZE_MAX", "500"))
+WORKER_TTL = int(os.getenv("PHASE1_WORKER_TTL", "30"))
 
 def _expand_spec(spec):
     """Expand range specification to list of values"""
@@ -889,62 +885,376 @@ def _build_grid(ranges: dict):
     values = [grid[k] for k in keys]
     return keys, values, card, ranges
 
-def _evaluate_perm(perm_dict, seed):
-    """Evaluate single permutation - mirrors sync evaluator"""
-    tenor = int(perm_dict.get("senior_tenor", 10))
-    coupon = float(perm_dict.get("senior_coupon", 0.05))
-    dscr = float(perm_dict.get("min_dscr_senior", 1.25))
-    amount = float(perm_dict.get("senior_amount", 10_000_000.0))
-    sidecar_haircut = float(perm_dict.get("sidecar_haircut_pct", 0.10))
-    io_m = int(perm_dict.get("io_months", 0))
-
-    # Amortization with optional IO
-    n = tenor * 12
-    r = coupon / 12.0
-    def annuity(P, rm, nmo):
-        return P * (rm / (1 - (1 + rm) ** (-nmo))) if rm > 0 else P / max(1, nmo)
-
-    post_n = max(1, n - io_m)
-    lvl = annuity(amount, r, post_n) if io_m > 0 else annuity(amount, r, n)
-
-    core = amount * 0.90
-    sidecar_gross = amount * 0.20
-    sidecar_net = sidecar_gross * (1 - sidecar_haircut)
-    total = core + sidecar_net
-
-    # WAL calculation
-    outstanding = amount
-    wal_num = 0.0
-    months = 0
-    pay = lvl
-    for _ in range(io_m):
-        months += 1  # No principal during IO
-    for _ in range(post_n):
-        months += 1
-        interest = outstanding * r
-        principal = max(0.0, pay - interest)
-        outstanding -= principal
-        wal_num += (months/12.0) * principal
-    wal = round(wal_num / amount if amount > 0 else tenor, 2)
-
-    tier = "Diamond" if dscr >= 1.35 else ("Gold" if dscr >= 1.25 else "Silver")
-    repo = "Y" if tenor <= 20 and dscr >= 1.15 else "N"
+def _run_constraints(payload: dict = None) -> dict:
+    """Planner constraints from the validated project in session, overridable per request"""
+    derived = (session.get("phase1_project") or {}).get("derived") or {}
+    constraints = {}
+    if derived.get("tenor_cap"):
+        constraints["tenor_cap"] = int(str(derived["tenor_cap"]).split()[0])
+    if derived.get("noi_m"):
+        noi = float(str(derived["noi_m"]).split()[-1].replace(",", ""))
+        if noi > 0:
+            constraints["noi_monthly"] = noi
+    for k, conv in (("tenor_cap", int), ("noi_monthly", float)):
+        if (payload or {}).get(k) is not None:
+            constraints[k] = conv(payload[k])
+    return constraints
+
+def _run_mode(payload: dict, card: int, max_card: int):
+    """Resolve the requested run mode: "exhaustive", "anytime" or None (refused)
+
+    "auto" (the default) enumerates grids within the guardrail and samples
+    oversized ones; an explicit "exhaustive" request over the guardrail is refused.
+    """
+    mode = str((payload or {}).get("mode") or "auto").lower()
+    if mode not in ("auto", "exhaustive", "anytime"):
+        raise ValueError(f"Unknown run mode {mode!r}")
+    if mode == "auto":
+        mode = "anytime" if card > max_card else "exhaustive"
+    if mode == "exhaustive" and card > max_card:
+        return None
+    return mode
+
+def _plan_shards(card: int, shard_size: int = None):
+    """Split grid indices [0, card) into contiguous index-range shards"""
+    shard_size = max(1, shard_size or SHARD_SIZE)
+    if card <= 0:
+        return [(0, 0)]
+    return [(lo, min(card, lo + shard_size)) for lo in range(0, card, shard_size)]
+
+# ==================== RUN RESULT CACHE ====================
+
+_local_run_cache = OrderedDict()   # key -> (expires_at, entry), used when Redis is unreachable
+_local_inflight = {}               # key -> threading.Event for in-process coalescing
+_run_cache_lock = threading.Lock()
+
+def _local_get(store: OrderedDict, key: str):
+    """TTL/LRU lookup in an in-process fallback store"""
+    with _run_cache_lock:
+        hit = store.get(key)
+        if hit and hit[0] > time.time():
+            store.move_to_end(key)
+            return hit[1]
+        store.pop(key, None)
+    return None
+
+def _local_put(store: OrderedDict, key: str, value, ttl: int, max_items: int):
+    """TTL/LRU insert into an in-process fallback store"""
+    with _run_cache_lock:
+        store[key] = (time.time() + ttl, value)
+        store.move_to_end(key)
+        while len(store) > max_items:
+            store.popitem(last=False)
+
+def _run_cache_key(keys, values, seed: int, topn: int, constraints: dict = None) -> str:
+    """Content address of a run: expanded grid, planner constraints, fixed inputs, seed and Top-N"""
+    spec = {
+        "grid": {k: [float(x) if isinstance(x, (int, float)) else x for x in v]
+                 for k, v in zip(keys, values)},
+        "constraints": constraints or {},
+        "fixed": fixed_inputs(),
+        "seed": seed,
+        "topn": topn,
+    }
+    blob = json.dumps(spec, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()[:32]
+
+def run_cache_get(key: str):
+    """Cached engine output {"top", "stats"} for key, or None"""
+    if REDIS_AVAILABLE:
+        try:
+            raw = rds.get(RUN_CACHE_KEY.format(key=key))
+            if raw:
+                rds.zadd(RUN_CACHE_INDEX, {key: time.time()})
+                return json.loads(raw)
+        except redis.RedisError:
+            pass
+    return _local_get(_local_run_cache, key)
+
+def run_cache_put(key: str, entry: dict):
+    """Store engine output under key, evicting least-recently-used entries"""
+    if REDIS_AVAILABLE:
+        try:
+            now = time.time()
+            pipe = rds.pipeline()
+            pipe.setex(RUN_CACHE_KEY.format(key=key), RUN_CACHE_TTL, json.dumps(entry))
+            pipe.zadd(RUN_CACHE_INDEX, {key: now})
+            pipe.zremrangebyscore(RUN_CACHE_INDEX, 0, now - RUN_CACHE_TTL)
+            pipe.zrange(RUN_CACHE_INDEX, 0, -RUN_CACHE_MAX - 1)
+            pipe.zremrangebyrank(RUN_CACHE_INDEX, 0, -RUN_CACHE_MAX - 1)
+            evicted = pipe.execute()[3]
+            if evicted:
+                rds.delete(*[RUN_CACHE_KEY.format(key=k.decode()) for k in evicted])
+            return
+        except redis.RedisError:
+            pass
+    _local_put(_local_run_cache, key, entry, RUN_CACHE_TTL, RUN_CACHE_MAX)
+
+def _cached_run(key: str, compute):
+    """
+    Return (entry, cached). Concurrent calls for the same key in this process
+    wait on the first caller's computation instead of repeating it.
+    """
+    entry = run_cache_get(key)
+    if entry is not None:
+        return entry, True
+
+    with _run_cache_lock:
+        event = _local_inflight.get(key)
+        leader = event is None
+        if leader:
+            event = _local_inflight[key] = threading.Event()
+
+    if not leader:
+        event.wait()
+        entry = run_cache_get(key)
+        if entry is not None:
+            return entry, True
+        return compute(), False
+
+    try:
+        entry = compute()
+        run_cache_put(key, entry)
+        return entry, False
+    finally:
+        with _run_cache_lock:
+            _local_inflight.pop(key, None)
+        event.set()
+
+# ==================== RUN STORE ====================
+
+_local_run_store = OrderedDict()   # run_id -> (expires_at, record), used when Redis is unreachable
+
+def run_store_put(record: dict) -> str:
+    """Persist a sync run record {"meta", "top_structures"} server-side, returns its run id"""
+    run_id = uuid.uuid4().hex[:16]
+    if REDIS_AVAILABLE:
+        try:
+            rds.setex(RUN_STORE_KEY.format(run_id=run_id), RUN_STORE_TTL, json.dumps(record))
+            return run_id
+        except redis.RedisError:
+            pass
+    _local_put(_local_run_store, run_id, record, RUN_STORE_TTL, RUN_STORE_MAX)
+    return run_id
+
+def run_store_get(run_id: str):
+    """Run record for run_id, or None if unknown or expired"""
+    if not run_id:
+        return None
+    if REDIS_AVAILABLE:
+        try:
+            raw = rds.get(RUN_STORE_KEY.format(run_id=run_id))
+            if raw:
+                return json.loads(raw)
+        except redis.RedisError:
+            pass
+    return _local_get(_local_run_store, run_id)
+
+def _session_run():
+    """(top_structures, meta) of this session's last sync run, or (None, None)"""
+    record = run_store_get(session.get('phase1_run_id'))
+    if not record:
+        return None, None
+    return record['top_structures'], record['meta']
+
+def _page_args(args) -> tuple:
+    """Parse ?page=&page_size=&fields=, raising ValueError on malformed values"""
+    try:
+        page = int(args.get("page", 1))
+        page_size = int(args.get("page_size", 0))
+    except (TypeError, ValueError):
+        raise ValueError("page and page_size must be integers")
+    if page < 1 or page_size < 0:
+        raise ValueError("page must be >= 1 and page_size >= 0")
+    fields = [f for f in (args.get("fields") or "").split(",") if f]
+    return page, page_size, fields
+
+def _page_result(result: dict, paging: tuple) -> dict:
+    """Apply parsed paging and projection to a result's top_structures (page_size 0 = all, capped)"""
+    page, page_size, fields = paging
+    rows = result.get("top_structures") or []
+    out = {k: v for k, v in result.items() if k != "top_structures"}
+    page_size = min(page_size or len(rows) or 1, PAGE_SIZE_MAX)
+    lo = (page - 1) * page_size
+    rows = rows[lo:lo + page_size]
+    if fields:
+        rows = [{f: row.get(f) for f in fields} for row in rows]
+    out.update({
+        "top_structures": rows,
+        "total": len(result.get("top_structures") or []),
+        "page": page,
+        "page_size": page_size
+    })
+    return out
+
+def _run_stats_payload(evaluator, run_stats) -> dict:
+    """Run stats over the whole evaluated grid (not just the Top-N)"""
+    tier_counts = run_stats.tier_counts
+    return {
+        "total_permutations": run_stats.processed,
+        "gate_a_pruned": evaluator.plan.pruned["gate_a"],
+        "gate_b_pruned": evaluator.plan.pruned["gate_b"],
+        "near_misses": run_stats.near_misses,
+        "near_miss_reasons": dict(run_stats.near_miss_reasons),
+        "repo_eligible_count": run_stats.repo_eligible,
+        "diamond_count": tier_counts.get("Diamond", 0),
+        "gold_count": tier_counts.get("Gold", 0),
+        "silver_count": tier_counts.get("Silver", 0),
+        "distributions": run_stats.distributions()
+    }
+
+def _job_result(evaluator, top, run_stats) -> dict:
+    """Async job result payload from merged Top-N and counters"""
+    top_structs = evaluator.top_structures(top)
+    processed = run_stats.processed
+    return {
+        "message": f"Processed {processed:,} permutations",
+        "stats": _run_stats_payload(evaluator, run_stats),
+        "top_structures": top_structs,
+        "completed_at": datetime.utcnow().isoformat()
+    }
 
+def _claim_inflight(cache_key: str, job_id: str):
+    """Mark job_id as the running job for cache_key; returns the id of an already running job instead"""
+    inflight_key = INFLIGHT_KEY.format(key=cache_key)
+    if not rds.set(inflight_key, job_id, nx=True, ex=INFLIGHT_TTL):
+        running = rds.get(inflight_key)
+        if running and rds.exists(JOB_KEY.format(job_id=running.decode())):
+            return running.decode()
+        rds.set(inflight_key, job_id, ex=INFLIGHT_TTL)
+    return None
+
+def _job_meta(job_id, seed, topn, keys, canon, constraints, cache_key, card) -> dict:
+    """Job hash fields for an exhaustive (sharded) async run"""
     return {
-        "permutation_id": hashlib.sha1(f"{perm_dict}|{seed}".encode()).hexdigest()[:12],
-        "tier": tier,
-        "senior_tenor": tenor,
-        "senior_coupon": coupon,
-        "senior_amount": amount,
-        "min_dscr_senior": dscr,
-        "wal": wal,
-        "day_one_value_core": round(core, 2),
-        "day_one_value_sidecar": round(sidecar_net, 2),
-        "day_one_value_total": round(total, 2),
-        "repo_eligible": repo,
-        "near_miss": "Y" if 1.23 <= dscr < 1.25 else "N",
+        "job_id": job_id,
+        "seed": seed,
+        "topn": topn,
+        "keys": json.dumps(keys),
+        "ranges": json.dumps(canon),
+        "constraints": json.dumps(constraints),
+        "cache_key": cache_key,
+        "cardinality": card,
+        "shards": 0,
+        "shards_done": 0,
+        "processed": 0,
+        "status": "queued",
+        "progress_pct": 0,
+        "created_at": datetime.utcnow().isoformat()
     }
 
+def _queue_job(job_meta: dict, shards: list, partials: dict = None, checkpoints: dict = None):
+    """
+    Store job_meta and queue its unfinished shards. partials (shard -> engine
+    output) are published as already done; checkpoints (shard -> {"next",
+    "top", "stats"}) let the worker resume that shard mid-range.
+    """
+    job_id = job_meta["job_id"]
+    partials = partials or {}
+    pipe = rds.pipeline()
+    pipe.hset(JOB_KEY.format(job_id=job_id),
+              mapping={**job_meta, "shards": len(shards), "shards_done": len(partials)})
+    for i, partial in partials.items():
+        pipe.set(SHARD_KEY.format(job_id=job_id, shard=i), json.dumps(partial))
+        pipe.sadd(DONE_KEY.format(job_id=job_id), i)
+    for i, ckpt in (checkpoints or {}).items():
+        pipe.set(CKPT_KEY.format(job_id=job_id, shard=i), json.dumps(ckpt))
+
+    # Any worker may pick up any shard; the last shard to finish merges.
+    # Workers consume from the right (BRPOPLPUSH), so LPUSH keeps shards FIFO.
+    pending = [json.dumps({"job_id": job_id, "shard": i, "start": lo, "stop": hi})
+               for i, (lo, hi) in enumerate(shards) if i not in partials]
+    if pending:
+        pipe.lpush(QUEUE_KEY, *pending)
+    pipe.execute()
+
+class _HandedOff(Exception):
+    """A budgeted sync run was converted into (or attached to) an async job"""
+
+    def __init__(self, job_id: str, top: TopN = None, stats: RunStats = None, coalesced: bool = False):
+        super().__init__(job_id)
+        self.job_id = job_id
+        self.top = top
+        self.stats = stats
+        self.coalesced = coalesced
+
+def _run_with_budget(evaluator, topn: int, budget_s: float, job_meta: dict) -> dict:
+    """
+    Evaluate the grid shard by shard while the latency budget holds and return
+    the engine output {"top", "stats"}. Once the budget is spent the finished
+    shards are published as partials, the current one as a checkpoint and the
+    rest queued under job_meta's job, so workers continue exactly where the
+    request stopped; raises _HandedOff. Without Redis, or with no worker
+    checked in to pick the job up, the run just completes in the request.
+    """
+    cache_key = job_meta["cache_key"]
+    if REDIS_AVAILABLE:
+        try:
+            running = rds.get(INFLIGHT_KEY.format(key=cache_key))
+            if running and rds.exists(JOB_KEY.format(job_id=running.decode())):
+                raise _HandedOff(running.decode(), coalesced=True)
+        except redis.RedisError:
+            pass
+
+    can_hand_off = REDIS_AVAILABLE
+    deadline = time.monotonic() + budget_s
+    shards = _plan_shards(evaluator.size)
+    partials = {}
+    for i, (lo, hi) in enumerate(shards):
+        top, run_stats = TopN(topn), RunStats()
+        pos = lo
+        while pos < hi:
+            if can_hand_off and time.monotonic() >= deadline:
+                try:
+                    if not _worker_alive():
+                        can_hand_off = False   # nobody would run the remainder: finish in-request
+                        continue
+                    _hand_off(evaluator, topn, job_meta, shards, partials, i, pos, top, run_stats)
+                except redis.RedisError:
+                    can_hand_off = False   # queue unreachable: finish in-request
+                    continue
+            stop = min(hi, pos + DEFAULT_CHUNK)
+            evaluator.run(topn, start=pos, stop=stop, top=top, stats=run_stats)
+            pos = stop
+        partials[i] = (top, run_stats)
+
+    top, run_stats = TopN(topn), RunStats()
+    for part_top, part_stats in partials.values():
+        top.merge(part_top)
+        run_stats.merge(part_stats)
+    return {"top": top.to_dict(), "stats": run_stats.to_dict()}
+
+def _worker_alive() -> bool:
+    """True when some worker has checked in within the last WORKER_TTL seconds"""
+    return rds.zcount(WORKERS_KEY, time.time() - WORKER_TTL, "+inf") > 0
+
+def _hand_off(evaluator, topn, job_meta, shards, partials, shard, pos, top, run_stats):
+    """Queue the unfinished remainder of a budgeted sync run and raise _HandedOff"""
+    job_id = job_meta["job_id"]
+    running = _claim_inflight(job_meta["cache_key"], job_id)
+    if running:
+        raise _HandedOff(running, coalesced=True)
+
+    merged_top, merged_stats = TopN(topn), RunStats()
+    for part_top, part_stats in list(partials.values()) + [(top, run_stats)]:
+        merged_top.merge(part_top)
+        merged_stats.merge(part_stats)
+
+    checkpoints = {}
+    if pos > shards[shard][0]:
+        checkpoints[shard] = {"next": pos, "top": top.to_dict(), "stats": run_stats.to_dict()}
+    _queue_job(
+        {**job_meta, "processed": merged_stats.processed, "handed_off": 1},
+        shards,
+        {i: {"top": t.to_dict(), "stats": st.to_dict()} for i, (t, st) in partials.items()},
+        checkpoints
+    )
+    raise _HandedOff(job_id, merged_top, merged_stats)
+
+def _evaluate_perm(perm_dict, seed):
+    """Evaluate single permutation - scalar counterpart of GridEvaluator"""
+    return evaluate_row(perm_dict, seed)
+
 @phase1_bp.route("/run/submit", methods=["POST"])
 @admin_required
 def submit_async_run():
@@ -956,36 +1266,79 @@ def submit_async_run():
     seed = int(payload.get("seed", 424242))
     topn = int(payload.get("topn", 20))
     ranges = payload.get("ranges") or session.get("phase1_ranges") or {}
-    keys, values, card, canon = _build_grid(ranges)
+    keys, values, _, canon = _build_grid(ranges)
+    constraints = _run_constraints(payload)
+    evaluator = GridEvaluator(keys, values, seed, **constraints)
+    card = evaluator.size
 
     max_card = int(os.getenv("PHASE1_MAX_CARD", "250000"))
-    if card > max_card:
+    try:
+        mode = _run_mode(payload, card, max_card)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    if mode is None:
         return jsonify({
             "success": False,
             "error": f"Cardinality {card:,} exceeds guardrail {max_card:,}"
         }), 413
 
     job_id = uuid.uuid4().hex[:16]
-    job_meta = {
-        "job_id": job_id,
-        "seed": seed,
-        "topn": topn,
-        "keys": json.dumps(keys),
-        "ranges": json.dumps(canon),
-        "cardinality": card,
-        "status": "queued",
-        "progress_pct": 0,
-        "created_at": datetime.utcnow().isoformat()
-    }
+    if mode == "anytime":
+        # One budgeted sampling job; snapshots stream as progress events and
+        # the result is never cached since it depends on the budget.
+        budget = {
+            "max_evals": int(payload.get("max_evals") or 0),
+            "time_budget_s": float(payload.get("time_budget_s") or ANYTIME_ASYNC_SECONDS)
+        }
+        rds.hset(JOB_KEY.format(job_id=job_id), mapping={
+            "job_id": job_id, "seed": seed, "topn": topn, "mode": mode,
+            "keys": json.dumps(keys), "ranges": json.dumps(canon),
+            "constraints": json.dumps(constraints), "budget": json.dumps(budget),
+            "cardinality": card, "shards": 1, "shards_done": 0, "processed": 0,
+            "status": "queued", "progress_pct": 0, "created_at": datetime.utcnow().isoformat()
+        })
+        rds.lpush(QUEUE_KEY, json.dumps({"job_id": job_id, "mode": mode}))
+        return jsonify({
+            "success": True,
+            "job_id": job_id,
+            "cardinality": card,
+            "mode": mode,
+            "budget": budget,
+            "message": f"Job {job_id} queued for anytime search over {card:,} permutations"
+        })
+
+    cache_key = _run_cache_key(keys, values, seed, topn, constraints)
+
+    # Identical spec already computed: finish the job immediately from cache
+    cached = run_cache_get(cache_key)
+    if cached is not None:
+        result = _job_result(evaluator, TopN.from_dict(cached["top"]), RunStats.from_dict(cached["stats"]))
+        now = datetime.utcnow().isoformat()
+        rds.set(RES_KEY.format(job_id=job_id), json.dumps(result))
+        # Full job meta so the job's permutation ids can be decoded later
+        rds.hset(JOB_KEY.format(job_id=job_id), mapping={
+            **_job_meta(job_id, seed, topn, keys, canon, constraints, cache_key, card),
+            "cached": 1, "status": "done", "progress_pct": 100,
+            "processed": card, "created_at": now, "finished_at": now
+        })
+        return jsonify({"success": True, "job_id": job_id, "cardinality": card,
+                        "cached": True, "message": f"Job {job_id} served from cache", **result})
+
+    # Identical spec already running: attach to that job instead of enqueueing
+    running = _claim_inflight(cache_key, job_id)
+    if running:
+        return jsonify({"success": True, "job_id": running, "cardinality": card,
+                        "coalesced": True, "message": f"Attached to running job {running}"})
 
-    rds.hset(JOB_KEY.format(job_id=job_id), mapping=job_meta)
-    rds.rpush(QUEUE_KEY, json.dumps({"job_id": job_id}))
+    shards = _plan_shards(card)
+    _queue_job(_job_meta(job_id, seed, topn, keys, canon, constraints, cache_key, card), shards)
 
     return jsonify({
         "success": True,
         "job_id": job_id,
         "cardinality": card,
-        "message": f"Job {job_id} queued for {card:,} permutations"
+        "shards": len(shards),
+        "message": f"Job {job_id} queued for {card:,} permutations in {len(shards)} shard(s)"
     })
 
 @phase1_bp.route("/run/progress/<job_id>", methods=["GET"])
@@ -1008,10 +1361,70 @@ def async_progress(job_id):
     out = {k.decode(): _load(v.decode()) for k, v in h.items()}
     return jsonify({"success": True, **out})
 
+@phase1_bp.route("/run/events/<job_id>", methods=["GET"])
+@admin_required
+def async_events(job_id):
+    """Stream job progress as Server-Sent Events; /run/progress remains the polling fallback"""
+    if not REDIS_AVAILABLE:
+        return jsonify({"success": False, "error": "Redis not available"}), 503
+
+    # Subscribe before reading the snapshot so no update falls in between
+    pubsub = rds.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(EVENTS_CHANNEL.format(job_id=job_id))
+    h = rds.hgetall(JOB_KEY.format(job_id=job_id))
+    if not h:
+        pubsub.close()
+        return jsonify({"success": False, "error": "job not found"}), 404
+
+    snapshot = {k.decode(): v.decode() for k, v in h.items()
+                if k in (b"status", b"progress_pct", b"processed", b"cardinality", b"error")}
+
+    def _event(fields):
+        name = fields.get("status") if fields.get("status") in ("done", "error") else "progress"
+        return f"event: {name}\ndata: {json.dumps(fields)}\n\n", name != "progress"
+
+    def stream():
+        try:
+            frame, final = _event(snapshot)
+            yield frame
+            while not final:
+                message = pubsub.get_message(timeout=SSE_KEEPALIVE)
+                if message is None:
+                    yield ": keepalive\n\n"
+                    continue
+                frame, final = _event(json.loads(message["data"]))
+                yield frame
+        finally:
+            pubsub.close()
+
+    return Response(stream_with_context(stream()), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+@phase1_bp.route("/run/result", methods=["GET"], defaults={"job_id": None})
 @phase1_bp.route("/run/result/<job_id>", methods=["GET"])
 @admin_required
 def async_result(job_id):
-    """Get results of completed async job"""
+    """
+    Get results of a completed async job or stored sync run (the session's
+    last run when no id is given). Supports ?page=&page_size=&fields=.
+    """
+    try:
+        paging = _page_args(request.args)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    record = run_store_get(job_id or session.get("phase1_run_id"))
+    if record:
+        result = {"run_id": job_id or session.get("phase1_run_id"),
+                  "stats": record["meta"].get("stats", {}),
+                  "completed_at": record["meta"].get("ts"),
+                  "top_structures": record["top_structures"]}
+        return jsonify({"success": True, **_page_result(result, paging)})
+
+    if not job_id:
+        return jsonify({"success": False, "error": "No results available. Please run permutations first."}), 404
     if not REDIS_AVAILABLE:
         return jsonify({"success": False, "error": "Redis not available"}), 503
 
@@ -1019,7 +1432,38 @@ def async_result(job_id):
     if not data:
         return jsonify({"success": False, "error": "result not ready"}), 404
 
-    return jsonify({"success": True, **json.loads(data)})
+    return jsonify({"success": True, **_page_result(json.loads(data), paging)})
+
+@phase1_bp.route("/run/permutation/<permutation_id>", methods=["GET"])
+@admin_required
+def decode_permutation(permutation_id):
+    """Resolve a permutation id from the session's last run (or ?job_id=) back to its parameters and row"""
+    job_id = request.args.get("job_id")
+    if job_id:
+        h = rds.hgetall(JOB_KEY.format(job_id=job_id)) if REDIS_AVAILABLE else {}
+        if not h:
+            return jsonify({"success": False, "error": "job not found"}), 404
+        h = {k.decode(): v.decode() for k, v in h.items()}
+        if "ranges" not in h:
+            return jsonify({"success": False, "error": f"job {job_id} has no stored run spec to decode against"}), 409
+        spec = {"ranges": json.loads(h["ranges"]), "seed": int(h.get("seed", 424242)),
+                "constraints": json.loads(h.get("constraints", "{}"))}
+    else:
+        _, meta = _session_run()
+        if not meta:
+            return jsonify({"success": False, "error": "No results available. Please run permutations first."}), 404
+        spec = {"ranges": meta["ranges"], "seed": meta["seed"], "constraints": meta.get("constraints", {})}
+
+    keys, values, _, _ = _build_grid(spec["ranges"])
+    evaluator = GridEvaluator(keys, values, spec["seed"], **spec["constraints"])
+    try:
+        perm = evaluator.decode_id(permutation_id)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+
+    index = int(permutation_id.partition("-")[2], 16)
+    return jsonify({"success": True, "permutation_id": permutation_id,
+                    "parameters": perm, "row": evaluator.materialize(index)})
 
 # ==================== CATCH-ALL FOR JSON 404s ====================
 
@@ -1029,4 +1473,142 @@ def phase1_catch_all(_subpath):
     from flask import jsonify
     import uuid
     request_id = request.headers.get("X-Request-ID") or str(uuid.uuid4())
-    return jsonify({"error": "Not found", "code": 404, "request_id": request_id}), 404
\ No newline at end of file
+    return jsonify({"error": "Not found", "code": 404, "request_id": request_id}), 404
+
+# ==================== TESTS ====================
+# python -m unittest phase1_flask_integration (async endpoints need fakeredis)
+
+import sys
+import types
+import unittest
+from unittest import mock
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+_TEST_RANGES = {"senior_tenor": [20, 25], "senior_coupon": [0.05, 0.06], "min_dscr_senior": [1.3, 1.4]}
+
+@unittest.skipUnless(fakeredis, "fakeredis not installed")
+class Phase1ApiTestCase(unittest.TestCase):
+    """Blueprint on a throwaway app, an admin session and a fake Redis"""
+
+    def setUp(self):
+        from flask import Flask
+        flags = types.ModuleType("feature_flags")
+        flags.is_feature_enabled = lambda *args, **kwargs: True
+        self.rds = fakeredis.FakeRedis()
+        for patcher in (mock.patch.dict(sys.modules, {"feature_flags": flags}),
+                        mock.patch.object(sys.modules[__name__], "rds", self.rds),
+                        mock.patch.object(sys.modules[__name__], "REDIS_AVAILABLE", True)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        app = Flask(__name__)
+        app.secret_key = "test"
+        app.register_blueprint(phase1_bp)
+        self.client = app.test_client()
+        with self.client.session_transaction() as sess:
+            sess["is_admin"] = True
+
+class TestRunCache(Phase1ApiTestCase):
+
+    def test_decode_permutation_from_cache_served_job(self):
+        """A job finished from the run cache keeps the spec needed to decode its ids"""
+        payload = {"ranges": _TEST_RANGES, "topn": 5}
+        self.assertEqual(self.client.post("/api/phase1/run", json=payload).status_code, 200)
+        job = self.client.post("/api/phase1/run/submit", json=payload).json
+        self.assertTrue(job["cached"])
+
+        perm_id = job["top_structures"][0]["permutation_id"]
+        res = self.client.get(f"/api/phase1/run/permutation/{perm_id}?job_id={job['job_id']}")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json["permutation_id"], perm_id)
+
+    def test_decode_permutation_job_without_spec(self):
+        """Job hashes without stored ranges answer 409 instead of failing"""
+        self.rds.hset(JOB_KEY.format(job_id="legacy"), mapping={"job_id": "legacy", "status": "done"})
+        res = self.client.get("/api/phase1/run/permutation/abc-1?job_id=legacy")
+        self.assertEqual(res.status_code, 409)
+        self.assertFalse(res.json["success"])
+
+class TestRunMode(Phase1ApiTestCase):
+
+    def test_unknown_mode_is_a_400(self):
+        payload = {"ranges": _TEST_RANGES, "mode": "exhaustve"}
+        for path in ("/api/phase1/run", "/api/phase1/run/submit"):
+            res = self.client.post(path, json=payload)
+            self.assertEqual(res.status_code, 400, path)
+            self.assertFalse(res.json["success"])
+            self.assertIn("exhaustve", res.json["error"])
+        self.assertEqual(self.rds.llen(QUEUE_KEY), 0)
+
+class TestResultPaging(Phase1ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        rows = [{"permutation_id": f"p-{i}", "rank": i} for i in range(1, 8)]
+        self.rds.set(RES_KEY.format(job_id="paged"), json.dumps({"top_structures": rows}))
+
+    def test_pages_and_projects_rows(self):
+        res = self.client.get("/api/phase1/run/result/paged?page=2&page_size=3&fields=rank")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json["top_structures"], [{"rank": 4}, {"rank": 5}, {"rank": 6}])
+        self.assertEqual((res.json["total"], res.json["page"], res.json["page_size"]), (7, 2, 3))
+
+    def test_malformed_paging_is_a_400(self):
+        for query in ("page=abc", "page_size=1.5", "page=0", "page_size=-2"):
+            res = self.client.get(f"/api/phase1/run/result/paged?{query}")
+            self.assertEqual(res.status_code, 400, query)
+            self.assertFalse(res.json["success"])
+
+    def test_page_size_is_capped(self):
+        with mock.patch.object(sys.modules[__name__], "PAGE_SIZE_MAX", 4):
+            res = self.client.get("/api/phase1/run/result/paged?page_size=100000")
+        self.assertEqual(res.json["page_size"], 4)
+        self.assertEqual(len(res.json["top_structures"]), 4)
+
+class TestBudgetHandOff(Phase1ApiTestCase):
+    """Over-budget sync runs become async jobs only while a worker is alive"""
+
+    payload = {"ranges": _TEST_RANGES, "topn": 5, "budget_s": 1e-9}
+
+    def test_finishes_in_request_without_workers(self):
+        stale = time.time() - WORKER_TTL - 1
+        self.rds.zadd(WORKERS_KEY, {"gone:1": stale})
+        res = self.client.post("/api/phase1/run", json=self.payload)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(res.json["top_structures"]), 5)
+        self.assertEqual(self.rds.llen(QUEUE_KEY), 0)
+
+    def test_hands_off_to_live_worker(self):
+        self.rds.zadd(WORKERS_KEY, {"worker:1": time.time()})
+        res = self.client.post("/api/phase1/run", json=self.payload)
+        self.assertEqual(res.status_code, 202)
+        self.assertTrue(res.json["handed_off"])
+        self.assertEqual(self.rds.llen(QUEUE_KEY), 1)
+
+class TestApplyPreset(Phase1ApiTestCase):
+
+    def _apply(self, **overrides):
+        return self.client.post("/api/phase1/permutations/apply-preset",
+                                json={"preset": "balanced_a", "overrides": overrides})
+
+    def test_range_override(self):
+        res = self._apply(senior_coupon={"min": 0.05, "max": 0.06, "step": 0.005})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json["ranges"]["senior_coupon"], {"min": 0.05, "max": 0.06, "step": 0.005})
+
+    def test_list_only_fields_reject_ranges(self):
+        for name in ("senior_tenor", "mezz_tenor", "senior_amort", "mezz_amort"):
+            res = self._apply(**{name: {"min": 10, "max": 20, "step": 5}})
+            self.assertEqual(res.status_code, 400, name)
+            self.assertIn("must be a list", res.json["error"])
+
+    def test_corrupt_session_data_is_a_400_not_blamed_on_overrides(self):
+        with self.client.session_transaction() as sess:
+            sess["phase1_project"] = {"derived": {"tenor_cap": "unknown"}}
+        res = self._apply(senior_tenor=[15, 20])
+        self.assertEqual(res.status_code, 400)
+        self.assertIn("session", res.json["error"])
+        self.assertNotIn("overrides", res.json["error"])
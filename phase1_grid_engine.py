@@ -0,0 +1,1008 @@
+"""
+Phase-1 Grid Engine
+Vectorized chunk evaluation of the Phase-1 permutation grid
+"""
+
+import hashlib
+import itertools
+import json
+import math
+import time
+import tracemalloc
+from typing import Dict, Any, List, Optional, Tuple, Callable
+
+import numpy as np
+
+# ==================== CONSTANTS ====================
+
+TIERS = ("Diamond", "Gold", "Silver")
+DEFAULT_CHUNK = 65536
+ANYTIME_BATCH = 4096
+SEEN_BITMAP_LIMIT = 1 << 26   # grids up to this size track visited rows in a bitmap
+RULESET_VERSION = "v1.0"
+
+# Fixed histogram bucket edges per distribution metric; counts carry an
+# underflow bucket before the first edge and an overflow bucket after the last
+HIST_EDGES = {
+    "dscr": np.round(np.arange(1.0, 2.0001, 0.05), 2),
+    "day_one": np.round(10 ** np.arange(5.0, 10.0001, 0.25), 0),
+    "wal": np.arange(0.0, 31.0, 1.0),
+    "amount": np.round(10 ** np.arange(5.0, 10.0001, 0.25), 0),
+    "rate": np.round(np.arange(0.0, 0.1501, 0.005), 3),
+}
+
+# Near-miss reasons, in the order evaluate_chunk reports them
+NEAR_MISS_REASONS = ("dscr_band", "tenor_21")
+
+# Canonical field -> (grid key, default, converter)
+FIELDS = {
+    "tenor": ("senior_tenor", 10, int),
+    "coupon": ("senior_coupon", 0.05, float),
+    "dscr": ("min_dscr_senior", 1.25, float),
+    "amount": ("senior_amount", 10_000_000.0, float),
+    "haircut": ("sidecar_haircut_pct", 0.10, float),
+    "io": ("io_months", 0, int),
+    "zcis": ("zcis_tenor_years", 5, int),
+}
+
+def fixed_inputs() -> Dict[str, Any]:
+    """Everything besides the grid axes and seed that shapes a run result"""
+    return {
+        "defaults": {key: default for key, default, _ in FIELDS.values()},
+        "ruleset_version": RULESET_VERSION,
+        "hist_edges": {m: e.tolist() for m, e in HIST_EDGES.items()},
+    }
+
+# ==================== CLOSED-FORM AMORTIZATION ====================
+
+def wal_years(tenor: int, coupon: float, amount: float, io_months: int = 0) -> float:
+    """
+    Principal-weighted average life of a level-pay annuity with optional
+    interest-only months. Closed form of the month-by-month schedule:
+    principal in amortizing month j is (A - rP)(1+r)**(j-1).
+    """
+    if amount <= 0:
+        return float(tenor)
+    r = coupon / 12.0
+    post_n = max(1, tenor * 12 - io_months)
+    if r > 1e-9:
+        q_n = (1 + r) ** post_n
+        months = (1 - (post_n + 1) * q_n + post_n * q_n * (1 + r)) / (r * (q_n - 1))
+    else:
+        months = (post_n + 1) / 2.0
+    return (max(io_months, 0) + months) / 12.0
+
+def wal_years_array(tenor: np.ndarray, coupon: np.ndarray, amount: np.ndarray,
+                    io_months: np.ndarray) -> np.ndarray:
+    """Vectorized wal_years"""
+    r = coupon / 12.0
+    post_n = np.maximum(1, tenor * 12 - io_months).astype(float)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        q_n = np.power(1 + r, post_n)
+        months = np.where(
+            r > 1e-9,
+            (1 - (post_n + 1) * q_n + post_n * q_n * (1 + r)) / (r * (q_n - 1)),
+            (post_n + 1) / 2.0
+        )
+    wal = (np.maximum(io_months, 0) + months) / 12.0
+    return np.where(amount > 0, wal, tenor.astype(float))
+
+# ==================== CONSTRAINT PLANNER ====================
+
+# Fields whose feasibility couples across axes; fused into one block when needed
+STRUCTURE_FIELDS = ("tenor", "io", "coupon")
+
+def payment_factor_array(coupon: np.ndarray, tenor: np.ndarray, io_months: np.ndarray) -> np.ndarray:
+    """Level monthly debt service per unit of principal once any IO period ends"""
+    r = coupon / 12.0
+    n = np.maximum(1, tenor * 12 - io_months).astype(float)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        return np.where(r > 1e-9, r / (1 - np.power(1 + r, -n)), 1.0 / n)
+
+class GridPlan:
+    """
+    Reduced grid left after analytic pruning. blocks is a list of
+    (block_keys, rows) enumerated in mixed-radix order; an unconstrained axis
+    is a one-key block, coupled tenor/io/coupon axes become one block of
+    their feasible tuples. pruned counts rows removed per gate; feasible is
+    the exact number of planned rows that also pass the per-row NOI check.
+    """
+
+    def __init__(self, keys: List[str], blocks: List[Tuple[List[str], List[tuple]]],
+                 raw_size: int, size: int, feasible: int, pruned: Dict[str, int]):
+        self.keys = keys
+        self.blocks = blocks
+        self.raw_size = raw_size
+        self.size = size
+        self.feasible = feasible
+        self.pruned = pruned
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"raw": self.raw_size, "planned": self.size, "feasible": self.feasible,
+                "pruned": dict(self.pruned)}
+
+def plan_grid(keys: List[str], values: List[List[Any]], tenor_cap: Optional[int] = None,
+              noi_monthly: Optional[float] = None) -> GridPlan:
+    """
+    Remove infeasible axis values and structure combinations before enumeration.
+
+    Gate A: tenor <= 0 or above tenor_cap, negative IO, and IO months that
+    leave no amortization period (io >= tenor * 12).
+    Gate B (only with a positive noi_monthly): DSCR targets <= 0, and
+    (tenor, io, coupon) tuples, amounts and DSCR targets that cannot satisfy
+    payment * dscr <= NOI for any other axis value in the grid.
+    """
+    keys = list(keys)
+    raw_size = math.prod(len(v) for v in values)
+
+    # Candidate (raw, converted) values per field; defaulted fields have one
+    pool = {}
+    for name, (key, default, conv) in FIELDS.items():
+        if key in keys:
+            pool[name] = [(v, conv(v)) for v in values[keys.index(key)]]
+        else:
+            pool[name] = [(default, conv(default))]
+
+    def keep(name, pred):
+        pool[name] = [(raw, v) for raw, v in pool[name] if pred(v)]
+
+    # Gate A, single axis
+    keep("tenor", lambda t: t > 0 and (tenor_cap is None or t <= tenor_cap))
+    keep("io", lambda m: m >= 0)
+
+    # Gate A, tenor x io; structure tuples follow grid key order
+    names = sorted((n for n in STRUCTURE_FIELDS if FIELDS[n][0] in keys),
+                   key=lambda n: keys.index(FIELDS[n][0]))
+    fixed = {n: pool[n] for n in STRUCTURE_FIELDS if n not in names}
+    tuples = []
+    for combo in itertools.product(*(pool[n] for n in names), *fixed.values()):
+        c = dict(zip(names + list(fixed), combo))
+        if c["io"][1] < c["tenor"][1] * 12:
+            tuples.append(c)
+    struct_keys = [FIELDS[n][0] for n in names]
+    size_a = len(tuples) * math.prod(len(v) for k, v in zip(keys, values) if k not in struct_keys)
+
+    # Gate B, DSCR / NOI bounds on the rate x tenor plane
+    factors = None
+    if noi_monthly is not None and noi_monthly > 0:
+        keep("dscr", lambda d: d > 0)
+        if tuples and pool["dscr"] and pool["amount"]:
+            min_dscr = min(d for _, d in pool["dscr"])
+            min_amount = max(0.0, min(a for _, a in pool["amount"]))
+            limit = noi_monthly * (1 + 1e-12)
+            factors = payment_factor_array(*(np.array([c[n][1] for c in tuples], dtype=float)
+                                             for n in ("coupon", "tenor", "io")))
+            ok = min_amount * factors * min_dscr <= limit
+            tuples = [c for c, keep_c in zip(tuples, ok) if keep_c]
+            factors = factors[ok]
+            if tuples:
+                f_min = float(factors.min())
+                keep("amount", lambda a: a * f_min * min_dscr <= limit)
+                keep("dscr", lambda d: min_amount * f_min * d <= limit)
+        else:
+            tuples = []
+    if any(not pool[n] for n in FIELDS):
+        tuples = []
+
+    # Structure axes stay independent blocks while their feasible set is a product
+    rows = [tuple(c[n][0] for n in names) for c in tuples]
+    projections = [list(dict.fromkeys(row[j] for row in rows)) for j in range(len(names))]
+    independent = len(rows) == math.prod(len(p) for p in projections)
+
+    blocks = []
+    for pos, key in enumerate(keys):
+        if key in struct_keys:
+            j = struct_keys.index(key)
+            if independent:
+                blocks.append(([key], [(v,) for v in projections[j]]))
+            elif j == 0:
+                blocks.append((struct_keys, rows))
+            continue
+        name = next((n for n in FIELDS if FIELDS[n][0] == key), None)
+        vals = [raw for raw, _ in pool[name]] if name else values[pos]
+        blocks.append(([key], [(v,) for v in vals]))
+
+    size = math.prod(len(r) for _, r in blocks) if tuples else 0
+
+    # Exact per-row NOI feasibility count, in the same operation order as the kernel
+    feasible = size
+    if size and factors is not None:
+        amounts = np.array([a for _, a in pool["amount"]], dtype=float)
+        dscrs = np.array([d for _, d in pool["dscr"]], dtype=float)
+        rest = size // (len(tuples) * len(amounts) * len(dscrs))
+        passing = 0
+        for lo in range(0, len(factors), 4096):
+            f = factors[lo:lo + 4096]
+            passing += int(np.count_nonzero(amounts[None, :, None] * f[:, None, None] * dscrs[None, None, :] <= limit))
+        feasible = passing * rest
+
+    return GridPlan(keys, blocks, raw_size, size, feasible,
+                    {"gate_a": raw_size - size_a, "gate_b": size_a - feasible})
+
+# ==================== SCALAR ROW ====================
+
+def evaluate_row(perm_dict: Dict[str, Any], seed: int,
+                 permutation_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Evaluate a single permutation into its result row. Rows taken from a
+    grid get GridEvaluator.permutation_id; standalone rows fall back to a
+    content hash.
+    """
+    tenor = int(perm_dict.get("senior_tenor", 10))
+    coupon = float(perm_dict.get("senior_coupon", 0.05))
+    dscr = float(perm_dict.get("min_dscr_senior", 1.25))
+    amount = float(perm_dict.get("senior_amount", 10_000_000.0))
+    sidecar_haircut = float(perm_dict.get("sidecar_haircut_pct", 0.10))
+    io_m = int(perm_dict.get("io_months", 0))
+    zcis_tenor = int(perm_dict.get("zcis_tenor_years", 5))
+
+    core = amount * 0.90
+    sidecar_net = amount * 0.20 * (1 - sidecar_haircut)
+    total = core + sidecar_net
+
+    tier = "Diamond" if dscr >= 1.35 else ("Gold" if dscr >= 1.25 else "Silver")
+    near_miss = (1.23 <= dscr < 1.25) or tenor == 21
+
+    return {
+        "permutation_id": permutation_id or hashlib.sha1(f"{perm_dict}|{seed}".encode()).hexdigest()[:12],
+        "tier": tier,
+        "senior_tenor": tenor,
+        "senior_coupon": coupon,
+        "senior_amount": amount,
+        "min_dscr_senior": dscr,
+        "min_dscr_mezz": None,
+        "wal": round(wal_years(tenor, coupon, amount, io_m), 2),
+        "day_one_value_core": round(core, 2),
+        "day_one_value_sidecar": round(sidecar_net, 2),
+        "day_one_value_total": round(total, 2),
+        "repo_eligible": "Y" if tenor <= 20 and dscr >= 1.15 else "N",
+        "near_miss": "Y" if near_miss else "N",
+        "zcis_tenor": zcis_tenor,
+        "seed": seed,
+        "ruleset_version": RULESET_VERSION
+    }
+
+# ==================== TOP-N ====================
+
+class TopN:
+    """
+    Bounded best-N set ordered by (score, grid index) descending - the same
+    order as the heapq/counter tie-break used by the row-at-a-time loops.
+    """
+
+    def __init__(self, n: int):
+        self.n = max(0, int(n))
+        self.scores = np.empty(0, dtype=float)
+        self.indices = np.empty(0, dtype=np.int64)
+
+    def offer(self, scores: np.ndarray, indices: np.ndarray):
+        """Merge candidate (score, index) pairs, keeping the best n"""
+        if self.n == 0 or len(scores) == 0:
+            return
+        if len(scores) > self.n:
+            # Partial selection before the exact lexicographic sort
+            kth = np.partition(scores, len(scores) - self.n)[len(scores) - self.n]
+            keep = scores >= kth
+            scores, indices = scores[keep], indices[keep]
+        scores = np.concatenate([self.scores, scores])
+        indices = np.concatenate([self.indices, indices])
+        order = np.lexsort((indices, scores))[-self.n:]
+        self.scores, self.indices = scores[order], indices[order]
+
+    def merge(self, other: "TopN"):
+        """Fold another TopN into this one"""
+        self.offer(other.scores, other.indices)
+
+    def ranked(self) -> List[Tuple[float, int]]:
+        """(score, index) pairs, best first"""
+        return [(float(s), int(i)) for s, i in zip(self.scores[::-1], self.indices[::-1])]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"n": self.n, "scores": self.scores.tolist(), "indices": self.indices.tolist()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TopN":
+        top = cls(data["n"])
+        top.scores = np.asarray(data["scores"], dtype=float)
+        top.indices = np.asarray(data["indices"], dtype=np.int64)
+        return top
+
+# ==================== RUN STATS ====================
+
+class RunStats:
+    """
+    Counters and fixed-bucket histograms accumulated over every evaluated
+    (and NOI-feasible) permutation; mergeable across chunks and shards.
+    """
+
+    def __init__(self):
+        self.processed = 0
+        self.tier_counts = {t: 0 for t in TIERS}
+        self.near_misses = 0
+        self.near_miss_reasons = {r: 0 for r in NEAR_MISS_REASONS}
+        self.repo_eligible = 0
+        self.rejected = 0
+        self.histograms = {m: np.zeros(len(e) + 1, dtype=np.int64) for m, e in HIST_EDGES.items()}
+
+    def add_chunk(self, chunk: Dict[str, np.ndarray]):
+        self.processed += len(chunk["index"])
+        ok = chunk.get("feasible")
+        if ok is not None:
+            self.rejected += int(len(ok) - np.count_nonzero(ok))
+            chunk = {k: v[ok] for k, v in chunk.items() if isinstance(v, np.ndarray) and len(v) == len(ok)}
+
+        counts = np.bincount(chunk["tier"], minlength=len(TIERS))
+        for i, t in enumerate(TIERS):
+            self.tier_counts[t] += int(counts[i])
+        self.near_misses += int(np.count_nonzero(chunk["near_miss"]))
+        for r in NEAR_MISS_REASONS:
+            self.near_miss_reasons[r] += int(np.count_nonzero(chunk[f"near_miss_{r}"]))
+        self.repo_eligible += int(np.count_nonzero(chunk["repo"]))
+
+        columns = {"dscr": chunk["dscr"], "day_one": chunk["score"], "wal": chunk["wal"],
+                   "amount": chunk["amount"], "rate": chunk["coupon"]}
+        for m, edges in HIST_EDGES.items():
+            buckets = np.searchsorted(edges, columns[m], side="right")
+            self.histograms[m] += np.bincount(buckets, minlength=len(edges) + 1)
+
+    def merge(self, other: "RunStats"):
+        self.processed += other.processed
+        for tier in TIERS:
+            self.tier_counts[tier] += other.tier_counts[tier]
+        self.near_misses += other.near_misses
+        for r in NEAR_MISS_REASONS:
+            self.near_miss_reasons[r] += other.near_miss_reasons[r]
+        self.repo_eligible += other.repo_eligible
+        self.rejected += other.rejected
+        for m in HIST_EDGES:
+            self.histograms[m] += other.histograms[m]
+
+    def distributions(self) -> Dict[str, Dict[str, list]]:
+        """Histograms with their edges, for result payloads"""
+        return {m: {"edges": HIST_EDGES[m].tolist(), "counts": self.histograms[m].tolist()}
+                for m in HIST_EDGES}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "processed": self.processed,
+            "tier_counts": dict(self.tier_counts),
+            "near_misses": self.near_misses,
+            "near_miss_reasons": dict(self.near_miss_reasons),
+            "repo_eligible": self.repo_eligible,
+            "rejected": self.rejected,
+            "histograms": {m: h.tolist() for m, h in self.histograms.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RunStats":
+        stats = cls()
+        stats.processed = data["processed"]
+        stats.tier_counts.update(data["tier_counts"])
+        stats.near_misses = data["near_misses"]
+        stats.near_miss_reasons.update(data.get("near_miss_reasons", {}))
+        stats.repo_eligible = data.get("repo_eligible", 0)
+        stats.rejected = data.get("rejected", 0)
+        for m, counts in data.get("histograms", {}).items():
+            if m in stats.histograms and len(counts) == len(stats.histograms[m]):
+                stats.histograms[m] = np.asarray(counts, dtype=np.int64)
+        return stats
+
+# ==================== GRID EVALUATOR ====================
+
+class GridEvaluator:
+    """
+    Evaluates index ranges of the mixed-radix grid defined by (keys, values)
+    after plan_grid pruning, in itertools.product order over the plan's
+    blocks, as NumPy arrays. Result dicts are only materialized for rows that
+    survive Top-N selection.
+    """
+
+    def __init__(self, keys: List[str], values: List[List[Any]], seed: int,
+                 tenor_cap: Optional[int] = None, noi_monthly: Optional[float] = None):
+        self.keys = list(keys)
+        self.values = [list(v) for v in values]
+        self.seed = seed
+
+        # Run-spec hash: everything that fixes the index <-> parameters mapping
+        spec = {
+            "grid": {k: [float(x) if isinstance(x, (int, float)) else x for x in v]
+                     for k, v in zip(self.keys, self.values)},
+            "constraints": {"tenor_cap": tenor_cap, "noi_monthly": noi_monthly},
+            "seed": seed,
+        }
+        blob = json.dumps(spec, sort_keys=True, separators=(",", ":"), default=str)
+        self.spec_hash = hashlib.sha1(blob.encode()).hexdigest()[:10]
+
+        # Enumerate the pruned plan; each block is one mixed-radix digit
+        self.plan = plan_grid(self.keys, self.values, tenor_cap, noi_monthly)
+        self.noi_limit = noi_monthly * (1 + 1e-12) if noi_monthly and noi_monthly > 0 else None
+        self.blocks = self.plan.blocks
+        self.radix = [len(rows) for _, rows in self.blocks]
+        self.size = self.plan.size
+
+        # Mixed-radix strides, last block varies fastest
+        self.strides = [1] * len(self.radix)
+        for i in range(len(self.radix) - 2, -1, -1):
+            self.strides[i] = self.strides[i + 1] * self.radix[i + 1]
+
+        # Per-block numeric arrays for the fields the evaluator reads
+        self.axes = {}
+        for name, (key, default, conv) in FIELDS.items():
+            self.axes[name] = (None, conv(default))
+            for pos, (block_keys, rows) in enumerate(self.blocks):
+                if key in block_keys:
+                    j = block_keys.index(key)
+                    self.axes[name] = (pos, np.array([conv(row[j]) for row in rows]))
+                    break
+
+        # Score depends only on amount x haircut: round it exactly once per pair
+        amounts = self._axis_values("amount")
+        haircuts = self._axis_values("haircut")
+        self.score_table = np.array([
+            [round(a * 0.90 + a * 0.20 * (1 - h), 2) for h in haircuts] for a in amounts
+        ], dtype=float)
+
+    def _axis_values(self, name: str) -> List[float]:
+        pos, arr = self.axes[name]
+        return arr.tolist() if pos is not None else [arr]
+
+    def _digits(self, index: np.ndarray, pos: int) -> np.ndarray:
+        return (index // self.strides[pos]) % self.radix[pos]
+
+    def _column(self, name: str, index: np.ndarray, digits: Dict[int, np.ndarray]) -> np.ndarray:
+        pos, arr = self.axes[name]
+        if pos is None:
+            return np.full(len(index), arr)
+        if pos not in digits:
+            digits[pos] = self._digits(index, pos)
+        return arr[digits[pos]]
+
+    def decode(self, index: int) -> Dict[str, Any]:
+        """Plan index -> permutation dict (raw grid values, grid key order)"""
+        perm = {}
+        for pos, (block_keys, rows) in enumerate(self.blocks):
+            perm.update(zip(block_keys, rows[(index // self.strides[pos]) % self.radix[pos]]))
+        return {key: perm[key] for key in self.keys}
+
+    def evaluate_chunk(self, start: int, stop: int) -> Dict[str, np.ndarray]:
+        """Evaluate grid rows [start, stop) as arrays"""
+        return self.evaluate_indices(np.arange(start, min(stop, self.size), dtype=np.int64))
+
+    def evaluate_indices(self, index: np.ndarray) -> Dict[str, np.ndarray]:
+        """Evaluate arbitrary plan indices as arrays"""
+        digits: Dict[int, np.ndarray] = {}
+        tenor = self._column("tenor", index, digits)
+        coupon = self._column("coupon", index, digits)
+        dscr = self._column("dscr", index, digits)
+        amount = self._column("amount", index, digits)
+        haircut = self._column("haircut", index, digits)
+        io_m = self._column("io", index, digits)
+
+        a_pos, _ = self.axes["amount"]
+        h_pos, _ = self.axes["haircut"]
+        a_idx = digits.get(a_pos, 0) if a_pos is not None else 0
+        h_idx = digits.get(h_pos, 0) if h_pos is not None else 0
+        score = self.score_table[a_idx, h_idx]
+        if np.ndim(score) == 0:
+            score = np.full(len(index), score)
+
+        tier = np.where(dscr >= 1.35, 0, np.where(dscr >= 1.25, 1, 2)).astype(np.int8)
+        nm_dscr = (dscr >= 1.23) & (dscr < 1.25)
+        nm_tenor = tenor == 21
+
+        chunk = {
+            "index": index,
+            "score": score,
+            "tier": tier,
+            "near_miss": nm_dscr | nm_tenor,
+            "near_miss_dscr_band": nm_dscr,
+            "near_miss_tenor_21": nm_tenor,
+            "repo": (tenor <= 20) & (dscr >= 1.15),
+            "wal": wal_years_array(tenor, coupon, amount, io_m),
+            "day_one_core": amount * 0.90,
+            "day_one_sidecar": amount * 0.20 * (1 - haircut),
+            "dscr": dscr,
+            "amount": amount,
+            "tenor": tenor,
+            "coupon": coupon,
+        }
+        if self.noi_limit is not None:
+            # Gate B residue the planner could not remove analytically
+            chunk["feasible"] = amount * payment_factor_array(coupon, tenor, io_m) * dscr <= self.noi_limit
+        return chunk
+
+    def permutation_id(self, index: int) -> str:
+        """Stable id of a plan index: run-spec hash plus hex index"""
+        return f"{self.spec_hash}-{index:x}"
+
+    def decode_id(self, permutation_id: str) -> Dict[str, Any]:
+        """Permutation id -> permutation dict; the id must belong to this run spec"""
+        spec_hash, _, hex_index = permutation_id.partition("-")
+        if spec_hash != self.spec_hash:
+            raise ValueError(f"Permutation {permutation_id} belongs to a different run spec")
+        index = int(hex_index, 16)
+        if not 0 <= index < self.size:
+            raise ValueError(f"Permutation index {index} outside grid of {self.size:,}")
+        return self.decode(index)
+
+    def materialize(self, index: int) -> Dict[str, Any]:
+        """Build the full result row for one grid index"""
+        return evaluate_row(self.decode(index), self.seed, self.permutation_id(index))
+
+    def run(self, topn: int, start: int = 0, stop: Optional[int] = None,
+            chunk_size: int = DEFAULT_CHUNK, top: Optional[TopN] = None,
+            stats: Optional[RunStats] = None,
+            on_chunk: Optional[Callable[[int, TopN, RunStats], Any]] = None) -> Tuple[TopN, RunStats]:
+        """Evaluate [start, stop) chunk by chunk into a TopN and RunStats"""
+        stop = self.size if stop is None else min(stop, self.size)
+        top = top if top is not None else TopN(topn)
+        stats = stats if stats is not None else RunStats()
+        for lo in range(start, stop, chunk_size):
+            hi = min(stop, lo + chunk_size)
+            chunk = self.evaluate_chunk(lo, hi)
+            if "feasible" in chunk:
+                ok = chunk["feasible"]
+                top.offer(chunk["score"][ok], chunk["index"][ok])
+            else:
+                top.offer(chunk["score"], chunk["index"])
+            stats.add_chunk(chunk)
+            if on_chunk:
+                on_chunk(hi, top, stats)
+        return top, stats
+
+    def top_structures(self, top: TopN) -> List[Dict[str, Any]]:
+        """Materialize ranked result rows for the Top-N survivors"""
+        rows = []
+        for rank, (_, index) in enumerate(top.ranked(), 1):
+            row = self.materialize(index)
+            row["rank"] = rank
+            rows.append(row)
+        return rows
+
+# ==================== ANYTIME SEARCH ====================
+
+class AnytimeSearch:
+    """
+    Budgeted search of grids too large to enumerate. Each round evaluates a
+    Latin-hypercube batch over the plan's blocks, then refines around the
+    current Top-N with single-block digit moves and small joint jitters.
+    Rounds yield improving Top-N snapshots until the evaluation or time
+    budget runs out (or the grid is exhausted).
+    """
+
+    def __init__(self, evaluator: GridEvaluator, topn: int, batch_size: int = ANYTIME_BATCH,
+                 refine_radius: int = 2, rng_seed: Optional[int] = None):
+        self.ev = evaluator
+        self.topn = topn
+        self.batch_size = max(1, batch_size)
+        self.refine_radius = max(1, refine_radius)
+        self.rng = np.random.default_rng(evaluator.seed if rng_seed is None else rng_seed)
+        self.top = TopN(topn)
+        self.stats = RunStats()
+        self.evaluated = 0
+        self.rounds = 0
+        self._uniform = []   # LHS scores (infeasible rows as -inf), for the tail estimate
+        self._seen = np.zeros(evaluator.size, dtype=bool) if evaluator.size <= SEEN_BITMAP_LIMIT else set()
+
+    def _fresh(self, index: np.ndarray, limit: int) -> np.ndarray:
+        """Drop already-evaluated indices, mark the rest seen (at most limit)"""
+        index = np.unique(index[(index >= 0) & (index < self.ev.size)])
+        if isinstance(self._seen, np.ndarray):
+            index = index[~self._seen[index]][:limit]
+            self._seen[index] = True
+        else:
+            index = np.array([i for i in index.tolist() if i not in self._seen][:limit], dtype=np.int64)
+            self._seen.update(index.tolist())
+        return index
+
+    def _lhs(self, n: int) -> np.ndarray:
+        """Latin-hypercube sample of n plan indices: one stratum per sample in every block"""
+        index = np.zeros(n, dtype=np.int64)
+        for radix, stride in zip(self.ev.radix, self.ev.strides):
+            strata = (self.rng.permutation(n) + self.rng.random(n)) / n
+            index += np.minimum((strata * radix).astype(np.int64), radix - 1) * stride
+        return index
+
+    def _neighbours(self) -> np.ndarray:
+        """Single-block moves and joint jitters around the current Top-N"""
+        base = self.top.indices
+        if len(base) == 0:
+            return np.empty(0, dtype=np.int64)
+        r = self.refine_radius
+        moves, jitter = [], base.copy()
+        for radix, stride in zip(self.ev.radix, self.ev.strides):
+            digit = (base // stride) % radix
+            for step in range(-r, r + 1):
+                ok = (digit + step >= 0) & (digit + step < radix)
+                if step:
+                    moves.append(base[ok] + step * stride)
+            shifted = np.clip(digit + self.rng.integers(-r, r + 1, len(base)), 0, radix - 1)
+            jitter += (shifted - digit) * stride
+        return np.concatenate(moves + [jitter])
+
+    def _unseen(self, n: int) -> np.ndarray:
+        """Sweep not-yet-evaluated indices once random batches stop finding any"""
+        if isinstance(self._seen, np.ndarray):
+            return np.flatnonzero(~self._seen)[:n]
+        return self.rng.integers(0, self.ev.size, n)
+
+    def _evaluate(self, index: np.ndarray, uniform: bool = False):
+        if len(index) == 0:
+            return
+        chunk = self.ev.evaluate_indices(index)
+        ok = chunk.get("feasible")
+        scores = chunk["score"] if ok is None else np.where(ok, chunk["score"], -np.inf)
+        self.top.offer(scores[scores > -np.inf], index[scores > -np.inf])
+        self.stats.add_chunk(chunk)
+        self.evaluated += len(index)
+        if uniform:
+            self._uniform.append(scores)
+
+    def run(self, max_evals: Optional[int] = None, time_budget: Optional[float] = None,
+            on_snapshot: Optional[Callable[[TopN, RunStats, Dict[str, Any]], Any]] = None,
+            on_round: Optional[Callable[[int], Any]] = None,
+            stop_when_proven: bool = True) -> Tuple[TopN, RunStats]:
+        """Search until max_evals rows or time_budget seconds are spent, or the Top-N scores are proven"""
+        deadline = time.monotonic() + time_budget if time_budget else None
+        max_evals = min(max_evals or self.ev.size, self.ev.size)
+        while self.evaluated < max_evals:
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            before, best = self.evaluated, self.top.ranked()
+            room = max_evals - self.evaluated
+            self._evaluate(self._fresh(self._lhs(min(self.batch_size, room)), room), uniform=True)
+            room = max_evals - self.evaluated
+            self._evaluate(self._fresh(self._neighbours(), room))
+            if self.evaluated == before:
+                room = max_evals - self.evaluated
+                self._evaluate(self._fresh(self._unseen(min(self.batch_size, room)), room))
+            self.rounds += 1
+            if on_snapshot and self.top.ranked() != best:
+                on_snapshot(self.top, self.stats, self.report())
+            if on_round:
+                on_round(self.evaluated)
+            if stop_when_proven and self._gap()[1]:
+                break
+        return self.top, self.stats
+
+    def _score_bound(self) -> np.ndarray:
+        """
+        Upper bound on the exhaustive Top-N scores. Score depends only on the
+        (amount, haircut) cell and every cell holds the same number of plan
+        rows, so the best n scores are at most the best cells repeated.
+        """
+        table = np.sort(np.asarray(self.ev.score_table, dtype=float).ravel())[::-1]
+        if self.ev.size == 0 or table.size == 0:
+            return np.empty(0)
+        per_cell = self.ev.size // table.size
+        n = min(self.topn, self.ev.size)
+        return np.repeat(table[: -(-n // per_cell)], per_cell)[:n]
+
+    def _gap(self) -> Tuple[Dict[str, Any], bool]:
+        """(score gap bound vs the exhaustive Top-N, whether the found scores are provably optimal)"""
+        found = np.sort(self.top.scores)[::-1]
+        # A fully evaluated grid is its own exhaustive answer
+        bound = found if self.evaluated >= self.ev.size else self._score_bound()
+        n = min(len(found), len(bound))
+        full = len(found) == len(bound)
+        sum_bound = float(bound.sum()) if len(bound) else 0.0
+        shortfall = float((bound[:n] - found[:n]).sum()) + float(bound[n:].sum())
+        gap = {
+            "best": float(bound[0] - found[0]) if n else None,
+            "nth": float(bound[-1] - found[-1]) if full and n else None,
+            "sum_pct": round(100 * shortfall / sum_bound, 4) if sum_bound else 0.0,
+        }
+        return gap, bool(full and shortfall <= 0)
+
+    def report(self) -> Dict[str, Any]:
+        """Coverage, proven gap to the exhaustive Top-N and a tail estimate of better unseen rows"""
+        size = self.ev.size
+        found = np.sort(self.top.scores)[::-1]
+        coverage = self.evaluated / size if size else 1.0
+        gap, proven = self._gap()
+        full = len(found) == min(self.topn, size)
+
+        # Estimated unseen rows strictly better than the current n-th score,
+        # from the uniform (LHS) samples; rule of three when none were seen
+        uniform = np.concatenate(self._uniform) if self._uniform else np.empty(0)
+        threshold = found[-1] if full and len(found) else -np.inf
+        hits = int(np.count_nonzero(uniform > threshold))
+        unseen = size - self.evaluated
+        rate = hits / len(uniform) if len(uniform) else 1.0
+        rate_95 = (3.0 / len(uniform) if hits == 0 else min(1.0, rate + 1.96 * math.sqrt(rate * (1 - rate) / len(uniform)))) if len(uniform) else 1.0
+
+        return {
+            "mode": "anytime",
+            "evaluated": self.evaluated,
+            "grid_size": size,
+            "coverage_pct": round(100 * coverage, 4),
+            "rounds": self.rounds,
+            "score_gap_bound": gap,
+            "proven_optimal_scores": proven,
+            "est_better_unseen": round(rate * unseen, 1),
+            "est_better_unseen_95": round(rate_95 * unseen, 1),
+        }
+
+# ==================== RUN ESTIMATE ====================
+
+def _wilson(hits: int, n: int, z: float = 1.96) -> Tuple[float, float]:
+    """Wilson score interval for a binomial proportion"""
+    if n <= 0:
+        return 0.0, 1.0
+    p = hits / n
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+def estimate_run(evaluator: GridEvaluator, topn: int = 20, max_card: int = 250_000,
+                 shard_size: int = 50_000, sync_seconds: float = 10.0,
+                 time_budget: float = 0.25, batch_size: int = ANYTIME_BATCH,
+                 chunk_size: int = DEFAULT_CHUNK, rng_seed: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Project a run of evaluator's grid from a time-boxed random sample pushed
+    through the same chunk pipeline as GridEvaluator.run. Survivors are the
+    planner's exact count; tier mix, per-row cost and peak memory are
+    measured on the sample, so the cost is bounded by time_budget and the
+    axis lengths, never by the grid size.
+    """
+    size = evaluator.size
+    rng = np.random.default_rng(evaluator.seed if rng_seed is None else rng_seed)
+    top, stats = TopN(topn), RunStats()
+    exhaustive = size <= chunk_size   # one chunk costs about as much as the sample
+    deadline = time.perf_counter() + time_budget
+    seconds, timed, peak_per_row = 0.0, 0, 0.0
+
+    while size and (stats.processed == 0 or (not exhaustive and stats.processed < size
+                                             and time.perf_counter() < deadline)):
+        index = (np.arange(size, dtype=np.int64) if exhaustive
+                 else np.sort(rng.integers(0, size, batch_size, dtype=np.int64)))
+        first = stats.processed == 0
+        if first:
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        t0 = time.perf_counter()
+        chunk = evaluator.evaluate_indices(index)
+        ok = chunk.get("feasible")
+        top.offer(chunk["score"][ok] if ok is not None else chunk["score"],
+                  chunk["index"][ok] if ok is not None else chunk["index"])
+        stats.add_chunk(chunk)
+        elapsed = time.perf_counter() - t0
+        if first:
+            peak_per_row = (tracemalloc.get_traced_memory()[1] - base) / len(index)
+            if started_tracing:
+                tracemalloc.stop()
+        # The first batch pays allocator warm-up (and tracing); time the rest
+        if not first or exhaustive or time.perf_counter() >= deadline:
+            seconds += elapsed
+            timed += len(index)
+        del chunk
+
+    per_row = seconds / timed if timed else 0.0
+    wall = size * per_row
+    survivors = evaluator.plan.feasible
+    kept = stats.processed - stats.rejected
+
+    def projected(hits: int) -> Dict[str, Any]:
+        # An exhaustive sample is exact; otherwise a Wilson interval on the share
+        share = hits / kept if kept else 0.0
+        lo, hi = (share, share) if exhaustive else _wilson(hits, kept)
+        return {"estimate": round(survivors * share),
+                "ci95": [math.floor(survivors * lo), math.ceil(survivors * hi)]}
+
+    shards = max(1, -(-size // max(1, shard_size)))
+    if size > max_card:
+        mode, why = "sampled", f"{size:,} rows exceed the {max_card:,} guardrail; use anytime mode"
+    elif wall <= sync_seconds:
+        mode, why = "sync", f"projected {wall:.1f}s fits the {sync_seconds:.0f}s sync budget"
+    elif shards == 1:
+        mode, why = "async", f"projected {wall:.1f}s is too long to run in a request"
+    else:
+        mode, why = "sharded", f"projected {wall:.1f}s splits into {shards} shards of {shard_size:,}"
+
+    return {
+        "planned": size,
+        "survivors": {"estimate": survivors, "ci95": [survivors, survivors], "method": "planner"},
+        "tier_mix": {tier: projected(stats.tier_counts[tier]) for tier in TIERS},
+        "near_misses": projected(stats.near_misses),
+        "sample": {"rows": stats.processed, "exhaustive": exhaustive,
+                   "seconds": round(seconds, 4), "us_per_row": round(per_row * 1e6, 3)},
+        "projected_seconds": round(wall, 2),
+        "projected_peak_mb": round(peak_per_row * min(size, chunk_size) / 2 ** 20, 1),
+        "shards": shards,
+        "recommendation": mode,
+        "recommendation_reason": why,
+    }
+
+# ==================== TESTS ====================
+# python -m unittest phase1_grid_engine
+
+import unittest
+
+_TEST_KEYS = ["senior_tenor", "senior_coupon", "min_dscr_senior", "senior_amount", "sidecar_haircut_pct", "io_months"]
+_TEST_VALUES = [[10, 15, 20, 21, 25], [0.04, 0.05, 0.06], [1.2, 1.24, 1.3, 1.4],
+                [5e6, 1e7, 2e7], [0.05, 0.1, 0.2], [0, 6, 12, 240]]
+# Unconstrained, and with tenor cap plus a NOI limit that leaves per-row residue for the kernel
+_TEST_CONSTRAINTS = ({}, {"tenor_cap": 20, "noi_monthly": 150_000.0})
+
+class TestAnytimeAgainstExhaustive(unittest.TestCase):
+    """Anytime search and estimate_run checked against exhaustive runs of small grids"""
+
+    def _grids(self):
+        for constraints in _TEST_CONSTRAINTS:
+            evaluator = GridEvaluator(_TEST_KEYS, _TEST_VALUES, 7, **constraints)
+            yield constraints, evaluator, evaluator.run(20)
+
+    def test_full_budget_reproduces_exhaustive(self):
+        for constraints, evaluator, (top, stats) in self._grids():
+            search = AnytimeSearch(evaluator, 20, batch_size=64)
+            found, found_stats = search.run(max_evals=evaluator.size, stop_when_proven=False)
+            self.assertEqual(found.to_dict(), top.to_dict(), constraints)
+            self.assertEqual(found_stats.to_dict(), stats.to_dict(), constraints)
+            report = search.report()
+            self.assertEqual(report["coverage_pct"], 100.0)
+            self.assertTrue(report["proven_optimal_scores"])
+            self.assertEqual(report["est_better_unseen_95"], 0.0)
+
+    def test_partial_budgets_respect_gap_bound(self):
+        for constraints, evaluator, (top, _) in self._grids():
+            exhaustive = np.sort(top.scores)[::-1]
+            bound = AnytimeSearch(evaluator, 20)._score_bound()
+            self.assertTrue(np.all(bound >= exhaustive), constraints)
+            for budget in (50, 100, 200, 400, 800):
+                search = AnytimeSearch(evaluator, 20, batch_size=64, rng_seed=budget)
+                found, found_stats = search.run(max_evals=budget, stop_when_proven=False)
+                report = search.report()
+                gap = report["score_gap_bound"]
+                scores = np.sort(found.scores)[::-1]
+                label = (constraints, budget)
+
+                # Each row evaluated once, coverage as reported
+                self.assertEqual(found_stats.processed, search.evaluated, label)
+                self.assertLessEqual(search.evaluated, min(budget, evaluator.size), label)
+                self.assertAlmostEqual(report["coverage_pct"], 100 * search.evaluated / evaluator.size, places=3)
+
+                # The true shortfall never exceeds the bound
+                self.assertLessEqual(exhaustive[0] - scores[0], gap["best"], label)
+                if gap["nth"] is not None:
+                    self.assertLessEqual(exhaustive[-1] - scores[-1], gap["nth"], label)
+                shortfall = exhaustive.sum() - scores.sum()
+                self.assertLessEqual(100 * shortfall / exhaustive.sum(), gap["sum_pct"] + 1e-4, label)
+                if report["proven_optimal_scores"]:
+                    self.assertEqual(scores.tolist(), exhaustive.tolist(), label)
+
+    def test_estimate_run(self):
+        for constraints, evaluator, (_, stats) in self._grids():
+            kept = stats.processed - stats.rejected
+            exact = estimate_run(evaluator, time_budget=5.0)
+            self.assertTrue(exact["sample"]["exhaustive"])
+            self.assertEqual(exact["survivors"]["estimate"], kept)
+            for tier in TIERS:
+                self.assertEqual(exact["tier_mix"][tier]["estimate"], stats.tier_counts[tier])
+            self.assertEqual(exact["near_misses"]["estimate"], stats.near_misses)
+
+            # Sampled: the 95% intervals cover the exhaustive counts about 95% of the time
+            covered = total = 0
+            for seed in range(20):
+                sampled = estimate_run(evaluator, chunk_size=64, batch_size=128, time_budget=5.0, rng_seed=seed)
+                self.assertFalse(sampled["sample"]["exhaustive"])
+                self.assertEqual(sampled["survivors"]["estimate"], kept)
+                for tier in TIERS:
+                    lo, hi = sampled["tier_mix"][tier]["ci95"]
+                    covered += lo <= stats.tier_counts[tier] <= hi
+                    total += 1
+            self.assertGreaterEqual(covered / total, 0.85, constraints)
+
+def _wal_month_loop(tenor: int, coupon: float, amount: float, io_months: int = 0) -> float:
+    """The month-by-month WAL loop wal_years replaced, extended with interest-only months"""
+    n = tenor * 12 - io_months
+    r = coupon / 12.0
+    if r <= 0:
+        r = 1e-9
+    annuity = amount * (r / (1 - (1 + r) ** (-n)))
+    outstanding, wal_num = amount, 0.0
+    for m in range(io_months + 1, io_months + n + 1):
+        principal = max(0.0, annuity - outstanding * r)
+        outstanding -= principal
+        wal_num += (m / 12.0) * principal
+    return wal_num / amount if amount > 0 else float(tenor)
+
+# Key order puts coupon first; IO months couple with tenor, so the structure axes fuse into one block
+_PLAN_KEYS = ["senior_coupon", "senior_tenor", "io_months", "min_dscr_senior", "senior_amount", "sidecar_haircut_pct"]
+_PLAN_VALUES = [[0.0, 0.04, 0.07], [0, 5, 10, 20, 25], [-6, 0, 60, 120], [0.0, 1.2, 1.3, 1.45],
+                [5e6, 1e7, 3e7], [0.1, 0.2]]
+# Short IO keeps every tenor x io pair feasible, so each structure axis stays its own block
+_PLAN_VALUES_INDEPENDENT = [[0.0, 0.04, 0.07], [5, 10, 20, 25], [0, 6], [1.2, 1.3, 1.45], [5e6, 1e7, 3e7], [0.1, 0.2]]
+
+class TestGridPlan(unittest.TestCase):
+    """plan_grid pruning, plan index decoding, shard merging and closed-form WAL"""
+
+    def _brute_force(self, values, tenor_cap=None, noi_monthly=None):
+        """Raw grid rows that pass Gate A and the per-row NOI check, as decoded dicts"""
+        rows = []
+        for combo in itertools.product(*values):
+            row = dict(zip(_PLAN_KEYS, combo))
+            tenor, io_m = row["senior_tenor"], row["io_months"]
+            if tenor <= 0 or (tenor_cap is not None and tenor > tenor_cap) or io_m < 0 or io_m >= tenor * 12:
+                continue
+            if noi_monthly:
+                if row["min_dscr_senior"] <= 0:
+                    continue
+                factor = payment_factor_array(np.array([row["senior_coupon"]]), np.array([tenor]),
+                                              np.array([io_m]))[0]
+                if not row["senior_amount"] * factor * row["min_dscr_senior"] <= noi_monthly * (1 + 1e-12):
+                    continue
+            rows.append(row)
+        return rows
+
+    def test_pruning_matches_brute_force(self):
+        grids = itertools.product((_PLAN_VALUES, _PLAN_VALUES_INDEPENDENT), (
+            {}, {"tenor_cap": 20}, {"noi_monthly": 120_000.0},
+            {"tenor_cap": 10, "noi_monthly": 400_000.0}, {"noi_monthly": 1.0}))
+        for values, constraints in grids:
+            evaluator = GridEvaluator(_PLAN_KEYS, values, 11, **constraints)
+            plan = evaluator.plan
+            expected = self._brute_force(values, **constraints)
+            if values is _PLAN_VALUES_INDEPENDENT and not constraints.get("noi_monthly"):
+                self.assertEqual(len(evaluator.blocks), len(_PLAN_KEYS))
+            chunk = evaluator.evaluate_chunk(0, evaluator.size)
+            ok = chunk.get("feasible", np.ones(evaluator.size, dtype=bool))
+            kept = [evaluator.decode(i) for i in np.flatnonzero(ok).tolist()]
+
+            # The planner only removes infeasible rows and the kernel flags the rest
+            self.assertCountEqual(kept, expected, constraints)
+            self.assertEqual(plan.feasible, len(expected), constraints)
+            self.assertEqual(plan.raw_size - plan.pruned["gate_a"] - plan.pruned["gate_b"], plan.feasible)
+            for row in (evaluator.decode(i) for i in range(evaluator.size)):
+                self.assertGreater(row["senior_tenor"], 0)
+                self.assertLessEqual(row["senior_tenor"], constraints.get("tenor_cap", row["senior_tenor"]))
+                self.assertGreaterEqual(row["io_months"], 0)
+                self.assertLess(row["io_months"], row["senior_tenor"] * 12)
+                if constraints.get("noi_monthly"):
+                    self.assertGreater(row["min_dscr_senior"], 0)
+
+    def test_decode_id_round_trip(self):
+        evaluator = GridEvaluator(_PLAN_KEYS, _PLAN_VALUES, 11, noi_monthly=400_000.0)
+        decoded = [evaluator.decode(i) for i in range(evaluator.size)]
+        self.assertEqual(len({tuple(r.values()) for r in decoded}), evaluator.size)
+        for i in range(evaluator.size):
+            pid = evaluator.permutation_id(i)
+            self.assertEqual(evaluator.decode_id(pid), decoded[i])
+            self.assertEqual(evaluator.materialize(i)["permutation_id"], pid)
+
+        other = GridEvaluator(_PLAN_KEYS, _PLAN_VALUES, 12, noi_monthly=400_000.0)
+        with self.assertRaises(ValueError):
+            other.decode_id(evaluator.permutation_id(0))
+        with self.assertRaises(ValueError):
+            evaluator.decode_id(f"{evaluator.spec_hash}-{evaluator.size:x}")
+
+    def test_shards_merge_to_the_whole_run(self):
+        evaluator = GridEvaluator(_PLAN_KEYS, _PLAN_VALUES, 11, noi_monthly=120_000.0)
+        top, stats = evaluator.run(15, chunk_size=37)
+        for bounds in ([0, evaluator.size], [0, 1, 100, evaluator.size], [0, 250, 251, 600, evaluator.size]):
+            merged_top, merged_stats = TopN(15), RunStats()
+            for lo, hi in zip(bounds, bounds[1:]):
+                part_top, part_stats = evaluator.run(15, start=lo, stop=hi, chunk_size=64)
+                # Partials travel through Redis as dicts
+                merged_top.merge(TopN.from_dict(json.loads(json.dumps(part_top.to_dict()))))
+                merged_stats.merge(RunStats.from_dict(json.loads(json.dumps(part_stats.to_dict()))))
+            self.assertEqual(merged_top.to_dict(), top.to_dict(), bounds)
+            self.assertEqual(merged_stats.to_dict(), stats.to_dict(), bounds)
+        self.assertEqual(stats.processed - stats.rejected, evaluator.plan.feasible)
+
+        # Top-N rows score as their scalar evaluation does
+        for score, index in top.ranked():
+            self.assertEqual(evaluator.materialize(index)["day_one_value_total"], score)
+
+    def test_wal_matches_month_loop(self):
+        cases = [(t, c, a, io) for t in (1, 5, 10, 21, 30) for c in (0.0, 0.001, 0.05, 0.12)
+                 for a in (0.0, 1e6, 3e7) for io in (0, 6, 11) if io < t * 12]
+        tenor, coupon, amount, io_m = (np.array(col) for col in zip(*cases))
+        vectorized = wal_years_array(tenor, coupon, amount, io_m)
+        for (t, c, a, io), wal in zip(cases, vectorized):
+            expected = _wal_month_loop(t, c, a, io)  # the loop approximates a zero coupon as 1e-9
+            self.assertAlmostEqual(wal_years(t, c, a, io), expected, delta=1e-5, msg=(t, c, a, io))
+            self.assertAlmostEqual(float(wal), expected, delta=1e-5, msg=(t, c, a, io))
@@ -3,12 +3,21 @@ Phase-1 Data Model v2: Production-Ready with Full Integration
 Tightened validation, source tracking, and UI integration
 """
 
-from dataclasses import dataclass, field, asdict
+from dataclasses import dataclass, field, asdict, replace, MISSING
 from typing import Optional, List, Dict, Any, Literal, Union, Tuple
 from datetime import datetime
 from enum import Enum
+from collections import OrderedDict
 import hashlib
 import json
+import copy
+import operator
+import threading
+from types import MappingProxyType
+
+import numpy as np
+
+from phase1_batch_memo import DerivedBatchMemo
 
 # ==================== CONSTANTS ====================
 
@@ -17,6 +26,7 @@ CURRENCY_PRECISION = 2  # Display precision for currency
 CALC_PRECISION = 6  # Internal calculation precision
 MAX_PERMUTATIONS_WARNING = 250_000
 DEFAULT_RULESET = "v1.0"
+DERIVED_MEMO_MAX = 100_000  # projects kept in the DerivedFields batch memo
 
 # ==================== ENUMS ====================
 
@@ -140,6 +150,46 @@ class ProjectInputs:
 
 # ==================== DERIVED FIELDS ====================
 
+# Rating-based parameters
+RATING_PARAMS = {
+    TenantRating.AAA: {"dscr": 1.45, "dsra": 6, "af": (0.65, 0.80)},
+    TenantRating.AA: {"dscr": 1.35, "dsra": 6, "af": (0.60, 0.75)},
+    TenantRating.A: {"dscr": 1.25, "dsra": 3, "af": (0.55, 0.70)},
+    TenantRating.BBB: {"dscr": 1.15, "dsra": 3, "af": (0.50, 0.65)},
+    TenantRating.NR: {"dscr": 1.25, "dsra": 3, "af": (0.45, 0.60)}
+}
+REPO_CURRENCIES = [Currency.EUR, Currency.GBP, Currency.USD]
+REPO_COUNTRIES = ["UK", "US", "EU"]
+
+# ProjectInputs fields DerivedFields depends on (the batch memo key)
+DERIVED_INPUT_FIELDS = (
+    "gross_it_load_mw", "pue", "gross_monthly_rent", "rent_per_kwh_month", "opex_pct",
+    "capex_cost_per_mw", "land_fees_total", "arranger_fee_pct", "legal_fee_pct",
+    "rating_fee_pct", "lease_years", "tenant_rating", "currency", "country", "ruleset_version"
+)
+
+# Batch output columns, in memo row order
+DERIVED_BATCH_FIELDS = (
+    "net_it_load_mw", "gross_income_m", "gross_income_source", "opex_m", "noi_m",
+    "project_capex", "upfront_fees", "funding_need", "tenor_cap", "dscr_floor_by_rating",
+    "dsra_months", "af_min", "af_max", "repo_eligible_flag", "repo_reason", "ruleset_version"
+)
+
+
+def _round_array(x: np.ndarray, ndigits: int) -> np.ndarray:
+    """np.round that agrees with Python's round() on every element"""
+    out = np.round(x, ndigits)
+    # np.round scales, rounds half-even and unscales; it can only pick a
+    # different neighbour than round() when the scaled value is within a few
+    # ulps of a half, or too large to scale exactly
+    scaled = x * 10.0 ** ndigits
+    frac = scaled - np.floor(scaled)
+    unsure = (np.abs(frac - 0.5) <= 4 * np.spacing(np.abs(scaled))) | (np.abs(scaled) >= 2.0 ** 52)
+    unsure &= np.isfinite(x)
+    if unsure.any():
+        out[unsure] = [round(v, ndigits) for v in x[unsure].tolist()]
+    return out
+
 @dataclass
 class DerivedFields:
     """Auto-computed fields with source tracking"""
@@ -200,19 +250,12 @@ class DerivedFields:
         tenor_cap = inputs.lease_years - 2
 
         # Rating-based parameters
-        rating_params = {
-            TenantRating.AAA: {"dscr": 1.45, "dsra": 6, "af": (0.65, 0.80)},
-            TenantRating.AA: {"dscr": 1.35, "dsra": 6, "af": (0.60, 0.75)},
-            TenantRating.A: {"dscr": 1.25, "dsra": 3, "af": (0.55, 0.70)},
-            TenantRating.BBB: {"dscr": 1.15, "dsra": 3, "af": (0.50, 0.65)},
-            TenantRating.NR: {"dscr": 1.25, "dsra": 3, "af": (0.45, 0.60)}
-        }
-        params = rating_params.get(inputs.tenant_rating, rating_params[TenantRating.NR])
+        params = RATING_PARAMS.get(inputs.tenant_rating, RATING_PARAMS[TenantRating.NR])
 
         # Repo eligibility
         repo_eligible = (
-            inputs.currency in [Currency.EUR, Currency.GBP, Currency.USD] and
-            inputs.country in ["UK", "US", "EU"]
+            inputs.currency in REPO_CURRENCIES and
+            inputs.country in REPO_COUNTRIES
         )
         repo_reason = "Eligible" if repo_eligible else f"Currency/Jurisdiction not repo-eligible"
 
@@ -235,6 +278,85 @@ class DerivedFields:
             ruleset_version=inputs.ruleset_version
         )
 
+    @classmethod
+    def compute_batch(cls, projects: Union[List[ProjectInputs], Dict[str, List[Any]]]) -> Dict[str, np.ndarray]:
+        """
+        Compute derived fields for many projects at once, as one array per
+        field (DERIVED_BATCH_FIELDS order). projects is a list of ProjectInputs
+        or a columnar dict of ProjectInputs field -> values; omitted optional
+        columns take the ProjectInputs defaults. Rows already in the memo are
+        not recomputed; values match compute_from_inputs exactly.
+        """
+        return _derived_memo.compute(projects, cls._compute_columns)
+
+    @staticmethod
+    def _compute_columns(cols: Dict[str, tuple]) -> Dict[str, np.ndarray]:
+        """Vectorized compute_from_inputs over input columns"""
+        n = len(cols.get("pue", ()))
+
+        def floats(name):
+            return np.array([np.nan if v is None else v for v in cols.get(name, ())], dtype=float)
+
+        def column(name, values):
+            dtype = _BATCH_DTYPES.get(name, float)
+            if dtype is object:
+                out = np.empty(n, dtype=object)
+                out[:] = values
+                return out
+            return np.asarray(values, dtype=dtype)
+
+        gross_it_load_mw = floats("gross_it_load_mw")
+        manual = np.array([v is not None for v in cols.get("gross_monthly_rent", ())], dtype=bool)
+        per_kwh = ~manual & np.array([v is not None for v in cols.get("rent_per_kwh_month", ())], dtype=bool)
+
+        # Same operation order as the scalar path, so every float matches bit for bit
+        net_it_load_mw = _round_array(gross_it_load_mw / floats("pue"), 2)
+        gross_income_m = np.where(manual, floats("gross_monthly_rent"), np.where(
+            per_kwh, net_it_load_mw * 1000 * HOURS_PER_MONTH * floats("rent_per_kwh_month"), 0.0))
+        opex_m = _round_array(gross_income_m * floats("opex_pct"), CURRENCY_PRECISION)
+        noi_m = _round_array(gross_income_m - opex_m, CURRENCY_PRECISION)
+
+        project_capex = floats("capex_cost_per_mw") * gross_it_load_mw + floats("land_fees_total")
+        upfront_fees = (floats("arranger_fee_pct") + floats("legal_fee_pct") + floats("rating_fee_pct")) * project_capex
+        funding_need = project_capex + upfront_fees
+
+        params = [RATING_PARAMS.get(r, RATING_PARAMS[TenantRating.NR]) for r in cols.get("tenant_rating", ())]
+        repo = [c in REPO_CURRENCIES and k in REPO_COUNTRIES
+                for c, k in zip(cols.get("currency", ()), cols.get("country", ()))]
+        source = [InputSource.MANUAL if m else InputSource.VARIATIONS if k else InputSource.DEFAULT
+                  for m, k in zip(manual.tolist(), per_kwh.tolist())]
+
+        values = {
+            "net_it_load_mw": net_it_load_mw,
+            "gross_income_m": gross_income_m,
+            "gross_income_source": source,
+            "opex_m": opex_m,
+            "noi_m": noi_m,
+            "project_capex": project_capex,
+            "upfront_fees": upfront_fees,
+            "funding_need": funding_need,
+            "tenor_cap": np.array(cols.get("lease_years", ()), dtype=np.int64) - 2,
+            "dscr_floor_by_rating": [p["dscr"] for p in params],
+            "dsra_months": [p["dsra"] for p in params],
+            "af_min": [p["af"][0] for p in params],
+            "af_max": [p["af"][1] for p in params],
+            "repo_eligible_flag": repo,
+            "repo_reason": ["Eligible" if r else "Currency/Jurisdiction not repo-eligible" for r in repo],
+            "ruleset_version": list(cols.get("ruleset_version", ())),
+        }
+        return {name: column(name, values[name]) for name in DERIVED_BATCH_FIELDS}
+
+_BATCH_DTYPES = {
+    "gross_income_source": object, "tenor_cap": np.int64, "dsra_months": np.int64,
+    "repo_eligible_flag": bool, "repo_reason": object, "ruleset_version": object,
+}
+
+# Input row -> derived row LRU shared by compute_batch callers (thread-safe)
+_derived_memo = DerivedBatchMemo(
+    ProjectInputs, DERIVED_INPUT_FIELDS, DERIVED_BATCH_FIELDS,
+    {"tenant_rating": TenantRating, "currency": Currency}, DERIVED_MEMO_MAX
+)
+
 # ==================== RANGE WITH SOURCE ====================
 
 @dataclass
@@ -260,6 +382,19 @@ class RangeWithSource:
 
 # ==================== PERMUTATION RANGES ====================
 
+# PermutationRanges fields that expand to value axes (the rest are flags/scalars)
+RANGE_AXIS_FIELDS = (
+    "senior_dscr_floor", "senior_coupon", "senior_tenor", "senior_amort",
+    "mezz_dscr_floor", "mezz_coupon", "mezz_tenor", "mezz_amort",
+    "equity_trs_pct", "equity_irr_band", "sidecar_haircut_pct"
+)
+
+def _expand_axis(value: Any) -> tuple:
+    """Values a range field takes: a RangeWithSource expanded, a list as-is, a scalar alone"""
+    if isinstance(value, RangeWithSource):
+        return tuple(value.to_list())
+    return tuple(value) if isinstance(value, list) else (value,)
+
 @dataclass
 class PermutationRanges:
     """All ranges with source tracking and cardinality calculation"""
@@ -314,39 +449,47 @@ class PermutationRanges:
     seed: int = 424242
     chunk_size: int = 800
 
-    def calculate_cardinality(self, tenor_cap: Optional[int] = None) -> Dict[str, Any]:
-        """Calculate expected permutations with clipping"""
+    def axis(self, name: str) -> tuple:
+        """Expanded values of one range field (unset mezz fields count as a single value)"""
+        value = getattr(self, name)
+        if name.startswith("mezz_"):
+            value = value or 1
+        return _expand_axis(value)
 
-        # Helper to get cardinality
-        def get_card(field):
-            if isinstance(field, RangeWithSource):
-                return field.cardinality()
-            elif isinstance(field, list):
-                return len(field)
-            else:
-                return 1
+    def axes(self) -> Dict[str, tuple]:
+        """Expanded values of every range field"""
+        return {name: self.axis(name) for name in RANGE_AXIS_FIELDS}
+
+    def calculate_cardinality(self, tenor_cap: Optional[int] = None,
+                              axes: Optional[Dict[str, tuple]] = None) -> Dict[str, Any]:
+        """Calculate expected permutations with clipping (axes: precomputed self.axes())"""
+
+        axes = axes or self.axes()
+
+        def get_card(name):
+            return len(axes[name])
 
         # Senior cardinality
         senior_card = (
-            get_card(self.senior_dscr_floor) *
-            get_card(self.senior_coupon) *
-            get_card([t for t in self.senior_tenor if t <= (tenor_cap or 100)]) *
-            get_card(self.senior_amort)
+            get_card("senior_dscr_floor") *
+            get_card("senior_coupon") *
+            len([t for t in axes["senior_tenor"] if t <= (tenor_cap or 100)]) *
+            get_card("senior_amort")
         )
 
         # Mezz cardinality (if enabled)
         mezz_card = 1
         if self.mezz_on:
             mezz_card = (
-                get_card(self.mezz_dscr_floor or 1) *
-                get_card(self.mezz_coupon or 1) *
-                get_card(self.mezz_tenor or 1) *
-                get_card(self.mezz_amort or 1)
+                get_card("mezz_dscr_floor") *
+                get_card("mezz_coupon") *
+                get_card("mezz_tenor") *
+                get_card("mezz_amort")
             )
 
         # Other cardinalities
-        equity_card = get_card(self.equity_trs_pct) * get_card(self.equity_irr_band)
-        sidecar_card = get_card(self.sidecar_haircut_pct) if self.zcis or self.rate_floor_sale else 1
+        equity_card = get_card("equity_trs_pct") * get_card("equity_irr_band")
+        sidecar_card = get_card("sidecar_haircut_pct") if self.zcis or self.rate_floor_sale else 1
 
         total = senior_card * mezz_card * equity_card * sidecar_card
 
@@ -370,6 +513,113 @@ class PermutationRanges:
         }
         return hashlib.md5(json.dumps(config, sort_keys=True).encode()).hexdigest()[:8]
 
+# Preview grid keys -> PermutationRanges axis fields
+PREVIEW_GRID_AXES = {
+    "min_dscr_senior": "senior_dscr_floor",
+    "senior_coupon": "senior_coupon",
+    "senior_tenor": "senior_tenor",
+    "senior_amort": "senior_amort",
+    "equity_trs_pct": "equity_trs_pct",
+    "equity_irr_band": "equity_irr_band",
+    "mezz_dscr_floor": "mezz_dscr_floor",
+    "mezz_coupon": "mezz_coupon",
+    "mezz_tenor": "mezz_tenor",
+    "mezz_amort": "mezz_amort",
+    "sidecar_haircut_pct": "sidecar_haircut_pct",
+}
+PRESET_PLAN_CACHE_MAX = 32  # (tenor_cap, noi) plans / estimates kept per compiled grid
+
+@dataclass(frozen=True)
+class CompiledPreset:
+    """
+    Ranges expanded once: axis values, cardinality, signature and the preview
+    grid, plus pruned GridEvaluators and run estimates cached per planner
+    constraint. Shared between callers and request threads, so it holds its
+    own copy of the ranges (`ranges` hands out another copy) and read-only
+    views of axes and cardinality; derive a variant with with_overrides().
+    The plan cache is guarded by _lock, which variants sharing the cache
+    share too.
+    """
+    name: str
+    _ranges: PermutationRanges
+    axes: "MappingProxyType[str, tuple]"
+    cardinality: "MappingProxyType[str, Any]"
+    signature: str
+    grid_keys: Tuple[str, ...]
+    grid_values: Tuple[tuple, ...]
+    _plans: "OrderedDict[tuple, Any]" = field(default_factory=OrderedDict, compare=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, compare=False, repr=False)
+
+    @classmethod
+    def compile(cls, name: str, ranges: PermutationRanges,
+                axes: Optional[Dict[str, tuple]] = None) -> 'CompiledPreset':
+        ranges = copy.deepcopy(ranges)
+        axes = dict(axes or ranges.axes())
+        grid = {key: axes[name] for key, name in PREVIEW_GRID_AXES.items()
+                if not (name.startswith("mezz_") and not ranges.mezz_on)
+                and not (name == "sidecar_haircut_pct" and not (ranges.zcis or ranges.rate_floor_sale))}
+        keys = tuple(sorted(grid))
+        return cls(
+            name=name,
+            _ranges=ranges,
+            axes=MappingProxyType(axes),
+            cardinality=MappingProxyType(ranges.calculate_cardinality(axes=axes)),
+            signature=ranges.get_range_signature(),
+            grid_keys=keys,
+            grid_values=tuple(grid[k] for k in keys)
+        )
+
+    @property
+    def ranges(self) -> PermutationRanges:
+        """A copy of the compiled ranges, free for the caller to change"""
+        return copy.deepcopy(self._ranges)
+
+    def with_overrides(self, **changes) -> 'CompiledPreset':
+        """
+        A variant with some PermutationRanges fields replaced. Unchanged axes
+        are reused, and so are the cached plans when the grid comes out the same.
+        """
+        ranges = replace(self._ranges, **changes)
+        axes = dict(self.axes)
+        for name in changes:
+            if name in axes:
+                axes[name] = ranges.axis(name)
+        variant = CompiledPreset.compile(self.name, ranges, axes)
+        if (variant.grid_keys, variant.grid_values, ranges.seed) == (self.grid_keys, self.grid_values, self._ranges.seed):
+            variant = replace(variant, _plans=self._plans, _lock=self._lock)
+        return variant
+
+    def _cached(self, key: tuple, build):
+        with self._lock:
+            hit = self._plans.get(key)
+            if hit is not None:
+                self._plans.move_to_end(key)
+                return hit
+        # Built outside the lock; a concurrent build of the same key keeps the first one stored
+        built = build()
+        with self._lock:
+            hit = self._plans.setdefault(key, built)
+            self._plans.move_to_end(key)
+            while len(self._plans) > PRESET_PLAN_CACHE_MAX:
+                self._plans.popitem(last=False)
+        return hit
+
+    def evaluator(self, tenor_cap: Optional[int] = None, noi_monthly: Optional[float] = None):
+        """Pruned GridEvaluator of the preview grid under these planner constraints"""
+        from phase1_grid_engine import GridEvaluator
+        return self._cached(("plan", tenor_cap, noi_monthly), lambda: GridEvaluator(
+            list(self.grid_keys), [list(v) for v in self.grid_values], self._ranges.seed, tenor_cap, noi_monthly))
+
+    def run_estimate(self, tenor_cap: Optional[int] = None, noi_monthly: Optional[float] = None,
+                     max_card: int = MAX_PERMUTATIONS_WARNING, time_budget: float = 0.25) -> Dict[str, Any]:
+        """estimate_run over evaluator(tenor_cap, noi_monthly), sampled once per constraint set"""
+        from phase1_grid_engine import estimate_run
+        evaluator = self.evaluator(tenor_cap, noi_monthly)
+        return self._cached(("estimate", tenor_cap, noi_monthly, max_card, time_budget),
+                            lambda: estimate_run(evaluator, max_card=max_card, time_budget=time_budget))
+
+_compiled_presets: Dict[str, CompiledPreset] = {}
+
 # ==================== VALIDATION GATES ====================
 
 class ValidationGates:
@@ -468,6 +718,101 @@ class ValidationGates:
         result["reason"] = "Gate B passed"
         return result
 
+    @staticmethod
+    def evaluate_batch(structures: Dict[str, Any], derived: DerivedFields) -> 'GateResults':
+        """
+        Gate A and Gate B over a columnar batch of structures (field -> array,
+        same fields as the scalar gates; senior_tenor is required, the rest
+        default to 0). Every failing check sets its GATE_* bit in the row's
+        reason code; text reasons are only rendered via GateResults.explain.
+        """
+        cols = {k: np.asarray(v) for k, v in structures.items()}
+        n = len(cols["senior_tenor"])
+
+        def col(name):
+            return cols[name].astype(float) if name in cols else np.zeros(n)
+
+        # Gate A
+        total_debt = col("senior_amount") + col("mezz_amount")
+        if derived.funding_need > 0:
+            coverage = total_debt / derived.funding_need
+        else:
+            coverage = np.zeros(n)
+        af = col("advance_factor")
+        checks = [
+            (GATE_A_COVERAGE, coverage < 0.85),
+            (GATE_A_TENOR, cols["senior_tenor"] > derived.tenor_cap),
+            (GATE_A_AF, ~((derived.af_min <= af) & (af <= derived.af_max))),
+            # Gate B
+            (GATE_B_DSCR, col("min_dscr_senior") < derived.dscr_floor_by_rating),
+            (GATE_B_CPI_STRESS, col("cpi_0_stress_dscr") < 1.0),
+            (GATE_B_WAL, col("wal_years") > derived.tenor_cap * 0.75),
+            (GATE_B_DSRA, col("dsra_months") < derived.dsra_months),
+        ]
+        codes = np.zeros(n, dtype=np.uint16)
+        for bit, failed in checks:
+            codes |= np.where(failed, bit, 0).astype(np.uint16)
+
+        return GateResults(
+            gate_a=(codes & GATE_A_MASK) == 0,
+            gate_b=(codes & GATE_B_MASK) == 0,
+            near_miss=(coverage >= 0.85) & (coverage < 1.0),
+            codes=codes,
+            structures=cols,
+            derived=derived
+        )
+
+# Gate reason bits packed into GateResults.codes (every failing check is set)
+GATE_A_COVERAGE = 1 << 0
+GATE_A_TENOR = 1 << 1
+GATE_A_AF = 1 << 2
+GATE_B_DSCR = 1 << 3
+GATE_B_CPI_STRESS = 1 << 4
+GATE_B_WAL = 1 << 5
+GATE_B_DSRA = 1 << 6
+GATE_A_MASK = GATE_A_COVERAGE | GATE_A_TENOR | GATE_A_AF
+GATE_B_MASK = GATE_B_DSCR | GATE_B_CPI_STRESS | GATE_B_WAL | GATE_B_DSRA
+GATE_REASON_NAMES = {
+    GATE_A_COVERAGE: "CAPITAL_COVERAGE",
+    GATE_A_TENOR: "TENOR_CAP",
+    GATE_A_AF: "AF_BAND",
+    GATE_B_DSCR: "MIN_DSCR_SENIOR",
+    GATE_B_CPI_STRESS: "CPI_STRESS",
+    GATE_B_WAL: "MAX_WAL",
+    GATE_B_DSRA: "MIN_DSRA",
+}
+
+@dataclass
+class GateResults:
+    """Array-level Gate A/B outcome for a batch of structures"""
+    gate_a: np.ndarray      # bool pass mask
+    gate_b: np.ndarray      # bool pass mask
+    near_miss: np.ndarray   # Gate A coverage in [85%, 100%)
+    codes: np.ndarray       # uint16 GATE_* bits of every failing check
+    structures: Dict[str, np.ndarray]
+    derived: DerivedFields
+
+    @property
+    def passed(self) -> np.ndarray:
+        return self.gate_a & self.gate_b
+
+    def reason_counts(self) -> Dict[str, int]:
+        """Number of structures failing each check"""
+        return {name: int(np.count_nonzero(self.codes & bit)) for bit, name in GATE_REASON_NAMES.items()}
+
+    @staticmethod
+    def reason_names(code: int) -> List[str]:
+        """Decode one reason code into its failing check names"""
+        return [name for bit, name in GATE_REASON_NAMES.items() if code & bit]
+
+    def explain(self, i: int) -> Dict[str, Dict[str, Any]]:
+        """Scalar gate results (reason text, hints) for structure i, rendered on demand"""
+        structure = {k: v[i].item() for k, v in self.structures.items()}
+        return {
+            "gate_a": ValidationGates.gate_a_feasibility(structure, self.derived),
+            "gate_b": ValidationGates.gate_b_credit(structure, self.derived)
+        }
+
 # ==================== PERMUTATION RESULT ====================
 
 @dataclass
@@ -530,11 +875,197 @@ class PermutationResult:
         """Total day-one value (core + net sidecar)"""
         return self.day_one_value_core + self.net_sidecar_value
 
+# Columns the result table dictionary-encodes (few distinct values per run)
+RESULT_CATEGORY_FIELDS = (
+    "chunk_id", "ruleset_version", "range_signature", "senior_source", "tier",
+    "gate_a_reason", "gate_b_reason", "repo_reason", "near_miss_hints"
+)
+# Derived columns the table can order by
+RESULT_VIRTUAL_FIELDS = {
+    "total_day_one_value": lambda t: t.column("day_one_value_core") + t.column("net_sidecar_value"),
+}
+
+class PermutationResultTable:
+    """
+    Columnar store of PermutationResult rows. Engines append blocks of
+    columns; numeric fields live in typed NumPy arrays (None as NaN for the
+    optional floats), repeated strings/enums/hint lists as int32 codes into a
+    per-column category list, and permutation ids as fixed-width bytes.
+    PermutationResult objects are only built for rows read back out.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._len = 0
+        self._capacity = max(1, capacity)
+        self._fields = {f.name: f for f in PermutationResult.__dataclass_fields__.values()}
+        self._cols: Dict[str, np.ndarray] = {}
+        self._categories: Dict[str, Dict[Any, int]] = {}
+        for name, f in self._fields.items():
+            if name in RESULT_CATEGORY_FIELDS:
+                dtype = np.int32
+                self._categories[name] = {}
+            elif name == "permutation_id":
+                dtype = "S1"
+            elif f.type in (bool,):
+                dtype = bool
+            elif f.type in (int,):
+                dtype = np.int64
+            else:
+                dtype = np.float64
+            self._cols[name] = np.empty(self._capacity, dtype=dtype)
+
+    def __len__(self) -> int:
+        return self._len
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the used part of the columns"""
+        return sum(col[:self._len].nbytes for col in self._cols.values())
+
+    @classmethod
+    def from_results(cls, results: List[PermutationResult]) -> 'PermutationResultTable':
+        table = cls(capacity=len(results))
+        if results:
+            table.append_block({name: [getattr(r, name) for r in results] for name in table._fields})
+        return table
+
+    def _reserve(self, extra: int):
+        if self._len + extra <= self._capacity:
+            return
+        capacity = max(self._len + extra, self._capacity * 2)
+        for name, col in self._cols.items():
+            grown = np.empty(capacity, dtype=col.dtype)
+            grown[:self._len] = col[:self._len]
+            self._cols[name] = grown
+        self._capacity = capacity
+
+    def append(self, result: PermutationResult):
+        self.append_block({name: [getattr(result, name)] for name in self._fields})
+
+    def append_block(self, columns: Dict[str, Any]):
+        """
+        Append rows given as field -> sequence (or a scalar shared by the whole
+        block). Required PermutationResult fields must be present; optional
+        ones default as in the dataclass.
+        """
+        n = max((len(v) for v in columns.values() if not _is_scalar(v)), default=1)
+        self._reserve(n)
+        lo, hi = self._len, self._len + n
+        for name, f in self._fields.items():
+            if name in columns:
+                values = columns[name]
+            elif f.default is not MISSING:
+                values = [f.default] * n
+            elif f.default_factory is not MISSING:
+                values = [f.default_factory()] * n
+            else:
+                raise KeyError(f"Missing required result column: {name}")
+            if _is_scalar(values):
+                values = [values] * n
+
+            col = self._cols[name]
+            if name in self._categories:
+                index = self._categories[name]
+                col[lo:hi] = np.fromiter(
+                    (index.setdefault(tuple(v) if isinstance(v, list) else v, len(index)) for v in values),
+                    dtype=np.int32, count=n)
+            elif name == "permutation_id":
+                ids = np.array([str(v).encode() for v in values])
+                if ids.dtype.itemsize > col.dtype.itemsize:
+                    col = self._cols[name] = col.astype(ids.dtype)
+                col[lo:hi] = ids
+            elif col.dtype == np.float64:
+                col[lo:hi] = [np.nan if v is None else v for v in values]
+            else:
+                col[lo:hi] = values
+        self._len = hi
+
+    def column(self, name: str) -> np.ndarray:
+        """Values of a numeric, bool or virtual column (categories come back as codes)"""
+        if name in RESULT_VIRTUAL_FIELDS:
+            return RESULT_VIRTUAL_FIELDS[name](self)
+        return self._cols[name][:self._len]
+
+    def equals(self, name: str, value: Any) -> np.ndarray:
+        """Row mask of a category column equal to value"""
+        code = self._categories[name].get(tuple(value) if isinstance(value, list) else value)
+        if code is None:
+            return np.zeros(self._len, dtype=bool)
+        return self.column(name) == code
+
+    def row(self, i: int) -> PermutationResult:
+        """Materialize one row as a PermutationResult"""
+        decoded = self._decoded_cache()
+        kwargs = {}
+        for name, f in self._fields.items():
+            v = self._cols[name][i]
+            if name in self._categories:
+                v = decoded[name][v]
+                kwargs[name] = list(v) if name == "near_miss_hints" else v
+            elif name == "permutation_id":
+                kwargs[name] = v.decode()
+            elif self._cols[name].dtype == np.float64:
+                kwargs[name] = None if np.isnan(v) and f.default is None else float(v)
+            else:
+                kwargs[name] = v.item()
+        return PermutationResult(**kwargs)
+
+    def _decoded_cache(self) -> Dict[str, List[Any]]:
+        # Code -> value lists, rebuilt only when a category has grown
+        cache = self.__dict__.setdefault("_decoded", {})
+        for name, index in self._categories.items():
+            if len(cache.get(name, ())) != len(index):
+                cache[name] = list(index)
+        return cache
+
+    def top_k(self, k: int, order_by: List[Tuple[str, bool]] = (("total_day_one_value", True),),
+              where: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Row indices of the first k rows under order_by [(column, descending)],
+        ties broken by insertion order and unset optional values (NaN) last in
+        either direction. Partial selection: argpartition on the first key,
+        then only the head (plus rows tied with its boundary) is fully sorted.
+        """
+        idx = np.flatnonzero(where) if where is not None else np.arange(self._len)
+        if k <= 0 or not len(idx):
+            return idx[:0]
+        keys = []
+        for name, descending in order_by:
+            values = self.column(name)[idx]
+            if name in self._categories:
+                raise ValueError(f"Cannot order by category column {name}")
+            values = values.astype(np.float64) if values.dtype == bool else values
+            keys.append(-values if descending else values)
+
+        head = np.arange(len(idx))
+        if k < len(idx):
+            # NaN never compares <=, so rank it as +inf; lexsort below still puts it after +inf
+            first = np.where(np.isnan(keys[0]), np.inf, keys[0])
+            boundary = first[np.argpartition(first, k - 1)[k - 1]]
+            head = np.flatnonzero(first <= boundary)
+        order = np.lexsort([head] + [key[head] for key in reversed(keys)])
+        return idx[head[order[:k]]]
+
+def _is_scalar(value: Any) -> bool:
+    return isinstance(value, (str, bytes, Enum)) or not hasattr(value, "__len__")
+
 # ==================== PRESET BUNDLES ====================
 
 class PresetBundles:
     """Enhanced presets with source tracking"""
 
+    NAMES = ("repo_first_aaa_aa", "balanced_a", "value_max_bbb")
+
+    @classmethod
+    def compiled(cls, name: str) -> 'CompiledPreset':
+        """The preset compiled once per process (KeyError for an unknown name)"""
+        if name not in cls.NAMES:
+            raise KeyError(f"Unknown preset: {name}")
+        preset = _compiled_presets.get(name)
+        if preset is None:
+            preset = _compiled_presets.setdefault(name, CompiledPreset.compile(name, getattr(cls, name)()))
+        return preset
+
     @staticmethod
     def repo_first_aaa_aa() -> PermutationRanges:
         """AAA/AA Repo-First configuration"""
@@ -589,32 +1120,57 @@ class PresetBundles:
 # ==================== EXPORTS ====================
 
 def export_top_structures(
-    results: List[PermutationResult],
-    top_n: int = 20
+    results: Union[List[PermutationResult], PermutationResultTable],
+    top_n: int = 20,
+    order_by: Optional[List[Tuple[str, bool]]] = None
 ) -> List[Dict[str, Any]]:
-    """Export top structures with full details"""
+    """
+    Export top structures with full details. A PermutationResultTable is
+    ranked by partial selection and only the exported rows are materialized;
+    order_by [(column, descending)] defaults to total day-one value.
+    """
+
+    if isinstance(results, PermutationResultTable):
+        viable = ~results.equals("tier", ViabilityTier.NOT_VIABLE)
+        top = results.top_k(top_n, order_by or (("total_day_one_value", True),), where=viable)
+        return [_export_row(i + 1, results.row(int(j))) for i, j in enumerate(top)]
 
     viable = [r for r in results if r.tier != ViabilityTier.NOT_VIABLE]
-    sorted_results = sorted(viable, key=lambda x: x.total_day_one_value, reverse=True)
-
-    top_structures = []
-    for i, result in enumerate(sorted_results[:top_n]):
-        top_structures.append({
-            'rank': i + 1,
-            'tier': result.tier.value,
-            'day_one_value_core': round(result.day_one_value_core, CURRENCY_PRECISION),
-            'day_one_value_sidecar': round(result.net_sidecar_value, CURRENCY_PRECISION),
-            'day_one_value_total': round(result.total_day_one_value, CURRENCY_PRECISION),
-            'min_dscr_senior': result.min_dscr_senior,
-            'min_dscr_mezz': result.min_dscr_mezz,
-            'wal': result.wal_years,
-            'repo_eligible': 'Y' if result.repo_eligible else 'N',
-            'near_miss': 'Y' if result.near_miss else 'N',
-            'ruleset_version': result.ruleset_version,
-            'seed': result.seed
-        })
-
-    return top_structures
+    if order_by:
+        # Stable sorts, least significant key first; unset optionals sort last as in top_k
+        for name, descending in reversed(order_by):
+            viable = sorted(viable, key=_order_key(name, descending))
+        sorted_results = viable
+    else:
+        sorted_results = sorted(viable, key=lambda x: x.total_day_one_value, reverse=True)
+
+    return [_export_row(i + 1, result) for i, result in enumerate(sorted_results[:top_n])]
+
+def _order_key(name: str, descending: bool):
+    get = operator.attrgetter(name)
+
+    def key(result):
+        value = get(result)
+        if value is None:
+            return (True, 0)
+        return (False, -value if descending else value)
+    return key
+
+def _export_row(rank: int, result: PermutationResult) -> Dict[str, Any]:
+    return {
+        'rank': rank,
+        'tier': result.tier.value,
+        'day_one_value_core': round(result.day_one_value_core, CURRENCY_PRECISION),
+        'day_one_value_sidecar': round(result.net_sidecar_value, CURRENCY_PRECISION),
+        'day_one_value_total': round(result.total_day_one_value, CURRENCY_PRECISION),
+        'min_dscr_senior': result.min_dscr_senior,
+        'min_dscr_mezz': result.min_dscr_mezz,
+        'wal': result.wal_years,
+        'repo_eligible': 'Y' if result.repo_eligible else 'N',
+        'near_miss': 'Y' if result.near_miss else 'N',
+        'ruleset_version': result.ruleset_version,
+        'seed': result.seed
+    }
 
 # ==================== UI INTEGRATION ====================
 
@@ -642,24 +1198,26 @@ class Phase1Integration:
         }
 
     @staticmethod
-    def get_cardinality_preview(ranges: PermutationRanges, tenor_cap: int) -> Dict[str, Any]:
+    def get_cardinality_preview(ranges: Union[PermutationRanges, CompiledPreset], tenor_cap: int,
+                                noi_monthly: Optional[float] = None,
+                                max_card: int = MAX_PERMUTATIONS_WARNING,
+                                time_budget: float = 0.25) -> Dict[str, Any]:
         """Generate cardinality preview for Permutations page"""
-        card = ranges.calculate_cardinality(tenor_cap)
-
-        # Gate A prune estimate
-        prune_estimate = 0.15  # Base 15% prune rate
-        if ranges.wrap:
-            prune_estimate -= 0.05  # Wrap reduces pruning
-        if ranges.mezz_on:
-            prune_estimate -= 0.03  # Mezz reduces pruning
+        compiled = ranges if isinstance(ranges, CompiledPreset) else CompiledPreset.compile("custom", ranges)
+        ranges, card = compiled._ranges, compiled.cardinality
 
-        expected_after_prune = int(card["total"] * (1 - prune_estimate))
+        # Gates are planned exactly; tier mix, runtime and memory come from a time-boxed sample
+        estimate = compiled.run_estimate(tenor_cap, noi_monthly, max_card, time_budget)
+        expected_after_prune = estimate["survivors"]["estimate"]
+        prune_pct = 1 - expected_after_prune / card["total"] if card["total"] else 0.0
 
         return {
             "expected_permutations": card["total"],
             "expected_after_prune": expected_after_prune,
-            "prune_estimate_pct": f"{prune_estimate:.0%}",
-            "chunks_needed": card["chunks_needed"],
+            "prune_estimate_pct": f"{prune_pct:.0%}",
+            "chunks_needed": (expected_after_prune + ranges.chunk_size - 1) // ranges.chunk_size,
+            "run_estimate": estimate,
+            "recommendation": estimate["recommendation"],
             "warning": card["warning"],
             "warning_message": f"High permutation count ({card['total']:,}). Consider narrowing ranges." if card["warning"] else None,
             "breakdown": {
@@ -668,5 +1226,112 @@ class Phase1Integration:
                 "equity": card["equity"],
                 "sidecar": card["sidecar"]
             },
-            "range_signature": ranges.get_range_signature()
-        }
\ No newline at end of file
+            "range_signature": compiled.signature
+        }
+# ==================== TESTS ====================
+# python -m unittest phase1_model_v2
+
+import unittest
+from unittest import mock
+
+class TestCompiledPresetPlans(unittest.TestCase):
+
+    def test_variant_with_same_grid_shares_cache_and_lock(self):
+        preset = CompiledPreset.compile("balanced_a", PresetBundles.balanced_a())
+        variant = preset.with_overrides(wrap=not preset.ranges.wrap)
+        self.assertIs(variant._plans, preset._plans)
+        self.assertIs(variant._lock, preset._lock)
+        other = preset.with_overrides(senior_tenor=[5])
+        self.assertIsNot(other._lock, preset._lock)
+
+    def test_callers_cannot_change_a_shared_preset(self):
+        ranges = PresetBundles.balanced_a()
+        preset = CompiledPreset.compile("balanced_a", ranges)
+        total, tenors = preset.cardinality["total"], preset.axes["senior_tenor"]
+
+        ranges.senior_tenor.append(99)
+        preset.ranges.senior_tenor.append(99)
+        with self.assertRaises(TypeError):
+            preset.axes["senior_tenor"] = (5,)
+        with self.assertRaises(TypeError):
+            preset.cardinality["total"] = 0
+
+        self.assertNotIn(99, preset.ranges.senior_tenor)
+        self.assertEqual(preset.axes["senior_tenor"], tenors)
+        self.assertEqual(preset.cardinality["total"], total)
+        self.assertEqual(preset.with_overrides(wrap=not preset.ranges.wrap).cardinality["total"], total)
+
+    def test_concurrent_plans_on_a_small_cache(self):
+        """Threads churning an evicting plan cache never fail and see one evaluator per live key"""
+        from phase1_grid_engine import GridEvaluator
+        preset = CompiledPreset.compile("balanced_a", PresetBundles.balanced_a())
+        expected = {cap: GridEvaluator(list(preset.grid_keys), [list(v) for v in preset.grid_values],
+                                       preset.ranges.seed, cap).spec_hash for cap in range(10, 16)}
+        errors = []
+
+        def worker(seed):
+            try:
+                for i in range(30):
+                    cap = 10 + (seed + i) % 6
+                    if preset.evaluator(cap).spec_hash != expected[cap]:
+                        errors.append("wrong plan")
+            except Exception as e:
+                errors.append(repr(e))
+
+        with mock.patch(__name__ + ".PRESET_PLAN_CACHE_MAX", 3):
+            threads = [threading.Thread(target=worker, args=(s,)) for s in range(16)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            self.assertLessEqual(len(preset._plans), 3)
+        self.assertEqual(errors, [])
+
+def _ranked_results(n: int, seed: int) -> List[PermutationResult]:
+    """Results with ties in day-one value and min_dscr_mezz set on every sixth row only"""
+    rng = np.random.default_rng(seed)
+    results = []
+    for i in range(n):
+        results.append(PermutationResult(
+            permutation_id=f"p-{i}", seed=seed, chunk_id="c0", ruleset_version="v", range_signature="r",
+            senior_dscr=1.3, senior_coupon=0.05, senior_tenor=20, senior_amount=1e8,
+            senior_source=InputSource.MANUAL,
+            day_one_value_core=float(rng.integers(0, 4)) * 1e6, gross_sidecar_value=0.0,
+            sidecar_haircut_pct=0.1, net_sidecar_value=0.0,
+            tier=ViabilityTier.GOLD if i % 7 else ViabilityTier.NOT_VIABLE,
+            min_dscr_senior=float(rng.choice([1.2, 1.3, 1.4])), wal_years=10.0, advance_factor=0.7,
+            gate_a_pass=True, gate_a_reason="", gate_b_pass=True, gate_b_reason="",
+            repo_eligible=bool(i % 2), repo_reason="",
+            cpi_0_dscr=1.3, cpi_18_dscr=1.3, cpi_25_dscr=1.3,
+            min_dscr_mezz=float(rng.choice([1.1, 1.2])) if i % 6 == 0 else None))
+    return results
+
+class TestResultTableTopK(unittest.TestCase):
+    """Partial-selection ranking equals the list export, including NaN keys and ties"""
+
+    ORDERS = (
+        [("min_dscr_mezz", True)],
+        [("min_dscr_mezz", False)],
+        [("min_dscr_mezz", True), ("total_day_one_value", True)],
+        [("total_day_one_value", True), ("min_dscr_mezz", False)],
+        [("min_dscr_senior", False), ("repo_eligible", True)],
+        None,
+    )
+
+    def test_matches_list_path(self):
+        results = _ranked_results(60, seed=43)
+        table = PermutationResultTable.from_results(results)
+        for order_by in self.ORDERS:
+            for top_n in (1, 5, 20, 60):
+                self.assertEqual(export_top_structures(table, top_n, order_by),
+                                 export_top_structures(results, top_n, order_by), (order_by, top_n))
+
+    def test_unset_optional_key_keeps_all_rows(self):
+        results = _ranked_results(30, seed=7)
+        table = PermutationResultTable.from_results(results)
+        top = table.top_k(20, [("min_dscr_mezz", True)])
+        self.assertEqual(len(top), 20)
+        head = [results[i].min_dscr_mezz for i in top[:5]]
+        self.assertNotIn(None, head)
+        self.assertEqual(head, sorted(head, reverse=True))
+        self.assertEqual(len(export_top_structures(table, 20, [("min_dscr_mezz", True)])), 20)
@@ -3,13 +3,90 @@ Phase-1 Securitization QA Micro-Suite
 5-minute validation checks before canary widening
 """
 
+import io
 import json
+import random
 import time
+import unittest
+from contextlib import redirect_stdout
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
+from functools import cached_property
+from itertools import chain
 from typing import Dict, List, Optional, Tuple, Any
 import hashlib
 import numpy as np
 
+# Check name -> SecuritizationQASuite method, in run order
+QA_CHECKS = (
+    ("reverse_dscr", "check_reverse_dscr"),
+    ("wal_senior", "check_wal"),
+    ("tenor_guardrail", "check_tenor_guardrail"),
+    ("repo_rule_key", "check_repo_rule_key"),
+    ("indexation_split", "check_indexation_split"),
+    ("sidecar_reconciliation", "check_sidecar_reconciliation"),
+    ("near_miss_hints", "check_near_miss_hints"),
+)
+REPO_RULE_KEY_COMPONENTS = ("jurisdiction", "issuer_form", "currency", "doc_standard", "settlement")
+QA_FAILED_IDS_SHOWN = 10  # failing structure ids listed per check in batch reports
+
+
+def _padded(rows: List[List[float]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Ragged lists as a zero-padded float matrix plus row lengths"""
+    lengths = np.fromiter((len(r) for r in rows), dtype=np.int64, count=len(rows))
+    out = np.zeros((len(rows), int(lengths.max(initial=0))), dtype=float)
+    if out.size:
+        flat = np.fromiter(chain.from_iterable(rows), dtype=float, count=int(lengths.sum()))
+        out[np.arange(out.shape[1]) < lengths[:, None]] = flat
+    return out, lengths
+
+
+def _row_sums(matrix: np.ndarray) -> np.ndarray:
+    """Left-to-right row sums, matching Python's sum() of the list (cumsum never reorders)"""
+    return np.cumsum(matrix, axis=1)[:, -1] if matrix.shape[1] else np.zeros(len(matrix))
+
+
+class _QAColumns:
+    """Columnar view of a batch of structures; columns are extracted on first use"""
+
+    def __init__(self, structures: List[Dict]):
+        self.structures = structures
+        self.n = len(structures)
+
+    def number(self, key: str, default: float = 0) -> np.ndarray:
+        return np.fromiter((s.get(key, default) for s in self.structures), dtype=float, count=self.n)
+
+    def nested(self, path: Tuple[str, ...], default: Any) -> List[Any]:
+        out = []
+        for s in self.structures:
+            for key in path[:-1]:
+                s = s.get(key, {})
+            out.append(s.get(path[-1], default))
+        return out
+
+    def totals(self, path: Tuple[str, ...]) -> np.ndarray:
+        # Builtin sum per list: exactly check_*'s totals, and cheaper than converting the lists to arrays
+        return np.fromiter((sum(v) for v in self.nested(path, [])), dtype=float, count=self.n)
+
+    @cached_property
+    def principal_total(self) -> np.ndarray:
+        return self.totals(("payment_schedule", "senior", "principal_payments"))
+
+    @cached_property
+    def principal(self) -> Tuple[np.ndarray, np.ndarray]:
+        return _padded(self.nested(("payment_schedule", "senior", "principal_payments"), []))
+
+    @cached_property
+    def repo_eligible(self) -> np.ndarray:
+        return np.fromiter((isinstance(r, dict) and bool(r.get("eligible", False))
+                            for r in (s.get("repo_eligibility", {}) for s in self.structures)),
+                           dtype=bool, count=self.n)
+
+    @cached_property
+    def payment_date_counts(self) -> np.ndarray:
+        return np.fromiter((len(d) for d in self.nested(("payment_schedule", "senior", "payment_dates"), [])),
+                           dtype=np.int64, count=self.n)
+
 
 class SecuritizationQASuite:
     """QA validation suite for Phase-1 securitization structures"""
@@ -22,8 +99,8 @@ class SecuritizationQASuite:
         self.results = {}
         self.blocking_errors = []
 
-    def run_all_checks(self, structure_data: Dict) -> Dict:
-        """Run complete QA suite on winning structure"""
+    def run_all_checks(self, structure_data: Dict, early_exit: bool = False) -> Dict:
+        """Run complete QA suite on winning structure (early_exit: stop at the first failure)"""
         print("[QA] Starting securitization QA micro-suite...")
         start_time = time.time()
 
@@ -37,17 +114,11 @@ class SecuritizationQASuite:
         }
 
         # Run individual checks
-        checks = [
-            ("reverse_dscr", self.check_reverse_dscr),
-            ("wal_senior", self.check_wal),
-            ("tenor_guardrail", self.check_tenor_guardrail),
-            ("repo_rule_key", self.check_repo_rule_key),
-            ("indexation_split", self.check_indexation_split),
-            ("sidecar_reconciliation", self.check_sidecar_reconciliation),
-            ("near_miss_hints", self.check_near_miss_hints)
-        ]
+        checks = [(check_name, getattr(self, method)) for check_name, method in QA_CHECKS]
 
         for check_name, check_func in checks:
+            if early_exit and not self.results["pass"]:
+                break
             try:
                 result = check_func(structure_data)
                 self.results["checks"][check_name] = result
@@ -77,6 +148,159 @@ class SecuritizationQASuite:
 
         return self.results
 
+    def run_batch(self, structures: List[Dict], early_exit: bool = False,
+                  max_workers: Optional[int] = None) -> Dict:
+        """
+        Run the suite over many structures at once. Each check becomes array
+        reductions over columnar data, and independent checks run
+        concurrently. A structure passes a check exactly when
+        run_all_checks() would pass it; use the check_* methods for one
+        structure's detail.
+
+        early_exit: only a go/no-go verdict is needed, so return at the first
+        failing check and skip the rest.
+        """
+        print(f"[QA] Starting batch QA over {len(structures)} structures...")
+        start_time = time.time()
+        cols = _QAColumns(structures)
+
+        self.results = {
+            "timestamp": datetime.utcnow().isoformat(),
+            "structures": len(structures),
+            "checks": {},
+            "blocking_errors": [],
+            "pass": True,
+            "early_exit": False
+        }
+        self.blocking_errors = []
+        self.batch_masks = {}
+
+        def record(check_name: str, mask: np.ndarray):
+            self.batch_masks[check_name] = mask
+            failed = np.flatnonzero(~mask)
+            result = {
+                "pass": not len(failed),
+                "failed": int(len(failed)),
+                "failed_structures": [structures[i].get("structure_id", i)
+                                      for i in failed[:QA_FAILED_IDS_SHOWN].tolist()]
+            }
+            if check_name == "repo_rule_key":
+                # GoNoGoGate._check_repo reads these, as on run_all_checks' single-structure result
+                ineligible = int(np.count_nonzero(~cols.repo_eligible))
+                result["repo_eligible"] = not ineligible
+                result["repo_reason"] = (f"{ineligible} of {len(structures)} structures not repo eligible"
+                                         if ineligible else "All structures repo eligible")
+            self.results["checks"][check_name] = result
+            if len(failed):
+                self.blocking_errors.append({
+                    "check": check_name,
+                    "error": f"{len(failed)} of {len(structures)} structures failed",
+                    "details": {"failed_structures": result["failed_structures"]}
+                })
+                self.results["pass"] = False
+
+        pool = ThreadPoolExecutor(max_workers=max_workers or len(QA_CHECKS))
+        try:
+            pending = {pool.submit(self._batch_mask, check_name, method, cols): check_name
+                       for check_name, method in QA_CHECKS}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    record(pending.pop(future), future.result())
+                if early_exit and not self.results["pass"] and pending:
+                    self.results["early_exit"] = True
+                    self.results["skipped_checks"] = [name for name, _ in QA_CHECKS if name in pending.values()]
+                    break
+        finally:
+            # Early exit abandons checks still running rather than waiting on them
+            pool.shutdown(wait=not self.results["early_exit"], cancel_futures=True)
+
+        # Report checks in run order whatever order they finished in
+        self.results["checks"] = {name: self.results["checks"][name] for name, _ in QA_CHECKS
+                                  if name in self.results["checks"]}
+        order = [name for name, _ in QA_CHECKS]
+        self.blocking_errors.sort(key=lambda e: order.index(e["check"]))
+        self.results["blocking_errors"] = self.blocking_errors
+        self.results["execution_time"] = time.time() - start_time
+
+        return self.results
+
+    def _batch_mask(self, check_name: str, method: str, cols: _QAColumns) -> np.ndarray:
+        """Per-structure pass mask of one check; falls back to the per-structure check on malformed data"""
+        try:
+            return getattr(self, f"_mask_{check_name}")(cols)
+        except Exception:
+            check_func = getattr(self, method)
+
+            def passes(data):
+                try:
+                    return bool(check_func(data).get("pass", False))
+                except Exception:
+                    return False
+
+            return np.fromiter((passes(s) for s in cols.structures), dtype=bool, count=cols.n)
+
+    def _mask_reverse_dscr(self, cols: _QAColumns) -> np.ndarray:
+        numerator = cols.number("net_operating_income") - cols.number("senior_fees")
+        denominator = (cols.totals(("payment_schedule", "senior", "interest_payments")) + cols.principal_total +
+                       cols.number("required_reserves"))
+        valid = denominator > 0
+        computed = numerator / np.where(valid, denominator, 1.0)
+        return valid & (np.abs(computed - cols.number("dscr")) <= self.tolerance_dscr)
+
+    def _mask_wal_senior(self, cols: _QAColumns) -> np.ndarray:
+        principal, lengths = cols.principal
+        dates = cols.payment_date_counts
+        total = cols.principal_total
+        valid = (lengths > 0) & (dates > 0) & (total != 0)
+        # zip() in check_wal stops at the shorter of principal and dates
+        years = (np.arange(principal.shape[1]) + 1) / 12
+        weights = principal / np.where(valid, total, 1.0)[:, None] * years
+        weights[np.arange(principal.shape[1]) >= np.minimum(lengths, dates)[:, None]] = 0.0
+        wal = _row_sums(weights)
+        return valid & (np.abs(wal - cols.number("senior_wal")) <= self.tolerance_wal)
+
+    def _mask_tenor_guardrail(self, cols: _QAColumns) -> np.ndarray:
+        return cols.number("senior_tenor") <= cols.number("lease_years") - cols.number("tenor_buffer", 2)
+
+    def _mask_repo_rule_key(self, cols: _QAColumns) -> np.ndarray:
+        complete = np.fromiter((all(c in key for c in REPO_RULE_KEY_COMPONENTS)
+                                for key in (s.get("repo_rule_key", {}) for s in cols.structures)),
+                               dtype=bool, count=cols.n)
+        reasons = np.fromiter((bool(s.get("repo_eligibility", {}).get("reason", "")) for s in cols.structures),
+                              dtype=bool, count=cols.n)
+        explained = cols.repo_eligible | reasons
+        return complete & explained
+
+    def _mask_indexation_split(self, cols: _QAColumns) -> np.ndarray:
+        flatten = np.fromiter((bool(s.get("flatten_core", False)) for s in cols.structures), dtype=bool, count=cols.n)
+        indexed = np.array([bool(v) for v in cols.nested(("core_cashflows", "has_indexation"), False)], dtype=bool)
+        capped = np.array([bool(v) for v in cols.nested(("core_cashflows", "indexation_capped"), False)], dtype=bool)
+        excess = np.array([bool(v) for v in cols.nested(("sidecar", "excess_indexation"), False)], dtype=bool)
+        return ~flatten | ((~indexed | capped) & excess)
+
+    def _mask_sidecar_reconciliation(self, cols: _QAColumns) -> np.ndarray:
+        gross = np.array(cols.nested(("sidecar", "gross_value"), 0), dtype=float)
+        haircut = np.array(cols.nested(("sidecar", "haircut_pct"), 0), dtype=float)
+        net_reported = np.array(cols.nested(("sidecar", "net_value"), 0), dtype=float)
+        net_computed = gross * (1 - haircut / 100)
+        total_computed = cols.number("core_day_one_value") + net_computed
+        return ((np.abs(net_computed - net_reported) <= self.tolerance_value) &
+                (np.abs(total_computed - cols.number("total_day_one_value")) <= self.tolerance_value))
+
+    def _mask_near_miss_hints(self, cols: _QAColumns) -> np.ndarray:
+        def valid_hints(misses):
+            found = 0
+            for miss in misses:
+                hints = miss.get("lever_hints", [])
+                if hints and any("DSCR" in h or "tenor" in h for h in hints):
+                    found += 1
+            return found
+
+        found = np.fromiter((valid_hints(s.get("near_miss_structures", [])) for s in cols.structures),
+                            dtype=np.int64, count=cols.n)
+        return found >= self.required_near_misses
+
     def check_reverse_dscr(self, data: Dict) -> Dict:
         """Validate DSCR calculation from schedule"""
         schedule = data.get("payment_schedule", {})
@@ -444,6 +668,117 @@ def generate_ruleset_hash(ruleset: Dict) -> str:
     return hashlib.sha256(ruleset_str.encode()).hexdigest()[:16]
 
 
+# ==================== TESTS ====================
+# python -m unittest phase1_qa_suite
+
+def _qa_structure(rng: random.Random, i: int, fail_rate: float = 0.3) -> Dict:
+    """A random structure; each check independently fails (often just past its tolerance) at fail_rate"""
+    def off(tolerance: float) -> float:
+        # Inside the tolerance, or on its boundary, just outside or well outside
+        if rng.random() >= fail_rate:
+            return rng.choice([0.0, tolerance * 0.5])
+        return rng.choice([tolerance, -tolerance, tolerance * 1.001, -tolerance * 2, tolerance * 100])
+
+    n = rng.randrange(1, 40)
+    interest = [rng.uniform(1e3, 1e5) for _ in range(n)]
+    principal = [rng.uniform(0, 1e5) for _ in range(n)]
+    dates = [f"m{k}" for k in range(n if rng.random() > fail_rate / 2 else rng.randrange(0, n + 1))]
+    reserves, fees = rng.uniform(0, 1e4), rng.uniform(0, 1e4)
+    noi = rng.uniform(1, 4) * (sum(interest) + sum(principal) + reserves) + fees
+    total = sum(principal)
+    wal = sum(p / total * (k + 1) / 12 for k, (p, _) in enumerate(zip(principal, dates))) if total else 0
+    gross, haircut, core = rng.uniform(0, 1e7), rng.choice([0, 10, 15.5]), rng.uniform(0, 1e8)
+    net = gross * (1 - haircut / 100)
+    eligible = rng.random() > fail_rate / 2
+    rule_key = {c: "x" for c in REPO_RULE_KEY_COMPONENTS if rng.random() > fail_rate / 10}
+    lease = rng.randrange(10, 30)
+    levers = ["Raise DSCR", "Cut tenor"] + ["Add equity"] * (rng.random() < fail_rate)
+    hints = [{"id": k, "lever_hints": [rng.choice(levers)]}
+             for k in range(rng.randrange(0 if rng.random() < fail_rate else 3, 6))]
+    uncapped = rng.random() < fail_rate
+    return {
+        "structure_id": f"s{i}",
+        "net_operating_income": noi, "senior_fees": fees, "required_reserves": reserves,
+        "payment_schedule": {"senior": {"interest_payments": interest, "principal_payments": principal,
+                                        "payment_dates": dates}},
+        "dscr": (noi - fees) / (sum(interest) + sum(principal) + reserves) + off(0.001),
+        "senior_wal": wal + off(0.1),
+        "senior_tenor": lease - 2 + (rng.choice([1, 5]) if rng.random() < fail_rate else -rng.randrange(0, 5)),
+        "lease_years": lease,
+        "repo_rule_key": rule_key,
+        "repo_eligibility": {"eligible": eligible, "reason": "" if eligible or rng.random() < fail_rate else "LTV"},
+        "flatten_core": rng.random() < 0.5,
+        "core_cashflows": {"has_indexation": rng.random() < 0.5, "indexation_capped": not uncapped},
+        "sidecar": {"gross_value": gross, "haircut_pct": haircut, "net_value": net + off(1.0),
+                    "excess_indexation": rng.random() > fail_rate / 2},
+        "core_day_one_value": core, "total_day_one_value": core + net + off(1.0),
+        "near_miss_structures": hints,
+    }
+
+class TestBatchParity(unittest.TestCase):
+    """run_batch decides every check for every structure exactly as run_all_checks"""
+
+    def setUp(self):
+        self.suite = SecuritizationQASuite()
+
+    def _single(self, structure: Dict, early_exit: bool = False) -> Dict:
+        with redirect_stdout(io.StringIO()):
+            return SecuritizationQASuite().run_all_checks(structure, early_exit=early_exit)
+
+    def _batch(self, structures: List[Dict], early_exit: bool = False) -> Dict:
+        with redirect_stdout(io.StringIO()):
+            return self.suite.run_batch(structures, early_exit=early_exit)
+
+    def test_masks_match_run_all_checks(self):
+        rng = random.Random(46)
+        structures = [_qa_structure(rng, i) for i in range(3000)]
+        report = self._batch(structures)
+        singles = [self._single(s) for s in structures]
+        for name, _ in QA_CHECKS:
+            expected = [bool(r["checks"][name].get("pass", False)) for r in singles]
+            self.assertEqual(self.suite.batch_masks[name].tolist(), expected, name)
+            self.assertEqual(report["checks"][name]["failed"], expected.count(False), name)
+        self.assertEqual(report["pass"], all(r["pass"] for r in singles))
+
+    def test_passing_batch_is_a_go(self):
+        rng = random.Random(3)
+        structures = [_qa_structure(rng, i, fail_rate=0) for i in range(3)]
+        metrics = {"error_rate_pct": 0, "p95_step_time_s": 0.5, "memory_drift": False, "rollback_ttr_s": 1,
+                   "log_fields_present": ["seed", "chunk_id", "range_signature_hash", "ruleset_hash", "commit_sha"]}
+        with redirect_stdout(io.StringIO()):
+            batch = GoNoGoGate().evaluate(metrics, self._batch(structures))
+            single = GoNoGoGate().evaluate(metrics, self._single(structures[0]))
+        self.assertEqual(single["decision"], "GO")
+        self.assertEqual(batch["decision"], "GO", batch["reasons"])
+
+        structures[1]["repo_eligibility"] = {"eligible": False, "reason": "LTV"}
+        with redirect_stdout(io.StringIO()):
+            batch = GoNoGoGate().evaluate(metrics, self._batch(structures))
+        self.assertFalse(batch["criteria_met"]["repo_eligibility"])
+        self.assertTrue(batch["criteria_met"]["qa_suite"])
+
+    def test_early_exit(self):
+        rng = random.Random(5)
+        structures = [_qa_structure(rng, i, fail_rate=0) for i in range(50)]
+        structures[7]["lease_years"] = structures[7]["senior_tenor"]  # tenor guardrail breach
+        report = self._batch(structures, early_exit=True)
+        self.assertFalse(report["pass"])
+        self.assertEqual([e["check"] for e in report["blocking_errors"]], ["tenor_guardrail"])
+        self.assertEqual(report["checks"]["tenor_guardrail"]["failed_structures"], ["s7"])
+        # Every check is either reported or listed as skipped, never both
+        reported, skipped = set(report["checks"]), set(report.get("skipped_checks", []))
+        self.assertFalse(reported & skipped)
+        self.assertEqual(reported | skipped if report["early_exit"] else reported, {name for name, _ in QA_CHECKS})
+
+        single = self._single(structures[7], early_exit=True)
+        self.assertEqual(list(single["checks"]), [name for name, _ in QA_CHECKS][:3])
+
+        report = self._batch(structures[:7], early_exit=True)
+        self.assertTrue(report["pass"])
+        self.assertFalse(report["early_exit"])
+        self.assertEqual(len(report["checks"]), len(QA_CHECKS))
+
+
 if __name__ == "__main__":
     # Example test
     print("[QA] Securitization QA Suite Module Loaded")
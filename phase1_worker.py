@@ -2,13 +2,18 @@
 """
 Phase-1 Async Worker
 Processes permutation jobs from Redis queue
+
+Payloads move atomically from the queue into a processing list and are held
+under a heartbeated lease. Shards checkpoint their position and Top-N every
+chunk, and expired leases are requeued by a reaper so a crashed or restarted
+worker's shard resumes from its last checkpoint. Anytime jobs (grids over the
+guardrail) run as one budgeted search that publishes improving snapshots.
 """
 
 import os
 import json
 import time
-import heapq
-import itertools as _it
+import socket
 import redis
 from datetime import datetime
 
@@ -18,9 +23,11 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 try:
     from phase1_flask_integration import (
-        _build_grid, _evaluate_perm,
-        QUEUE_KEY, JOB_KEY, RES_KEY
+        _build_grid, QUEUE_KEY, JOB_KEY, RES_KEY, SHARD_KEY,
+        PROCESSING_KEY, LEASES_KEY, LEASE_OWNER_KEY, CKPT_KEY, DONE_KEY,
+        INFLIGHT_KEY, EVENTS_CHANNEL, WORKERS_KEY, WORKER_TTL, run_cache_put, _job_result
     )
+    from phase1_grid_engine import GridEvaluator, AnytimeSearch, TopN, RunStats
 except ImportError:
     print("Error: Could not import from phase1_flask_integration")
     sys.exit(1)
@@ -28,86 +35,279 @@ except ImportError:
 # Redis connection
 rds = redis.from_url(os.environ.get("REDIS_URL", "redis://localhost:6379/2"))
 CHUNK = int(os.getenv("PHASE1_CHUNK", "10000"))
+LEASE_TTL = int(os.getenv("PHASE1_LEASE_TTL", "60"))
+REAP_INTERVAL = int(os.getenv("PHASE1_REAP_INTERVAL", "15"))
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+class LeaseLost(Exception):
+    """Another worker has taken over the payload this worker was processing"""
+
+class JobFailed(Exception):
+    """A sibling shard failed the job, so the rest of this shard's work is dropped"""
 
-def update(job_id, **fields):
-    """Update job metadata in Redis"""
+def update(job_id, event=None, **fields):
+    """Update job metadata in Redis and publish the change (plus event extras) to SSE listeners"""
     to_set = {}
     for k, v in fields.items():
         to_set[k] = json.dumps(v) if isinstance(v, (dict, list)) else str(v)
-    rds.hset(JOB_KEY.format(job_id=job_id), mapping=to_set)
+    pipe = rds.pipeline()
+    pipe.hset(JOB_KEY.format(job_id=job_id), mapping=to_set)
+    pipe.publish(EVENTS_CHANNEL.format(job_id=job_id), json.dumps({**to_set, **(event or {})}))
+    pipe.execute()
+
+# ==================== RELIABLE QUEUE ====================
+
+def acquire(timeout=5):
+    """Atomically move the next payload into the processing list and lease it"""
+    payload = rds.brpoplpush(QUEUE_KEY, PROCESSING_KEY, timeout=timeout)
+    if payload is not None:
+        heartbeat(payload, claim=True)
+    return payload
+
+def check_in():
+    """Mark this worker live; budgeted sync runs only hand off while some worker is"""
+    rds.zadd(WORKERS_KEY, {WORKER_ID: time.time()})
+
+def heartbeat(payload, claim=False):
+    """Extend this worker's lease on payload; raise LeaseLost if it was reaped"""
+    if not claim and rds.hget(LEASE_OWNER_KEY, payload) != WORKER_ID.encode():
+        raise LeaseLost(payload)
+    now = time.time()
+    pipe = rds.pipeline()
+    pipe.zadd(LEASES_KEY, {payload: now + LEASE_TTL})
+    pipe.hset(LEASE_OWNER_KEY, payload, WORKER_ID)
+    pipe.zadd(WORKERS_KEY, {WORKER_ID: now})
+    pipe.execute()
+
+def ack(payload):
+    """
+    Drop a finished payload from the processing list and release its lease.
+    Returns False, leaving everything in place, when the lease was reaped and
+    the payload now belongs to another worker.
+    """
+    with rds.pipeline() as pipe:
+        while True:
+            try:
+                pipe.watch(LEASE_OWNER_KEY)
+                if pipe.hget(LEASE_OWNER_KEY, payload) != WORKER_ID.encode():
+                    pipe.unwatch()
+                    return False
+                pipe.multi()
+                pipe.lrem(PROCESSING_KEY, 1, payload)
+                pipe.zrem(LEASES_KEY, payload)
+                pipe.hdel(LEASE_OWNER_KEY, payload)
+                pipe.execute()
+                return True
+            except redis.WatchError:
+                continue  # another worker's heartbeat touched the owner hash; re-check
 
-def run_job(job_id):
-    """Process a single job"""
-    print(f"[WORKER] Starting job {job_id}")
+def reap_expired_leases(now=None):
+    """Requeue processing payloads whose lease has expired, returns count"""
+    now = time.time() if now is None else now
 
-    # Load job metadata
+    # A worker that died between BRPOPLPUSH and its first heartbeat left no lease
+    for payload in rds.lrange(PROCESSING_KEY, 0, -1):
+        rds.zadd(LEASES_KEY, {payload: now + LEASE_TTL}, nx=True)
+
+    requeued = 0
+    for payload in rds.zrangebyscore(LEASES_KEY, 0, now):
+        if not rds.zrem(LEASES_KEY, payload):
+            continue  # another reaper got there first
+        rds.hdel(LEASE_OWNER_KEY, payload)
+        if rds.lrem(PROCESSING_KEY, 1, payload):
+            rds.rpush(QUEUE_KEY, payload)  # consumer end, so it resumes next
+            requeued += 1
+    return requeued
+
+# ==================== JOB PROCESSING ====================
+
+def job_failed(job_id):
+    """Whether a worker has marked the job as errored"""
+    return rds.hget(JOB_KEY.format(job_id=job_id), "status") == b"error"
+
+def load_job(job_id):
+    """Load job metadata and rebuild its evaluator"""
     h = {k.decode(): v.decode() for k, v in rds.hgetall(JOB_KEY.format(job_id=job_id)).items()}
     seed = int(h.get("seed", 424242))
     topn = int(h.get("topn", 20))
     ranges = json.loads(h["ranges"])
-    keys, values, card, _ = _build_grid(ranges)
-
-    update(job_id, status="running", started_at=datetime.utcnow().isoformat(), processed=0, total=card)
-    print(f"[WORKER] Job {job_id}: Processing {card:,} permutations")
-
-    counter = _it.count(0)
-    heap = []
-    processed = 0
-
-    # Process all permutations
-    for combo in _it.product(*[values[i] for i in range(len(values))]):
-        perm = dict(zip(keys, combo))
-        res = _evaluate_perm(perm, seed)
-        score = res["day_one_value_total"]
-        entry = (score, next(counter), res)
-
-        if len(heap) < topn:
-            heapq.heappush(heap, entry)
-        else:
-            heapq.heappushpop(heap, entry)
-
-        processed += 1
-
-        # Update progress periodically
-        if processed % CHUNK == 0 or processed == card:
-            pct = int(processed * 100 / card) if card else 100
-            update(job_id, processed=processed, progress_pct=pct)
-            print(f"[WORKER] Job {job_id}: {pct}% complete ({processed:,}/{card:,})")
-
-    # Extract top structures
-    top_structs = []
-    for rank, (score, _, struct) in enumerate(sorted(heap, key=lambda t: (t[0], t[1]), reverse=True), 1):
-        struct["rank"] = rank
-        top_structs.append(struct)
-
-    # Count tiers
-    diamond_count = sum(1 for s in top_structs if s.get("tier") == "Diamond")
-    gold_count = sum(1 for s in top_structs if s.get("tier") == "Gold")
-    silver_count = sum(1 for s in top_structs if s.get("tier") == "Silver")
-
-    stats = {
-        "total_permutations": processed,
-        "diamond_count": diamond_count,
-        "gold_count": gold_count,
-        "silver_count": silver_count,
-        "gate_a_pruned": 0,
-        "gate_b_pruned": 0,
-        "near_misses": sum(1 for s in top_structs if s.get("near_miss") == "Y")
-    }
-
-    result = {
-        "message": f"Processed {processed:,} permutations",
-        "stats": stats,
-        "top_structures": top_structs,
-        "completed_at": datetime.utcnow().isoformat()
-    }
+    keys, values, _, _ = _build_grid(ranges)
+    evaluator = GridEvaluator(keys, values, seed, **json.loads(h.get("constraints", "{}")))
+    return h, topn, evaluator.size, evaluator
+
+def run_shard(job_id, shard=0, start=0, stop=None, payload=None):
+    """Evaluate one index-range shard and publish its partial Top-N and counters"""
+    h, topn, card, evaluator = load_job(job_id)
+    shards = int(h.get("shards", 1))
+    stop = card if stop is None else stop
+    job_key = JOB_KEY.format(job_id=job_id)
+    done_key = DONE_KEY.format(job_id=job_id)
+    ckpt_key = CKPT_KEY.format(job_id=job_id, shard=shard)
+
+    if job_failed(job_id):
+        rds.delete(ckpt_key)
+        print(f"[WORKER] Job {job_id}: failed, dropping shard {shard + 1}/{shards}")
+        return
+
+    if rds.sismember(done_key, shard):
+        # Redelivered after its partial was published; only the merge may be pending
+        print(f"[WORKER] Job {job_id}: shard {shard + 1}/{shards} already done")
+        if rds.scard(done_key) == shards and not rds.exists(RES_KEY.format(job_id=job_id)):
+            merge_job(job_id)
+        return
+
+    top = run_stats = None
+    raw = rds.get(ckpt_key)
+    if raw:
+        ckpt = json.loads(raw)
+        start = ckpt["next"]
+        top = TopN.from_dict(ckpt["top"])
+        run_stats = RunStats.from_dict(ckpt["stats"])
+        print(f"[WORKER] Job {job_id}: shard {shard + 1}/{shards} resuming at {start:,}")
+    else:
+        print(f"[WORKER] Job {job_id}: shard {shard + 1}/{shards} [{start:,}, {stop:,})")
+
+    if rds.hsetnx(job_key, "started_at", datetime.utcnow().isoformat()):
+        update(job_id, status="running", total=card)
+
+    last = [start]
+
+    def report(processed, top, stats):
+        if payload is not None:
+            heartbeat(payload)
+        if job_failed(job_id):
+            raise JobFailed(job_id)
+        # Checkpoint and progress move together so a resume never double counts
+        pipe = rds.pipeline()
+        pipe.set(ckpt_key, json.dumps({"next": processed, "top": top.to_dict(), "stats": stats.to_dict()}))
+        pipe.hincrby(job_key, "processed", processed - last[0])
+        done = pipe.execute()[1]
+        last[0] = processed
+        pct = int(done * 100 / card) if card else 100
+        update(job_id, event={"processed": str(done), "shard": str(shard)}, progress_pct=min(pct, 99))
+        print(f"[WORKER] Job {job_id}: {pct}% complete ({done:,}/{card:,})")
+
+    # Evaluate in CHUNK-sized vectorized blocks, reporting progress per block
+    try:
+        top, run_stats = evaluator.run(topn, start=start, stop=stop, chunk_size=CHUNK,
+                                       top=top, stats=run_stats, on_chunk=report)
+    except JobFailed:
+        rds.delete(ckpt_key)
+        print(f"[WORKER] Job {job_id}: failed elsewhere, abandoning shard {shard + 1}/{shards}")
+        return
+
+    partial = {"top": top.to_dict(), "stats": run_stats.to_dict()}
+    pipe = rds.pipeline()
+    pipe.set(SHARD_KEY.format(job_id=job_id, shard=shard), json.dumps(partial))
+    pipe.sadd(done_key, shard)
+    pipe.scard(done_key)
+    pipe.delete(ckpt_key)
+    _, added, finished, _ = pipe.execute()
+    update(job_id, shards_done=finished)
+
+    # The worker that completes the last shard performs the merge
+    if added and finished == shards:
+        merge_job(job_id)
+
+def merge_job(job_id):
+    """Merge all shard partials into the final ranked job result"""
+    if job_failed(job_id):
+        return  # an errored job keeps its error rather than a result from the surviving shards
+    h, topn, card, evaluator = load_job(job_id)
+    shards = int(h.get("shards", 1))
+
+    top, run_stats = TopN(topn), RunStats()
+    shard_keys = [SHARD_KEY.format(job_id=job_id, shard=i) for i in range(shards)]
+    for raw in rds.mget(shard_keys):
+        if raw is None:
+            return  # a concurrent merge already consumed the partials
+        partial = json.loads(raw)
+        top.merge(TopN.from_dict(partial["top"]))
+        run_stats.merge(RunStats.from_dict(partial["stats"]))
+    processed = run_stats.processed
+
+    result = _job_result(evaluator, top, run_stats)
+    top_structs = result["top_structures"]
+
+    # Identical specs submitted later are answered from the run cache
+    if h.get("cache_key"):
+        run_cache_put(h["cache_key"], {"top": top.to_dict(), "stats": run_stats.to_dict()})
 
     # Store results
     rds.set(RES_KEY.format(job_id=job_id), json.dumps(result))
-    update(job_id, status="done", progress_pct=100, finished_at=datetime.utcnow().isoformat())
+    rds.delete(*shard_keys, DONE_KEY.format(job_id=job_id))
+    update(job_id, status="done", processed=processed, progress_pct=100, finished_at=datetime.utcnow().isoformat())
+
+    release_inflight(job_id)
 
     print(f"[WORKER] Job {job_id}: Complete! Top value: {top_structs[0]['day_one_value_total'] if top_structs else 0}")
 
+def release_inflight(job_id):
+    """Let new submissions of this job's spec start their own run"""
+    cache_key = rds.hget(JOB_KEY.format(job_id=job_id), "cache_key")
+    if cache_key:
+        inflight_key = INFLIGHT_KEY.format(key=cache_key.decode())
+        if rds.get(inflight_key) == job_id.encode():
+            rds.delete(inflight_key)
+
+def run_anytime(job_id, payload=None):
+    """Budgeted anytime search, publishing each improved Top-N as a partial result"""
+    h, topn, card, evaluator = load_job(job_id)
+    budget = json.loads(h.get("budget", "{}"))
+    max_evals = budget.get("max_evals") or None
+    time_budget = budget.get("time_budget_s") or None
+    res_key = RES_KEY.format(job_id=job_id)
+    print(f"[WORKER] Job {job_id}: anytime search over {card:,} (budget {max_evals or '-'} evals, {time_budget or '-'}s)")
+    update(job_id, status="running", total=card, started_at=datetime.utcnow().isoformat())
+
+    def snapshot(top, stats, report):
+        if payload is not None:
+            heartbeat(payload)
+        # Budget spent drives progress; the search may also stop early once proven
+        spent = [stats.processed / max_evals] if max_evals else []
+        if time_budget:
+            spent.append((time.time() - started) / time_budget)
+        pct = int(100 * max(spent)) if spent else 0
+        result = _job_result(evaluator, top, stats)
+        rds.set(res_key, json.dumps({**result, "partial": True, "anytime": report}))
+        update(job_id, event={"snapshot": "1", "anytime": report},
+               processed=stats.processed, progress_pct=min(pct, 99), anytime=report)
+        print(f"[WORKER] Job {job_id}: {stats.processed:,} evaluated, gap <= {report['score_gap_bound']['sum_pct']}%")
+
+    beat = [time.time()]
+
+    def keep_lease(evaluated):
+        # Plateaus produce no snapshots, so hold the lease between them too
+        if payload is not None and time.time() - beat[0] >= LEASE_TTL / 4:
+            heartbeat(payload)
+            beat[0] = time.time()
+
+    started = time.time()
+    search = AnytimeSearch(evaluator, topn)
+    top, run_stats = search.run(max_evals=max_evals, time_budget=time_budget,
+                                on_snapshot=snapshot, on_round=keep_lease)
+    report = search.report()
+
+    result = {**_job_result(evaluator, top, run_stats), "partial": False, "anytime": report}
+    rds.set(res_key, json.dumps(result))
+    update(job_id, status="done", processed=run_stats.processed, progress_pct=100,
+           anytime=report, finished_at=datetime.utcnow().isoformat())
+    print(f"[WORKER] Job {job_id}: Anytime search complete, {report['coverage_pct']}% coverage")
+
+def run_job(job_id, payload=None):
+    """Process a whole job as a single shard"""
+    run_shard(job_id, payload=payload)
+
+def process(payload):
+    """Dispatch one leased queue payload"""
+    job = json.loads(payload.decode())
+    if job.get("mode") == "anytime":
+        run_anytime(job["job_id"], payload=payload)
+    elif "shard" in job:
+        run_shard(job["job_id"], job["shard"], job["start"], job["stop"], payload=payload)
+    else:
+        run_job(job["job_id"], payload=payload)
+
 def main():
     """Main worker loop"""
     print("[WORKER] Phase-1 async worker started")
@@ -115,29 +315,195 @@ def main():
     print(f"[WORKER] Chunk size: {CHUNK:,}")
     print("[WORKER] Waiting for jobs...")
 
+    last_reap = 0.0
     while True:
         try:
-            # Block waiting for job (5 second timeout)
-            popped = rds.blpop(QUEUE_KEY, timeout=5)
-            if not popped:
-                continue
+            if time.time() - last_reap >= REAP_INTERVAL:
+                requeued = reap_expired_leases()
+                if requeued:
+                    print(f"[WORKER] Requeued {requeued} expired lease(s)")
+                rds.zremrangebyscore(WORKERS_KEY, 0, time.time() - WORKER_TTL)
+                last_reap = time.time()
 
-            _, payload = popped
-            job = json.loads(payload.decode())
-            job_id = job["job_id"]
+            # Block waiting for job (5 second timeout), checking in while idle
+            check_in()
+            payload = acquire(timeout=5)
+            if payload is None:
+                continue
 
+            job_id = json.loads(payload.decode())["job_id"]
             try:
-                run_job(job_id)
+                process(payload)
+            except LeaseLost:
+                print(f"[WORKER] Job {job_id}: lease lost, leaving shard to its new owner")
+                continue
             except Exception as e:
                 print(f"[WORKER] Job {job_id} failed: {e}")
                 update(job_id, status="error", error=str(e))
+                release_inflight(job_id)
+            if not ack(payload):
+                print(f"[WORKER] Job {job_id}: lease lost before ack, leaving payload to its new owner")
 
         except KeyboardInterrupt:
             print("[WORKER] Shutting down...")
+            rds.zrem(WORKERS_KEY, WORKER_ID)
             break
         except Exception as e:
             print(f"[WORKER] Error in main loop: {e}")
             time.sleep(5)
 
+# ==================== TESTS ====================
+# python -m unittest phase1_worker
+
+import unittest
+from unittest import mock
+
+try:
+    import fakeredis
+except ImportError:  # optional, tests are skipped without it
+    fakeredis = None
+
+_TEST_RANGES = {
+    "senior_tenor": {"min": 15, "max": 25, "step": 5},
+    "senior_coupon": {"min": 0.05, "max": 0.07, "step": 0.01},
+    "min_dscr_senior": {"min": 1.2, "max": 1.4, "step": 0.1},
+}
+
+class _Crash(Exception):
+    """Stands in for a worker process dying mid-shard"""
+
+@unittest.skipUnless(fakeredis, "fakeredis not installed")
+class TestLeaseRecovery(unittest.TestCase):
+    """Crashed workers lose their lease, their shard is requeued and resumed exactly once"""
+
+    def setUp(self):
+        import phase1_flask_integration as integration
+        self.integration = integration
+        self.rds = fakeredis.FakeRedis()
+        for patch in (mock.patch(__name__ + ".rds", self.rds), mock.patch(__name__ + ".CHUNK", 4),
+                      mock.patch.object(integration, "rds", self.rds),
+                      mock.patch.object(integration, "REDIS_AVAILABLE", True)):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def _submit(self, job_id):
+        keys, values, _, canon = _build_grid(_TEST_RANGES)
+        card = GridEvaluator(keys, values, 424242).size
+        meta = self.integration._job_meta(job_id, 424242, 5, keys, canon, {}, "", card)
+        self.integration._queue_job(meta, self.integration._plan_shards(card))
+        return card
+
+    def _as_worker(self, worker_id):
+        return mock.patch(__name__ + ".WORKER_ID", worker_id)
+
+    def _crash_after(self, beats):
+        """Patch heartbeat so the worker dies on its beats-th progress report"""
+        count = [0]
+        real = heartbeat
+
+        def beat(payload, claim=False):
+            if not claim:
+                count[0] += 1
+                if count[0] == beats:
+                    raise _Crash(payload)
+            real(payload, claim=claim)
+        return mock.patch(__name__ + ".heartbeat", beat)
+
+    def _job(self, job_id):
+        return {k.decode(): v.decode() for k, v in self.rds.hgetall(JOB_KEY.format(job_id=job_id)).items()}
+
+    def _run_to_completion(self, worker_id):
+        with self._as_worker(worker_id):
+            payload = acquire(timeout=1)
+            self.assertIsNotNone(payload)
+            process(payload)
+            self.assertTrue(ack(payload))
+
+    def _crashed_job(self):
+        card = self._submit("crashjob")
+        with self._as_worker("worker-a"), self._crash_after(3):
+            payload = acquire(timeout=1)
+            with self.assertRaises(_Crash):
+                process(payload)
+        return card, payload
+
+    def test_killed_worker_lease_is_reaped_and_requeued(self):
+        card, payload = self._crashed_job()
+        self.assertEqual(self.rds.lrange(PROCESSING_KEY, 0, -1), [payload])
+        self.assertEqual(self.rds.llen(QUEUE_KEY), 0)
+        self.assertEqual(json.loads(self.rds.get(CKPT_KEY.format(job_id="crashjob", shard=0)))["next"], 8)
+
+        self.assertEqual(reap_expired_leases(), 0)  # lease still live
+        self.assertEqual(reap_expired_leases(now=time.time() + LEASE_TTL + 1), 1)
+        self.assertEqual(self.rds.lrange(QUEUE_KEY, 0, -1), [payload])
+        self.assertEqual(self.rds.llen(PROCESSING_KEY), 0)
+        self.assertIsNone(self.rds.hget(LEASE_OWNER_KEY, payload))
+
+    def test_restarted_worker_resumes_without_double_counting(self):
+        card, payload = self._crashed_job()
+        self.assertEqual(int(self._job("crashjob")["processed"]), 8)
+        reap_expired_leases(now=time.time() + LEASE_TTL + 1)
+
+        self._run_to_completion("worker-b")
+        job = self._job("crashjob")
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(int(job["processed"]), card)
+        self.assertEqual(self.rds.llen(PROCESSING_KEY), 0)
+        self.assertFalse(self.rds.exists(CKPT_KEY.format(job_id="crashjob", shard=0)))
+
+        # Same ranking as a run that never crashed
+        self._submit("cleanjob")
+        self._run_to_completion("worker-c")
+        resumed = json.loads(self.rds.get(RES_KEY.format(job_id="crashjob")))
+        clean = json.loads(self.rds.get(RES_KEY.format(job_id="cleanjob")))
+        self.assertEqual(resumed["top_structures"], clean["top_structures"])
+
+    def test_stale_lease_ack_is_rejected(self):
+        self._submit("stalejob")
+        with self._as_worker("worker-a"):
+            payload = acquire(timeout=1)
+        reap_expired_leases(now=time.time() + LEASE_TTL + 1)
+        with self._as_worker("worker-b"):
+            self.assertEqual(acquire(timeout=1), payload)
+
+        with self._as_worker("worker-a"):
+            self.assertFalse(ack(payload))
+            with self.assertRaises(LeaseLost):
+                heartbeat(payload)
+        self.assertEqual(self.rds.lrange(PROCESSING_KEY, 0, -1), [payload])
+        self.assertEqual(self.rds.hget(LEASE_OWNER_KEY, payload), b"worker-b")
+
+        with self._as_worker("worker-b"):
+            self.assertTrue(ack(payload))
+        self.assertEqual(self.rds.llen(PROCESSING_KEY), 0)
+        self.assertEqual(self.rds.zcard(LEASES_KEY), 0)
+
+    def test_sibling_shards_stop_once_the_job_failed(self):
+        with mock.patch.object(self.integration, "SHARD_SIZE", 10):
+            self._submit("failjob")
+        self.assertEqual(self.rds.llen(QUEUE_KEY), 3)
+        with self._as_worker("worker-a"):
+            running = acquire(timeout=1)
+            # Another worker's shard raised: main() marks the job errored
+            real = heartbeat
+
+            def fail_then_beat(payload, claim=False):
+                update("failjob", status="error", error="boom")
+                real(payload, claim=claim)
+
+            with mock.patch(__name__ + ".heartbeat", fail_then_beat):
+                process(running)
+            self.assertTrue(ack(running))
+            queued = acquire(timeout=1)
+            process(queued)
+            self.assertTrue(ack(queued))
+
+        job = self._job("failjob")
+        self.assertEqual((job["status"], job["error"]), ("error", "boom"))
+        self.assertEqual(job["processed"], "0")
+        self.assertEqual(self.rds.keys(CKPT_KEY.format(job_id="failjob", shard="*")), [])
+        self.assertFalse(self.rds.exists(DONE_KEY.format(job_id="failjob")))
+        self.assertFalse(self.rds.exists(RES_KEY.format(job_id="failjob")))
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,5 +1,4 @@
 """Real News Service - Fetches actual news from various sources"""
-import requests
 import json
 from datetime import datetime, timedelta
 import random
@@ -105,6 +104,7 @@ class RealNewsService:
     
     def _fetch_from_newsapi(self, region: str, asset_class: str) -> List[Dict]:
         """Fetch from NewsAPI.org"""
+        import requests
         if self.news_sources['newsapi']['api_key'] == 'demo_key':
             return []  # Skip if no real API key
         
@@ -150,6 +150,7 @@ class RealNewsService:
     
     def _fetch_from_finnhub(self) -> List[Dict]:
         """Fetch from Finnhub.io"""
+        import requests
         if self.news_sources['finnhub']['api_key'] == 'demo_key':
             return []  # Skip if no real API key
         
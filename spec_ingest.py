@@ -0,0 +1,531 @@
+"""
+AtlasNexus Project Specification Ingestion
+==========================================
+Streams sponsor Excel/CSV templates into project specifications:
+- Rows are read one at a time (openpyxl read-only mode / csv), so memory
+  stays flat whatever the workbook size
+- Parsing runs as a job that publishes progress to a status file: in a
+  background thread on long-running servers (local, gunicorn on one host),
+  inside the request on serverless deployments (Vercel), where the instance
+  may be frozen after the response and the status file is instance-local
+- Every row is validated as it is read; issues go to a per-row report
+"""
+
+import os
+import csv
+import json
+import math
+import secrets
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple, Iterator, Callable
+
+from werkzeug.utils import secure_filename
+
+# Spec field -> accepted (lower-cased) column headers, first match wins
+COLUMN_MAPPING = {
+    'project_name': ['project name', 'project', 'name', 'deal name'],
+    'deal_type': ['deal type', 'type', 'asset type', 'asset class'],
+    'project_location': ['location', 'site', 'region', 'country'],
+    'capex_total': ['total capex', 'capex', 'total cost', 'investment'],
+    'capex_land_purchase': ['land', 'land purchase', 'land cost'],
+    'capex_building': ['building', 'construction', 'building cost'],
+    'capex_infrastructure': ['infrastructure', 'infra'],
+    'capex_it_equipment': ['it equipment', 'it', 'equipment'],
+    'offtaker_name': ['offtaker', 'tenant', 'customer'],
+    'offtaker_rent_per_kwh': ['rent', 'rent per kwh', 'rental'],
+    'power_cost_per_kwh': ['power cost', 'electricity', 'power'],
+    'lease_term_years': ['lease term', 'term', 'years'],
+    'construction_start_date': ['start date', 'construction start', 'start'],
+    'construction_end_date': ['end date', 'construction end', 'completion'],
+    'data_centre_capacity_mw': ['capacity', 'mw', 'it load', 'power capacity']
+}
+
+# Spec fields filled with a default when the sheet has no column for them
+DEFAULT_FIELDS = [
+    'deal_type', 'project_name', 'project_location', 'site_address',
+    'site_size_sqm', 'data_centre_capacity_mw', 'construction_cost',
+    'development_cost', 'capex_professional_fees', 'capex_contingency',
+    'market_capex_estimate', 'offtaker_credit_rating',
+    'offtaker_annual_escalation', 'expected_pue', 'notes'
+]
+
+NUMERIC_KEYWORDS = ['capex', 'cost', 'rent', 'capacity', 'term', 'size']
+SHEET_KEYWORDS = ['pipeline', 'project', 'data', 'capex']
+
+# (field, columns, is date, is numeric), resolved once rather than per row
+FIELD_RULES = [
+    (field, columns, 'date' in field, any(keyword in field for keyword in NUMERIC_KEYWORDS))
+    for field, columns in COLUMN_MAPPING.items()
+]
+
+# Cell strings pandas reads as missing; kept so streamed rows skip/fill exactly as before
+NA_VALUES = frozenset({
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND',
+    '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'
+})
+
+INGEST_FLUSH_ROWS = 2000      # imported specs buffered before merging into the specs store
+INGEST_PROGRESS_ROWS = 500    # rows between status file updates
+INGEST_ISSUES_SHOWN = 50      # issues included in the status document
+INGEST_PROJECTS_SHOWN = 1000  # imported projects listed in the status document
+
+
+def _is_blank(value: Any) -> bool:
+    if value is None:
+        return True
+    if isinstance(value, float):
+        return math.isnan(value)
+    return isinstance(value, str) and value in NA_VALUES
+
+
+def _header(cells: Tuple[Any, ...]) -> List[str]:
+    """Normalized column names: blank headers named and duplicates numbered as pandas does"""
+    names, seen = [], {}
+    for i, cell in enumerate(cells):
+        name = f"Unnamed: {i}" if _is_blank(cell) else str(cell)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name.lower().strip())
+    return names
+
+
+def pick_sheet(sheet_names: List[str]) -> str:
+    """First pipeline/project-looking sheet, else the first sheet"""
+    for sheet in sheet_names:
+        if any(keyword in sheet.lower() for keyword in SHEET_KEYWORDS):
+            return sheet
+    return sheet_names[0]
+
+
+def iter_rows(path: str, file_ext: str) -> Tuple[Optional[str], Optional[int], Iterator[Tuple[int, Dict[str, Any]]]]:
+    """
+    Open a workbook or CSV for streaming.
+
+    Returns (sheet name, estimated data rows, iterator of (sheet row number,
+    {column: value})). Fully empty rows are not yielded.
+    """
+    if file_ext == '.csv':
+        def csv_rows():
+            with open(path, newline='', encoding='utf-8-sig') as f:
+                reader = csv.reader(f)
+                columns = _header(tuple(next(reader, ())))
+                for number, cells in enumerate(reader, start=2):
+                    if any(not _is_blank(c) for c in cells):
+                        yield number, dict(zip(columns, cells))
+        return None, None, csv_rows()
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    sheet_name = pick_sheet(workbook.sheetnames)
+    sheet = workbook[sheet_name]
+    estimate = sheet.max_row - 1 if sheet.max_row else None
+
+    def sheet_rows():
+        try:
+            rows = sheet.iter_rows(values_only=True)
+            columns = _header(next(rows, ()))
+            for number, cells in enumerate(rows, start=2):
+                if any(not _is_blank(c) for c in cells):
+                    yield number, dict(zip(columns, cells))
+        finally:
+            workbook.close()
+
+    return sheet_name, estimate, sheet_rows()
+
+
+def _to_date(value: Any) -> Any:
+    if isinstance(value, str):
+        import pandas as pd
+        return pd.to_datetime(value).strftime('%Y-%m-%d')
+    if hasattr(value, 'strftime'):
+        return value.strftime('%Y-%m-%d')
+    return value
+
+
+def build_specification(record: Dict[str, Any], index: int, row_number: int, submitted_by: str,
+                        submitted_by_name: str, filename: str) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Map one sheet row to a project specification.
+
+    Returns (specification, issues); the specification is None for rows
+    without a project name. Values that cannot be converted are imported
+    as before (raw dates, 0 for numbers) and reported as warnings.
+    """
+    name = record['project name'] if 'project name' in record else record.get('project', '')
+    if _is_blank(name):
+        return None, []
+
+    issues = []
+    spec_id = f"PROJ_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{secrets.token_hex(4)}_{index}"
+    specification = {
+        'id': spec_id,
+        'submitted_by': submitted_by,
+        'submitted_by_name': submitted_by_name,
+        'submission_date': datetime.now().isoformat(),
+        'status': 'pending_review',
+        'source': 'excel_upload',
+        'original_filename': secure_filename(filename)
+    }
+
+    for our_field, possible_columns, is_date, is_numeric in FIELD_RULES:
+        value = None
+        for col in possible_columns:
+            if col in record and not _is_blank(record[col]):
+                value = record[col]
+                break
+
+        if is_date and value:
+            try:
+                value = _to_date(value)
+            except Exception:
+                issues.append({'row': row_number, 'field': our_field, 'value': str(value)[:200],
+                               'severity': 'warning', 'message': 'Unrecognized date kept as entered'})
+
+        if is_numeric:
+            try:
+                value = float(str(value).replace(',', '').replace('£', '').replace('$', '')) if value else 0
+            except (ValueError, TypeError):
+                issues.append({'row': row_number, 'field': our_field, 'value': str(value)[:200],
+                               'severity': 'warning', 'message': 'Not a number, imported as 0'})
+                value = 0
+
+        specification[our_field] = value if value is not None else ''
+
+    for field in DEFAULT_FIELDS:
+        if field not in specification:
+            specification[field] = 'Data Centre' if field == 'deal_type' else (1.5 if field == 'expected_pue' else '')
+
+    specification['engine_populated'] = False
+    specification['engine_populated_date'] = None
+    return specification, issues
+
+
+class SpecIngestJob:
+    """
+    Import of one uploaded workbook, run in a thread (start) or inline
+    (run). State lives in <job_dir>/<job_id>.json, so any worker process on
+    the same host can serve progress, and the full issue report in
+    <job_id>.issues.jsonl. Flushes merge into the specs store while holding
+    specs_lock, which must be the lock the other writers of that store hold.
+    """
+
+    def __init__(self, job_dir: Path, source_path: str, file_ext: str, filename: str,
+                 submitted_by: str, submitted_by_name: str,
+                 load_specs: Callable[[], Dict[str, Any]], save_specs: Callable[[Dict[str, Any]], None],
+                 specs_lock: Optional[threading.Lock] = None,
+                 on_complete: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.job_id = uuid.uuid4().hex[:16]
+        self.job_dir = Path(job_dir)
+        self.job_dir.mkdir(parents=True, exist_ok=True)
+        self.source_path = source_path
+        self.file_ext = file_ext
+        self.filename = filename
+        self.submitted_by = submitted_by
+        self.submitted_by_name = submitted_by_name
+        self.load_specs = load_specs
+        self.save_specs = save_specs
+        self.specs_lock = specs_lock or threading.Lock()
+        self.on_complete = on_complete
+        self.status = {
+            'job_id': self.job_id,
+            'status': 'queued',
+            'filename': filename,
+            'submitted_by': submitted_by,
+            'created_at': datetime.now().isoformat(),
+            'sheet': None,
+            'rows_read': 0,
+            'rows_total_estimate': None,
+            'rows_skipped': 0,
+            'projects_imported': 0,
+            'issues': 0,
+            'issues_preview': [],
+            'projects': []
+        }
+        self._write_status()
+
+    @staticmethod
+    def status_path(job_dir: Path, job_id: str) -> Path:
+        return Path(job_dir) / f"{job_id}.json"
+
+    @staticmethod
+    def issues_path(job_dir: Path, job_id: str) -> Path:
+        return Path(job_dir) / f"{job_id}.issues.jsonl"
+
+    @classmethod
+    def read_status(cls, job_dir: Path, job_id: str) -> Optional[Dict[str, Any]]:
+        """Status document of a job, or None if unknown"""
+        try:
+            with open(cls.status_path(job_dir, job_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @classmethod
+    def read_issues(cls, job_dir: Path, job_id: str) -> List[Dict[str, Any]]:
+        """Every issue recorded so far for a job"""
+        try:
+            with open(cls.issues_path(job_dir, job_id)) as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except OSError:
+            return []
+
+    def _write_status(self):
+        self.status['updated_at'] = datetime.now().isoformat()
+        path = self.status_path(self.job_dir, self.job_id)
+        tmp = path.with_suffix('.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self.status, f, default=str)
+        os.replace(tmp, path)
+
+    def start(self) -> 'SpecIngestJob':
+        thread = threading.Thread(target=self.run, name=f"spec-ingest-{self.job_id}", daemon=True)
+        thread.start()
+        return self
+
+    def _flush(self, pending: Dict[str, Any]):
+        if pending:
+            with self.specs_lock:
+                specs = self.load_specs()
+                specs.update(pending)
+                self.save_specs(specs)
+            pending.clear()
+
+    def run(self):
+        started = time.time()
+        pending: Dict[str, Any] = {}
+        self.status['status'] = 'running'
+        try:
+            sheet, estimate, rows = iter_rows(self.source_path, self.file_ext)
+            self.status.update(sheet=sheet, rows_total_estimate=estimate)
+            self._write_status()
+
+            with open(self.issues_path(self.job_dir, self.job_id), 'w') as issues_file:
+                for index, (row_number, record) in enumerate(rows):
+                    try:
+                        spec, issues = build_specification(record, index, row_number, self.submitted_by,
+                                                           self.submitted_by_name, self.filename)
+                    except Exception as e:
+                        spec, issues = None, [{'row': row_number, 'field': None, 'value': None,
+                                               'severity': 'error', 'message': f'Row not imported: {e}'}]
+
+                    self.status['rows_read'] += 1
+                    if spec is None and not issues:
+                        self.status['rows_skipped'] += 1
+                    if spec is not None:
+                        pending[spec['id']] = spec
+                        self.status['projects_imported'] += 1
+                        if len(self.status['projects']) < INGEST_PROJECTS_SHOWN:
+                            self.status['projects'].append({'id': spec['id'], 'name': spec.get('project_name', 'Unnamed Project')})
+                    for issue in issues:
+                        issues_file.write(json.dumps(issue, default=str) + '\n')
+                        self.status['issues'] += 1
+                        if len(self.status['issues_preview']) < INGEST_ISSUES_SHOWN:
+                            self.status['issues_preview'].append(issue)
+
+                    if len(pending) >= INGEST_FLUSH_ROWS:
+                        self._flush(pending)
+                    if self.status['rows_read'] % INGEST_PROGRESS_ROWS == 0:
+                        self._write_status()
+
+            self._flush(pending)
+            self.status.update(
+                status='completed',
+                message=f"Successfully imported {self.status['projects_imported']} projects",
+                duration_s=round(time.time() - started, 3)
+            )
+        except Exception as e:
+            # Keep what was already parsed; the report says how far the job got
+            try:
+                self._flush(pending)
+            except Exception:
+                pass
+            self.status.update(status='failed', error=f'Error processing file: {e}',
+                               duration_s=round(time.time() - started, 3))
+        finally:
+            try:
+                os.remove(self.source_path)
+            except OSError:
+                pass
+            self._write_status()
+
+        if self.on_complete:
+            try:
+                self.on_complete(self.status)
+            except Exception as e:
+                print(f"[SPEC_INGEST] Completion hook failed for {self.job_id}: {e}")
+
+
+# ==================== TESTS ====================
+# python -m unittest spec_ingest
+
+import tempfile
+import unittest
+
+try:
+    import pandas as pd
+except ImportError:  # pragma: no cover
+    pd = None
+
+try:
+    import openpyxl
+except ImportError:  # pragma: no cover
+    openpyxl = None
+
+_TEST_HEADER = ['Project Name', 'Location', 'Total Capex', 'Rent', 'Lease Term', 'Start Date', 'Capacity']
+_TEST_ROWS = [
+    ['Alpha DC', 'London', '£1,200,000', 0.12, 25, '2025-01-15', 40],
+    ['Beta DC', 'n/a', 'tbc', None, '15', 'March 2026', '12.5'],
+    [None, 'Leeds', 500, None, None, None, None],
+    [None, None, None, None, None, None, None],
+    ['Gamma DC', None, '$3,000', 'NULL', None, 'not a date', None],
+]
+
+
+def _pandas_specifications(path: str, file_ext: str) -> List[Dict[str, Any]]:
+    """Specifications the upload endpoint built with pandas before ingestion streamed rows"""
+    if file_ext == '.csv':
+        df = pd.read_csv(path)
+    else:
+        excel_file = pd.ExcelFile(path)
+        df = pd.read_excel(excel_file, sheet_name=pick_sheet(excel_file.sheet_names))
+    df.columns = [col.lower().strip() for col in df.columns]
+
+    specs = []
+    for index, row in df.iterrows():
+        if pd.isna(row.get('project name', row.get('project', ''))):
+            continue
+        specification = {}
+        for our_field, possible_columns in COLUMN_MAPPING.items():
+            value = None
+            for col in possible_columns:
+                if col in df.columns and not pd.isna(row.get(col)):
+                    value = row[col]
+                    break
+            if 'date' in our_field and value:
+                try:
+                    value = _to_date(value)
+                except Exception:
+                    pass
+            if any(keyword in our_field for keyword in NUMERIC_KEYWORDS):
+                try:
+                    value = float(str(value).replace(',', '').replace('£', '').replace('$', '')) if value else 0
+                except (ValueError, TypeError):
+                    value = 0
+            specification[our_field] = value if value is not None else ''
+        specs.append(specification)
+    return specs
+
+
+def _streamed_specifications(path: str, file_ext: str) -> List[Dict[str, Any]]:
+    """Mapped fields of the specifications build_specification makes from iter_rows"""
+    _, _, rows = iter_rows(path, file_ext)
+    specs = []
+    for index, (row_number, record) in enumerate(rows):
+        spec, _ = build_specification(record, index, row_number, 'a@b.c', 'A', 'sheet.xlsx')
+        if spec is not None:
+            specs.append({field: spec[field] for field in COLUMN_MAPPING})
+    return specs
+
+
+class TestBuildSpecification(unittest.TestCase):
+
+    def build(self, record):
+        return build_specification(record, 3, 7, 'a@b.c', 'A', '../pipeline.xlsx')
+
+    def test_maps_and_converts_fields(self):
+        spec, issues = self.build({'project name': 'Alpha DC', 'capex': '£1,200', 'lease term': '25',
+                                   'start': '2025-01-15', 'tenant': 'Acme'})
+        self.assertEqual(issues, [])
+        self.assertEqual(spec['project_name'], 'Alpha DC')
+        self.assertEqual(spec['capex_total'], 1200.0)
+        self.assertEqual(spec['lease_term_years'], 25.0)
+        self.assertEqual(spec['construction_start_date'], '2025-01-15')
+        self.assertEqual(spec['offtaker_name'], 'Acme')
+        self.assertEqual(spec['capex_building'], 0)
+        self.assertEqual((spec['deal_type'], spec['expected_pue'], spec['site_address']), ('', 1.5, ''))
+        self.assertEqual(spec['original_filename'], 'pipeline.xlsx')
+        self.assertTrue(spec['id'].startswith('PROJ_') and spec['id'].endswith('_3'))
+        self.assertFalse(spec['engine_populated'])
+
+    def test_rows_without_a_name_are_skipped(self):
+        self.assertEqual(self.build({'project name': 'NaN', 'capex': 5}), (None, []))
+        self.assertEqual(self.build({'location': 'Leeds'}), (None, []))
+
+    def test_unconvertible_values_are_kept_and_reported(self):
+        spec, issues = self.build({'project': 'Beta', 'capex': 'tbc', 'start date': 'not a date'})
+        self.assertEqual(spec['capex_total'], 0)
+        self.assertEqual(spec['construction_start_date'], 'not a date')
+        self.assertEqual(sorted((i['field'], i['row'], i['severity']) for i in issues),
+                         [('capex_total', 7, 'warning'), ('construction_start_date', 7, 'warning')])
+
+
+@unittest.skipUnless(pd is not None, "pandas not installed")
+class TestIterRowsParity(unittest.TestCase):
+    """Streamed rows build the same specifications as the pandas path they replaced"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_csv(self):
+        path = os.path.join(self.tmp.name, 'pipeline.csv')
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(_TEST_HEADER)
+            writer.writerows([['' if v is None else v for v in row] for row in _TEST_ROWS])
+        streamed = _streamed_specifications(path, '.csv')
+        self.assertEqual(len(streamed), 3)
+        self.assertEqual(streamed, _pandas_specifications(path, '.csv'))
+
+    @unittest.skipUnless(openpyxl is not None, "openpyxl not installed")
+    def test_xlsx_picks_the_pipeline_sheet(self):
+        path = os.path.join(self.tmp.name, 'pipeline.xlsx')
+        workbook = openpyxl.Workbook()
+        workbook.active.title = 'Summary'
+        workbook.active.append(['Project Name'])
+        workbook.active.append(['Wrong sheet'])
+        sheet = workbook.create_sheet('Pipeline')
+        sheet.append(_TEST_HEADER)
+        for row in _TEST_ROWS:
+            sheet.append([datetime(2025, 1, 15) if v == '2025-01-15' else v for v in row])
+        workbook.save(path)
+
+        sheet_name, estimate, _ = iter_rows(path, '.xlsx')
+        self.assertEqual((sheet_name, estimate), ('Pipeline', len(_TEST_ROWS)))
+        streamed = _streamed_specifications(path, '.xlsx')
+        self.assertEqual([s['project_name'] for s in streamed], ['Alpha DC', 'Beta DC', 'Gamma DC'])
+        self.assertEqual(streamed, _pandas_specifications(path, '.xlsx'))
+
+
+class TestSpecIngestFlush(unittest.TestCase):
+
+    def test_flush_merges_under_the_shared_lock(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, 'upload.csv')
+            with open(source, 'w', newline='') as f:
+                csv.writer(f).writerows([['Project Name', 'Capex'], ['Alpha', '10'], ['Beta', '20']])
+            lock = threading.Lock()
+            store = {'PROJ_existing': {'id': 'PROJ_existing'}}
+            saves = []
+
+            def save(specs):
+                saves.append(lock.locked())
+                store.clear()
+                store.update(specs)
+
+            job = SpecIngestJob(Path(tmp) / 'jobs', source, '.csv', 'upload.csv', 'a@b.c', 'A',
+                                load_specs=lambda: dict(store), save_specs=save, specs_lock=lock)
+            job.run()
+
+            self.assertEqual(job.status['status'], 'completed')
+            self.assertEqual(saves, [True])
+            self.assertEqual(sorted(s.get('project_name', '') for s in store.values()), ['', 'Alpha', 'Beta'])
+            self.assertFalse(os.path.exists(source))